@@ -1,21 +1,173 @@
 import uuid # Esto me ayuda a darle un ID único a cada cosa
+from bisect import bisect_left, bisect_right # Búsqueda binaria para mantener los hijos ordenados
+from types import MappingProxyType # Diccionario de solo lectura (para los archivos)
+
+# Los dos tipos posibles. Guardo solo un booleano por nodo y devuelvo siempre estas
+# mismas cadenas, así no hay un string repetido en cada uno de los millones de nodos.
+CARPETA = "carpeta"
+ARCHIVO = "archivo"
+
+# Contenedores vacíos compartidos: los archivos nunca tienen hijos, así que
+# no les creo una lista y un diccionario propios a cada uno.
+_SIN_HIJOS = ()
+_SIN_INDICE = MappingProxyType({})
+
+def _bytes_de(contenido) -> int:
+    """Cuántos bytes ocupa un contenido en UTF-8 (sin codificar si es todo ASCII)."""
+    if contenido is None:
+        return 0
+    if type(contenido) is not str:
+        return contenido.longitud_bytes # Contenido diferido: ya sabe su tamaño sin leerse
+    return len(contenido) if contenido.isascii() else len(contenido.encode("utf-8"))
+
+
+def _fin_del_prefijo(prefijo: str):
+    """La menor cadena mayor que todas las que empiezan con 'prefijo' (None si no hay ninguna)."""
+    while prefijo:
+        ultimo = ord(prefijo[-1])
+        if ultimo < 0x10FFFF:
+            return prefijo[:-1] + chr(ultimo + 1)
+        prefijo = prefijo[:-1]
+    return None
+
+
+def _pagina_de_claves(claves: list, despues_de=None, limite: int = None, tipo: str = None,
+                      prefijo: str = None):
+    """
+    Una página de una lista de claves (tipo, nombre) ordenada: las que vienen
+    después de 'despues_de', como mucho 'limite', y opcionalmente solo las de un
+    tipo y/o las que empiezan con 'prefijo'. Retorna (página, cursor): el cursor
+    es la última clave de la página si quedan más, o None si no queda nada.
+    Cada rango lo ubico con búsqueda binaria, así que no recorro lo que no entra.
+    """
+    if despues_de is not None:
+        despues_de = tuple(despues_de)
+    pagina = []
+    for tipo_rango in ((tipo.lower(),) if tipo is not None else (ARCHIVO, CARPETA)):
+        # Dentro de un tipo los nombres están ordenados: lo que empieza con el prefijo es contiguo
+        if prefijo:
+            inicio = bisect_left(claves, (tipo_rango, prefijo))
+            fin_prefijo = _fin_del_prefijo(prefijo)
+            hasta = (tipo_rango, fin_prefijo) if fin_prefijo is not None else (tipo_rango + "\0",)
+        else:
+            inicio = bisect_left(claves, (tipo_rango,))
+            hasta = (tipo_rango + "\0",)
+        fin = bisect_left(claves, hasta, inicio)
+        if despues_de is not None:
+            inicio = max(inicio, bisect_right(claves, despues_de))
+        if inicio >= fin:
+            continue
+        if limite is not None:
+            falta = limite - len(pagina)
+            if fin - inicio > falta:
+                pagina.extend(claves[inicio:inicio + falta])
+                return pagina, pagina[-1]
+        pagina.extend(claves[inicio:fin])
+    return pagina, None
+
+
+def sumar_totales_de_nuevos(nuevos: list):
+    """
+    Suma los totales de nodos recién colgados con agregar_hijo_sin_totales, en una
+    sola pasada: 'nuevos' tiene que estar en el orden en que se crearon (cada padre
+    antes que sus hijos). Recorro al revés, así cada nodo ya tiene sumado todo su
+    subárbol cuando se lo paso a su padre; a los padres que ya existían les llega
+    una sola suma por padre, y esa sí sube hasta la raíz.
+    """
+    creados = {id(nodo) for nodo in nuevos}
+    existentes = {} # id del padre que ya estaba -> [padre, nodos, archivos, carpetas, bytes]
+    for nodo in reversed(nuevos):
+        padre = nodo.padre
+        if padre is None:
+            continue
+        if id(padre) in creados:
+            padre.total_nodos += nodo.total_nodos
+            padre.total_archivos += nodo.total_archivos
+            padre.total_carpetas += nodo.total_carpetas
+            padre.total_bytes += nodo.total_bytes
+        else:
+            suma = existentes.get(id(padre))
+            if suma is None:
+                suma = existentes[id(padre)] = [padre, 0, 0, 0, 0]
+            suma[1] += nodo.total_nodos
+            suma[2] += nodo.total_archivos
+            suma[3] += nodo.total_carpetas
+            suma[4] += nodo.total_bytes
+    for padre, nodos, archivos, carpetas, bytes_ in existentes.values():
+        padre._propagar_totales(nodos, archivos, carpetas, bytes_)
+
 
 class Nodo:
     """
     Esta es mi clase fundamental. Representa un archivo o una carpeta individual
     en mi sistema (Funcionalidades de los Días 1-4).
+    Uso __slots__ para que cada nodo no cargue un __dict__ (ahorra mucha memoria).
     """
+    __slots__ = ("_id", "nombre", "_es_carpeta", "_contenido",
+                 "children", "claves_hijos", "hijos_por_nombre", "padre", "generacion",
+                 "total_nodos", "total_archivos", "total_carpetas", "total_bytes")
+
     def __init__(self, nombre: str, tipo: str, contenido: str = None, padre=None):
         
         # Atributos de identificación
-        self.id = str(uuid.uuid4())  # ID único para cada nodo (¡Buena idea mía!)
+        self._id = None               # El UUID se genera recién cuando alguien lo pide (ver 'id')
         self.nombre = nombre          # Nombre del archivo o carpeta.
-        self.tipo = tipo.lower()      # 'carpeta' o 'archivo'.
-        self.contenido = contenido    # Aquí guardo el texto (solo si soy un archivo).
+        self._es_carpeta = tipo.lower() == CARPETA # 'carpeta' o 'archivo', como bandera.
+        self._contenido = contenido   # Aquí guardo el texto (solo si soy un archivo, ver 'contenido').
         
         # Atributos de la estructura del árbol (sus jerarquías)
-        self.children = []            # Nodos/hijos directos
+        if self._es_carpeta:
+            self.children = []            # Nodos/hijos directos (siempre ordenados)
+            self.claves_hijos = []        # (tipo, nombre) de cada hijo, en el mismo orden que children
+            self.hijos_por_nombre = {}    # Índice nombre -> hijo, para buscar en O(1)
+        else:
+            self.children = _SIN_HIJOS
+            self.claves_hijos = _SIN_HIJOS
+            self.hijos_por_nombre = _SIN_INDICE
         self.padre = padre            # Referencia al nodo padre
+        self.generacion = 0           # Cambia cuando me eliminan, muevo o renombro (invalida cachés)
+
+        # Totales de mi subárbol (contándome a mí). Se actualizan solos al agregar,
+        # eliminar o cambiar contenido, así nadie tiene que recorrer el árbol para saberlos.
+        self.total_nodos = 1
+        self.total_archivos = 0 if self._es_carpeta else 1
+        self.total_carpetas = 1 if self._es_carpeta else 0
+        self.total_bytes = _bytes_de(contenido)
+
+    @property
+    def id(self) -> str:
+        """
+        ID único del nodo. Lo guardo como entero de 128 bits y solo lo genero
+        la primera vez que se consulta (crear un nodo no gasta un uuid4).
+        """
+        if self._id is None:
+            self._id = uuid.uuid4().int
+        return str(uuid.UUID(int=self._id))
+
+    @property
+    def tipo(self) -> str:
+        """'carpeta' o 'archivo', calculado a partir de la bandera."""
+        return CARPETA if self._es_carpeta else ARCHIVO
+
+    @property
+    def contenido(self) -> str:
+        """
+        El texto del archivo (None si no tiene). Además de un str, puedo guardar un
+        "contenido diferido": un objeto con 'longitud_bytes' y 'materializar()' que
+        trae el texto solo cuando alguien lo lee (por ejemplo, desde un snapshot en disco).
+        """
+        contenido = self._contenido
+        if contenido is None or type(contenido) is str:
+            return contenido
+        return contenido.materializar()
+
+    @contenido.setter
+    def contenido(self, nuevo_contenido: str):
+        """Cambio el texto y aviso a mis ancestros cuántos bytes cambió su total."""
+        diferencia = _bytes_de(nuevo_contenido) - _bytes_de(self._contenido)
+        self._contenido = nuevo_contenido
+        if diferencia:
+            self._propagar_totales(0, 0, 0, diferencia)
 
     def __repr__(self):
         """Representación simple para cuando imprimo el objeto."""
@@ -25,22 +177,103 @@ class Nodo:
     
     def agregar_hijo(self, hijo):
         """
-        Añade un nodo a la lista de children, establece el padre, y ¡ORDENA! 
-        (Es la corrección clave para que el 'ls' del Día 4 funcione alfabéticamente).
+        Añade un nodo a la lista de children, establece el padre, y lo deja
+        en su lugar ordenado por (tipo, nombre), igual que el sort de antes.
+        Uso búsqueda binaria en vez de volver a ordenar toda la lista.
         """
         hijo.padre = self            
-        self.children.append(hijo)
-        # Aquí ordeno los hijos alfabéticamente (primero carpetas, luego archivos)
-        self.children.sort(key=lambda n: (n.tipo, n.nombre)) 
+        clave = (hijo.tipo, hijo.nombre)
+        posicion = bisect_left(self.claves_hijos, clave)
+        self.claves_hijos.insert(posicion, clave)
+        self.children.insert(posicion, hijo)
+        self.hijos_por_nombre[hijo.nombre] = hijo
+        self._propagar_totales(hijo.total_nodos, hijo.total_archivos,
+                               hijo.total_carpetas, hijo.total_bytes)
         
     def eliminar_hijo(self, hijo):
         """Elimina un nodo hijo de la lista"""
-        if hijo in self.children:
-            self.children.remove(hijo)
+        if self.hijos_por_nombre.get(hijo.nombre) is hijo:
+            posicion = self._posicion_de(hijo)
+            del self.claves_hijos[posicion]
+            del self.children[posicion]
+            del self.hijos_por_nombre[hijo.nombre]
             hijo.padre = None        # El nodo eliminado ya no tiene padre
+            self._propagar_totales(-hijo.total_nodos, -hijo.total_archivos,
+                                   -hijo.total_carpetas, -hijo.total_bytes)
             return True
         return False
+
+    def buscar_hijo(self, nombre: str):
+        """Retorna el hijo directo con ese nombre (o None) usando el índice, sin recorrer la lista."""
+        return self.hijos_por_nombre.get(nombre)
+
+    def renombrar_hijo(self, hijo, nuevo_nombre: str):
+        """
+        Cambia el nombre de un hijo manteniendo el índice sincronizado
+        y lo mueve a su nueva posición para que el 'ls' siga saliendo alfabético.
+        """
+        posicion = self._posicion_de(hijo)
+        del self.claves_hijos[posicion]
+        del self.children[posicion]
+        del self.hijos_por_nombre[hijo.nombre]
+
+        hijo.nombre = nuevo_nombre
+        clave = (hijo.tipo, nuevo_nombre)
+        posicion = bisect_left(self.claves_hijos, clave)
+        self.claves_hijos.insert(posicion, clave)
+        self.children.insert(posicion, hijo)
+        self.hijos_por_nombre[nuevo_nombre] = hijo
+
+    def agregar_hijo_sin_ordenar(self, hijo):
+        """
+        Igual que agregar_hijo pero lo pongo al final, sin buscar su lugar.
+        Es para cargas masivas: después de agregar todo hay que llamar a ordenar_hijos().
+        """
+        self.agregar_hijo_sin_totales(hijo)
+        self._propagar_totales(hijo.total_nodos, hijo.total_archivos,
+                               hijo.total_carpetas, hijo.total_bytes)
+
+    def agregar_hijo_sin_totales(self, hijo):
+        """
+        Igual que agregar_hijo_sin_ordenar pero sin sumar sus totales a mis ancestros
+        (eso es O(profundidad) por hijo). Quien lo usa tiene que sumarlos después, todos
+        juntos (ver sumar_totales_de_nuevos), y ordenar con ordenar_hijos().
+        """
+        hijo.padre = self
+        self.claves_hijos.append((hijo.tipo, hijo.nombre))
+        self.children.append(hijo)
+        self.hijos_por_nombre[hijo.nombre] = hijo
+
+    def ordenar_hijos(self):
+        """Ordena todos los hijos de una sola vez por (tipo, nombre) (después de una carga masiva)."""
+        # Ordeno las posiciones por las claves que ya tengo armadas (sin pedirle el tipo a cada nodo)
+        claves, hijos = self.claves_hijos, self.children
+        orden = sorted(range(len(claves)), key=claves.__getitem__)
+        self.claves_hijos = [claves[i] for i in orden]
+        self.children = [hijos[i] for i in orden]
+
+    def listar_hijos(self) -> list:
+        """Retorna las tuplas (tipo, nombre) de mis hijos, ya ordenadas (no hace falta ordenar)."""
+        return list(self.claves_hijos)
+
+    def pagina_hijos(self, despues_de=None, limite: int = None, tipo: str = None, prefijo: str = None):
+        """(página de tuplas (tipo, nombre), cursor) de mis hijos, ver _pagina_de_claves."""
+        return _pagina_de_claves(self.claves_hijos, despues_de, limite, tipo, prefijo)
+
+    def _propagar_totales(self, nodos: int, archivos: int, carpetas: int, bytes_: int):
+        """Sumo las diferencias a mis totales y a los de todos mis ancestros (O(profundidad))."""
+        actual = self
+        while actual is not None:
+            actual.total_nodos += nodos
+            actual.total_archivos += archivos
+            actual.total_carpetas += carpetas
+            actual.total_bytes += bytes_
+            actual = actual.padre
+
+    def _posicion_de(self, hijo) -> int:
+        """Ubica a un hijo en la lista ordenada con búsqueda binaria (los nombres no se repiten)."""
+        return bisect_left(self.claves_hijos, (hijo.tipo, hijo.nombre))
         
     def es_carpeta(self) -> bool:
         """Comprueba si el nodo es de tipo 'carpeta'."""
-        return self.tipo == 'carpeta'
+        return self._es_carpeta
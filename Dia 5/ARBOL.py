@@ -1,15 +1,164 @@
-from nodo import Nodo 
+import inspect
+import os
+import sys
+from collections import OrderedDict, deque # OrderedDict me sirve como caché LRU (recuerda el orden de uso)
+
+from nodo import Nodo, _pagina_de_claves, sumar_totales_de_nuevos
+from diario import Diario, INSERTAR, ELIMINAR, MOVER, MODIFICAR, RENOMBRAR, COPIAR, ANEXAR, ESCRIBIR, TRANSACCION
+from busqueda import IndiceNombres, buscar_glob, buscar_regex
+from indice_texto import IndiceTexto
+from concurrencia import ModoConcurrente
+from contenidos import AlmacenContenidos, es_blob
+from trozos import ContenidoEnTrozos, TAMANO_TROZO
+from niveles import GestorNiveles, ContenidoEnNivel
+from transacciones import Transaccion, aplicar_transaccion
+from metricas import RegistroMetricas, instrumentar, desinstrumentar
+from ancestros import IndiceAncestros, NIVELES_SIN_INDICE
+from rutas import Ruta, partes_de
+from errores import ManejoDeErrores, ErroresCapturados
+from persistencia import ContenidoEnSnapshot
 # Nota: La importación de uuid está ahora en nodo.py, ¡así que mi archivo está más limpio!
 
-class ArbolArchivos:
+class ResultadoLote:
+    """
+    Lo que devuelve insertar_lote: cuántas cosas se crearon y los errores
+    de cada entrada (en vez de imprimirlos uno por uno).
+    """
+    def __init__(self):
+        self.insertados = 0          # Entradas del lote que se crearon
+        self.carpetas_creadas = 0    # Carpetas intermedias que tuve que crear solo
+        self.errores = []            # Lista de (ruta, mensaje)
+
+    @property
+    def ok(self) -> bool:
+        return not self.errores
+
+    def __repr__(self):
+        return (f"<ResultadoLote: {self.insertados} insertados, "
+                f"{self.carpetas_creadas} carpetas intermedias, {len(self.errores)} errores>")
+
+
+def _problema_de_entrada(entrada):
+    """Por qué una entrada de insertar_lote no sirve (o None si tiene la forma correcta)."""
+    if not isinstance(entrada, (tuple, list)) or len(entrada) not in (2, 3):
+        return "Cada entrada tiene que ser (ruta, tipo) o (ruta, tipo, contenido)."
+    if not isinstance(entrada[0], str):
+        return "La ruta tiene que ser texto."
+    if not isinstance(entrada[1], str):
+        return "El tipo tiene que ser 'archivo' o 'carpeta'."
+    contenido = entrada[2] if len(entrada) > 2 else None
+    if contenido is not None and not isinstance(contenido, str) and not hasattr(contenido, "longitud_bytes"):
+        return "El contenido tiene que ser texto (o None)."
+    return None
+
+
+class ArbolArchivos(ManejoDeErrores):
     """
     Esta clase maneja toda la lógica de mi sistema de archivos, usando los Nodos.
     Implementación completa de los Días 1, 2, 3, 4 y 5.
     """
-    def __init__(self):
+    def __new__(cls, *args, motor: str = "nodos", concurrente: bool = False, **kwargs):
+        """
+        Permite elegir el motor al construir el árbol:
+          - "nodos" (por defecto): un objeto Nodo por archivo/carpeta (esta clase).
+          - "columnar": filas en arreglos paralelos (ArbolColumnar), para árboles enormes.
+          - "persistente": nodos inmutables y una versión nueva por cambio (ArbolPersistente),
+            para leer fotos consistentes (snapshot(), version(n)) sin candados. Acepta 'retener'.
+        Los otros motores no aceptan las opciones que no soportan (ver _revisar_opciones).
+        Con concurrente=True se puede usar desde varios hilos (ArbolConcurrente).
+        """
+        if motor == "columnar":
+            if concurrente:
+                raise ValueError("El motor columnar no tiene modo concurrente.")
+            cls._revisar_opciones(motor, args, kwargs)
+            from arbol_columnar import ArbolColumnar
+            return ArbolColumnar()
+        if motor == "persistente":
+            # Ya es seguro para varios hilos (lectores sin candados): concurrente no cambia nada
+            opciones = cls._revisar_opciones(motor, args, kwargs, propias=("retener",))
+            from versiones import ArbolPersistente
+            return ArbolPersistente(**opciones)
+        if motor != "nodos":
+            raise ValueError(f"Motor desconocido: '{motor}'")
+        if concurrente and not issubclass(cls, ModoConcurrente):
+            return super().__new__(ArbolConcurrente)
+        return super().__new__(cls)
+
+    @classmethod
+    def _revisar_opciones(cls, motor: str, args, kwargs, propias=()) -> dict:
+        """
+        Los otros motores no tienen caché, índices, deduplicación, etc. En vez de
+        ignorar esas opciones en silencio, reviso las que me pasaron contra las de
+        __init__: una opción que no existe es TypeError (como con cualquier función)
+        y una que el motor no soporta, con un valor distinto del de por defecto,
+        es ValueError. Retorna las opciones 'propias' que sí entiende el motor.
+        """
+        firma = inspect.signature(cls.__init__)
+        parametros = dict(firma.parameters)
+        for nombre in propias:
+            parametros.setdefault(nombre, inspect.Parameter(nombre, inspect.Parameter.KEYWORD_ONLY, default=None))
+        pasadas = firma.replace(parameters=parametros.values()).bind(None, *args, **kwargs).arguments
+        for nombre, valor in pasadas.items():
+            if nombre in ("self", "motor") or nombre in propias:
+                continue
+            if valor != firma.parameters[nombre].default:
+                raise ValueError(f"El motor {motor} no soporta la opción '{nombre}'.")
+        return {nombre: pasadas[nombre] for nombre in propias if nombre in pasadas}
+
+    @staticmethod
+    def _solo_con_nodos(metodo: str, opciones: dict):
+        """
+        desde_rutas, cargar y abrir arman el árbol por dentro (insertar_lote, el
+        snapshot mapeado, el diario) y eso solo lo tiene el motor de nodos. Prefiero
+        un ValueError claro acá que un AttributeError a mitad de camino.
+        """
+        motor = opciones.get("motor", "nodos")
+        if motor != "nodos":
+            raise ValueError(f"{metodo}() solo funciona con el motor de nodos, no con el motor {motor}.")
+
+    def __init__(self, tam_cache: int = 1024, motor: str = "nodos", indice_nombres: bool = False,
+                 indice_texto: bool = False, concurrente: bool = False, deduplicar: bool = False,
+                 umbral_trozos: int = None, memoria_contenidos: int = None, ruta_derrame: str = None,
+                 metricas=False, indice_ancestros: bool = False, internar_nombres: bool = False):
         # Siempre empiezo con el nodo raíz "/"
         self.raiz = Nodo(nombre="/", tipo="carpeta")
 
+        # Caché LRU ruta -> (nodo, época en que lo guardé). Con tam_cache=0 queda apagada.
+        self.tam_cache = tam_cache
+        self._cache = OrderedDict()
+        self._epoca = 0               # Contador global que avanza con cada cambio de estructura
+        self.aciertos_cache = 0
+        self.fallos_cache = 0
+
+        # Durabilidad (ver abrir/compactar): diario de cambios y último número de secuencia
+        self._diario = None
+        self._lsn = 0
+        self.ruta_snapshot = None
+        self._mapas = []              # Snapshots mapeados por cargar() (los cierra cerrar())
+
+        # Índice global nombre/extensión -> nodos para buscar() (opcional, ocupa memoria)
+        self._indice_nombres = IndiceNombres() if indice_nombres else None
+        # Índice de texto completo sobre el contenido de los archivos (opcional)
+        self._indice_texto = IndiceTexto() if indice_texto else None
+        # Presupuesto de memoria para los contenidos: lo que no entra baja a disco (ver niveles.py)
+        self._niveles = GestorNiveles(memoria_contenidos, ruta_derrame) if memoria_contenidos is not None else None
+        # Almacén de contenidos deduplicados por hash (opcional, ver contenidos.py)
+        self._almacen = AlmacenContenidos(self._niveles) if deduplicar else None
+        # Los contenidos de más de 'umbral_trozos' caracteres se guardan en trozos comprimidos
+        self.umbral_trozos = umbral_trozos
+        # Recorrido de Euler de las carpetas para saber quién contiene a quién en O(log n) (opcional)
+        self._ancestros = IndiceAncestros(self.raiz) if indice_ancestros else None
+        # Nombres internados (un solo string por nombre repetido, ver rutas.py). Conviene si los
+        # nombres se repiten mucho ('src', '__init__.py'...); con nombres únicos ocupa más
+        self.internar_nombres = internar_nombres
+
+        # Métricas por operación (apagadas = sin ningún costo, ver metricas.py).
+        # metricas=True usa un registro nuevo; también se puede pasar uno propio.
+        self.metricas = None
+        self._capturados = ErroresCapturados()
+        if metricas:
+            self.activar_metricas(None if metricas is True else metricas)
+
     # =======================================================
     # FUNCIONALIDADES DÍA 1-2 (Búsqueda e Inserción)
     # =======================================================
@@ -21,20 +170,42 @@ class ArbolArchivos:
         """
         if ruta == "/":
             return self.raiz
-        
-        # Quito las barras iniciales/finales y separo la ruta en partes
-        partes = [p for p in ruta.split("/") if p]
+
+        if self.tam_cache > 0:
+            entrada = self._cache.get(ruta)
+            if entrada is not None:
+                nodo, epoca = entrada
+                if self._entrada_valida(nodo, epoca):
+                    self._cache.move_to_end(ruta)
+                    self.aciertos_cache += 1
+                    return nodo
+                del self._cache[ruta] # Algún ancestro cambió, la descarto
+            self.fallos_cache += 1
+
+        nodo = self._resolver_ruta(ruta)
+        if nodo is not None and self.tam_cache > 0:
+            self._cache[ruta] = (nodo, self._epoca)
+            if len(self._cache) > self.tam_cache:
+                self._cache.popitem(last=False) # Saco la ruta usada hace más tiempo
+        return nodo
+
+    def _resolver_ruta(self, ruta: str) -> Nodo:
+        """
+        Recorre el árbol desde la raíz siguiendo la ruta (sin usar la caché).
+        Si es una Ruta ya tengo sus partes internadas; si no, la parto una vez
+        y salteo las partes vacías de las barras de los bordes (sin armar otra lista).
+        """
+        partes = ruta.partes if type(ruta) is Ruta else ruta.split("/")
         nodo_actual = self.raiz
         
         for nombre_objetivo in partes:
-            encontrado = False
-            for hijo in nodo_actual.children:
-                if hijo.nombre == nombre_objetivo:
-                    nodo_actual = hijo
-                    encontrado = True
-                    break
+            if not nombre_objetivo:
+                continue
+            # Uso el índice de nombres del nodo en vez de recorrer todos sus hijos
+            # (es buscar_hijo sin el costo de llamarlo en cada nivel; un archivo tiene el índice vacío)
+            nodo_actual = nodo_actual.hijos_por_nombre.get(nombre_objetivo)
             
-            if not encontrado:
+            if nodo_actual is None:
                 return None # La ruta no existe, no lo encontré
                 
         return nodo_actual
@@ -44,21 +215,26 @@ class ArbolArchivos:
         padre = self.buscar_nodo_por_ruta(ruta_padre)
         
         if not padre:
-            print(f"Error: La ruta padre '{ruta_padre}' no existe.")
+            self._error(f"La ruta padre '{ruta_padre}' no existe.")
             return False
             
         if not padre.es_carpeta():
-            print(f"Error: '{ruta_padre}' no es una carpeta, no puedo agregar hijos aquí.")
+            self._error(f"'{ruta_padre}' no es una carpeta, no puedo agregar hijos aquí.")
             return False
 
         # Chequeo que no exista algo con el mismo nombre en esa carpeta
-        for hijo in padre.children:
-            if hijo.nombre == nombre:
-                print(f"Error: Ya existe '{nombre}' en '{ruta_padre}'.")
-                return False
+        if padre.buscar_hijo(nombre) is not None:
+            self._error(f"Ya existe '{nombre}' en '{ruta_padre}'.")
+            return False
 
-        nuevo_nodo = Nodo(nombre, tipo, contenido)
+        # Las carpetas no guardan texto (no se puede leer y el snapshot no lo guarda):
+        # si me pasan uno lo descarto, así los bytes totales no cambian al guardar y cargar
+        if tipo.lower() == "carpeta":
+            contenido = None
+        nuevo_nodo = Nodo(self._preparar_nombre(nombre), tipo, self._preparar_contenido(contenido))
         padre.agregar_hijo(nuevo_nodo)
+        self._indexar_nuevo(nuevo_nodo)
+        self._anotar(INSERTAR, ruta_padre, nombre, tipo, contenido)
         return True
 
     # =======================================================
@@ -68,18 +244,28 @@ class ArbolArchivos:
     def eliminar(self, ruta: str) -> bool:
         """Elimina el nodo en la ruta, borrando todo lo que contenga."""
         if ruta == "/":
-            print("Error: ¡No puedo eliminar la raíz!")
+            self._error("¡No puedo eliminar la raíz!")
             return False
 
         nodo_a_eliminar = self.buscar_nodo_por_ruta(ruta)
         
         if not nodo_a_eliminar:
-            print("Error: Nodo no encontrado.")
+            self._error("Nodo no encontrado.")
             return False
             
         padre = nodo_a_eliminar.padre
         if padre:
+            self._invalidar(nodo_a_eliminar)
             padre.eliminar_hijo(nodo_a_eliminar)
+            if self._indice_nombres is not None:
+                self._indice_nombres.quitar_subarbol(nodo_a_eliminar)
+            if self._indice_texto is not None:
+                self._indice_texto.quitar_subarbol(nodo_a_eliminar)
+            if self._ancestros is not None:
+                self._ancestros.quitar_subarbol(nodo_a_eliminar)
+            if self._almacen is not None or self._niveles is not None:
+                self._liberar_subarbol(nodo_a_eliminar)
+            self._anotar(ELIMINAR, ruta)
             return True
         return False
 
@@ -89,66 +275,174 @@ class ArbolArchivos:
         nuevo_padre = self.buscar_nodo_por_ruta(ruta_destino)
 
         if not nodo or not nuevo_padre:
-            print("Error: La ruta de origen o la de destino no son válidas.")
+            self._error("La ruta de origen o la de destino no son válidas.")
             return False
 
         if not nuevo_padre.es_carpeta():
-            print("Error: El destino debe ser una carpeta para poder mover algo dentro.")
+            self._error("El destino debe ser una carpeta para poder mover algo dentro.")
             return False
 
         # Evito mover una carpeta dentro de sí misma (error de ciclo)
-        tmp = nuevo_padre
-        while tmp:
-            if tmp == nodo:
-                print("Error: No puedes mover una carpeta dentro de sí misma o de un subdirectorio.")
-                return False
-            tmp = tmp.padre
-            
+        if self._contiene(nodo, nuevo_padre):
+            self._error("No puedes mover una carpeta dentro de sí misma o de un subdirectorio.")
+            return False
+
         # Evito duplicados en el destino
-        for hijo in nuevo_padre.children:
-            if hijo.nombre == nodo.nombre:
-                print(f"Error: Ya existe un elemento llamado '{nodo.nombre}' en el destino.")
-                return False
+        if nuevo_padre.buscar_hijo(nodo.nombre) is not None:
+            self._error(f"Ya existe un elemento llamado '{nodo.nombre}' en el destino.")
+            return False
 
-        # 1. Desconectar del padre anterior
+        # 1. Desconectar del padre anterior (las rutas viejas en caché dejan de valer)
+        self._invalidar(nodo)
         if nodo.padre:
             nodo.padre.eliminar_hijo(nodo)
         
         # 2. Conectar al nuevo padre
         nuevo_padre.agregar_hijo(nodo)
+        if self._ancestros is not None:
+            self._ancestros.mover(nodo, nuevo_padre)
+        self._anotar(MOVER, ruta_origen, ruta_destino)
         return True
 
+    def copiar(self, ruta_origen: str, ruta_destino: str) -> bool:
+        """
+        Copia un archivo o una carpeta entera dentro de la carpeta destino (como 'cp -r').
+        Los contenidos no se duplican: la copia usa los mismos textos (o los mismos
+        blobs del almacén, sumándoles una referencia).
+        """
+        nodo = self.buscar_nodo_por_ruta(ruta_origen)
+        nuevo_padre = self.buscar_nodo_por_ruta(ruta_destino)
+
+        if not nodo or not nuevo_padre or nodo is self.raiz:
+            self._error("La ruta de origen o la de destino no son válidas.")
+            return False
+
+        if not nuevo_padre.es_carpeta():
+            self._error("El destino debe ser una carpeta para poder copiar algo dentro.")
+            return False
+
+        # Igual que 'cp', no copio una carpeta dentro de sí misma
+        if self._contiene(nodo, nuevo_padre):
+            self._error("No puedes copiar una carpeta dentro de sí misma o de un subdirectorio.")
+            return False
+
+        if nuevo_padre.buscar_hijo(nodo.nombre) is not None:
+            self._error(f"Ya existe un elemento llamado '{nodo.nombre}' en el destino.")
+            return False
+
+        # Armo la copia suelta (con una pila) y la cuelgo al final: los hijos ya vienen ordenados
+        copia = self._copia_de(nodo)
+        pila = [(nodo, copia)]
+        while pila:
+            original, duplicado = pila.pop()
+            for hijo in original.children:
+                nuevo = self._copia_de(hijo)
+                duplicado.agregar_hijo_sin_ordenar(nuevo)
+                pila.append((hijo, nuevo))
+        nuevo_padre.agregar_hijo(copia)
+
+        if self._indice_nombres is not None or self._indice_texto is not None or self._ancestros is not None:
+            pila = [copia]
+            while pila:
+                actual = pila.pop()
+                self._indexar_nuevo(actual)
+                pila.extend(actual.children)
+        self._anotar(COPIAR, ruta_origen, ruta_destino)
+        return True
+
+    def _copia_de(self, nodo: Nodo) -> Nodo:
+        """
+        Un nodo nuevo con el mismo nombre, tipo y contenido (compartido), sin hijos.
+        Un ContenidoEnTrozos no se puede compartir: escribir_contenido y anexar_contenido
+        lo cambian en su lugar, así que la copia lleva su propia lista de trozos
+        (los trozos comprimidos sí se comparten, porque nunca se modifican).
+        """
+        contenido = nodo._contenido
+        if self._almacen is not None and es_blob(contenido):
+            contenido = self._almacen.compartir(contenido)
+        elif type(contenido) is ContenidoEnTrozos:
+            contenido = contenido.copia() # Se modifica en su lugar: cada archivo necesita su lista de trozos
+        elif type(contenido) is ContenidoEnNivel:
+            contenido = self._niveles.registrar(contenido.materializar()) # El gestor lo libera por archivo
+        return Nodo(nodo.nombre, nodo.tipo, contenido)
+
     def calcular_tamano(self, nodo=None) -> int:
-        """Calcula cuántos archivos y carpetas hay desde el punto dado (recursivo)."""
+        """
+        Calcula cuántos archivos y carpetas hay desde el punto dado.
+        Ya no recorro nada: cada nodo lleva el total de su subárbol al día (O(1)).
+        """
         if nodo is None:
             nodo = self.raiz
         
-        total = 1 # Me cuento a mí mismo (el nodo actual)
-        for hijo in nodo.children:
-            total += self.calcular_tamano(hijo)
-        return total
+        return nodo.total_nodos # Incluye al nodo actual
+
+    def estadisticas_tamano(self, ruta: str = "/") -> dict:
+        """
+        Retorna los totales del subárbol en la ruta: nodos, archivos, carpetas
+        y bytes de contenido (sirve para cuotas y tableros, en O(1)).
+        """
+        nodo = self.buscar_nodo_por_ruta(ruta)
+
+        if not nodo:
+            self._error(f"La ruta '{ruta}' no existe.")
+            return {}
+
+        return {
+            "nodos": nodo.total_nodos,
+            "archivos": nodo.total_archivos,
+            "carpetas": nodo.total_carpetas,
+            "bytes": nodo.total_bytes,
+        }
 
     # =======================================================
     # FUNCIONALIDADES DÍA 4 (Listar y Modificar)
     # =======================================================
 
-    def listar_contenido(self, ruta: str) -> list:
+    def listar_contenido(self, ruta: str, desde=None, limite: int = None, tipo: str = None,
+                         prefijo: str = None):
         """
         Muestra una lista de los elementos dentro de una carpeta (simula el comando 'ls').
+        Con 'tipo' y/o 'prefijo' solo entran esos (voy directo al prefijo, sin recorrer).
+
+        Para carpetas enormes se puede pedir de a páginas: con 'limite' (y 'desde')
+        retorna (página, cursor), y el cursor se pasa como 'desde' para la siguiente
+        (None cuando no hay más). El cursor es la última entrada (tipo, nombre) que
+        entregué, no una posición: si entre página y página insertan o renombran,
+        no se repite ni se salta nada de lo que estuvo todo el tiempo.
         """
+        paginado = desde is not None or limite is not None
+        if limite is not None and limite < 1:
+            self._error("El límite de una página tiene que ser al menos 1.")
+            return [], None
+
         nodo = self.buscar_nodo_por_ruta(ruta)
 
         if not nodo:
-            print(f"Error: La ruta '{ruta}' no existe.")
-            return []
+            self._error(f"La ruta '{ruta}' no existe.")
+            return ([], None) if paginado else []
         
         if nodo.es_carpeta():
-            # Devuelvo una lista de tuplas (tipo, nombre)
-            return [(hijo.tipo, hijo.nombre) for hijo in nodo.children]
+            if not paginado and tipo is None and not prefijo:
+                # Devuelvo una lista de tuplas (tipo, nombre); el nodo ya las tiene ordenadas
+                return nodo.listar_hijos()
+            pagina = nodo.pagina_hijos(desde, limite, tipo, prefijo)
         else:
             # Si es un archivo, solo me muestro a mí mismo
-            return [(nodo.tipo, nodo.nombre)]
+            pagina = _pagina_de_claves([(nodo.tipo, nodo.nombre)], desde, limite, tipo, prefijo)
+        return pagina if paginado else pagina[0]
 
+    def iterar_contenido(self, ruta: str, tipo: str = None, prefijo: str = None, desde=None,
+                         tamano_pagina: int = 1000):
+        """
+        Como listar_contenido pero de a poco: un generador que pide una página a la
+        vez (con el cursor), así nunca tengo la carpeta entera en una lista y se puede
+        seguir cambiando el árbol mientras la recorro.
+        """
+        while True:
+            pagina, desde = self.listar_contenido(ruta, desde, tamano_pagina, tipo, prefijo)
+            yield from pagina
+            if desde is None:
+                return
 
     def modificar_contenido(self, ruta: str, nuevo_contenido: str) -> bool:
         """
@@ -157,33 +451,41 @@ class ArbolArchivos:
         nodo = self.buscar_nodo_por_ruta(ruta)
 
         if not nodo:
-            print(f"Error: La ruta '{ruta}' no existe.")
+            self._error(f"La ruta '{ruta}' no existe.")
             return False
 
         if nodo.es_carpeta():
-            print(f"Error: '{ruta}' es una carpeta, no puedo modificar su contenido de texto.")
+            self._error(f"'{ruta}' es una carpeta, no puedo modificar su contenido de texto.")
             return False
 
         # ¡Es un archivo! Actualizo el contenido.
-        nodo.contenido = nuevo_contenido
+        self._reemplazar_contenido(nodo, nuevo_contenido)
+        self._anotar(MODIFICAR, ruta, nuevo_contenido)
         return True
 
     # =======================================================
     # FUNCIONALIDADES DÍA 5 (Leer y Renombrar)
     # =======================================================
 
-    def leer_archivo(self, ruta: str) -> str:
+    def leer_archivo(self, ruta: str, inicio: int = 0, largo: int = None) -> str:
         """
         Retorna el contenido completo de un archivo (simula el comando 'cat').
+        Con 'inicio' y/o 'largo' retorna solo esos caracteres; si el archivo está
+        en trozos, solo se descomprimen los trozos de ese rango.
         """
         nodo = self.buscar_nodo_por_ruta(ruta)
 
         if not nodo:
-            return f"Error: Archivo o ruta '{ruta}' no encontrado."
+            return self._error_de_lectura(f"Archivo o ruta '{ruta}' no encontrado.")
 
         if nodo.es_carpeta():
-            return f"Error: '{ruta}' es una carpeta, no puedo leer su contenido como archivo."
+            return self._error_de_lectura(f"'{ruta}' es una carpeta, no puedo leer su contenido como archivo.")
         
+        if inicio < 0 or (largo is not None and largo < 0):
+            return self._error_de_lectura("El inicio y el largo no pueden ser negativos.")
+        if inicio or largo is not None:
+            return self._leer_rango(nodo, inicio, largo)
+
         # Devolver el contenido del archivo
         return nodo.contenido if nodo.contenido is not None else "El archivo está vacío."
 
@@ -194,66 +496,724 @@ class ArbolArchivos:
         nodo = self.buscar_nodo_por_ruta(ruta)
 
         if not nodo or ruta == "/":
-            print(f"Error: Nodo en '{ruta}' no encontrado o no se puede renombrar la raíz.")
+            self._error(f"Nodo en '{ruta}' no encontrado o no se puede renombrar la raíz.")
             return False
 
         padre = nodo.padre
         
         # Validación: Evitar duplicados en el mismo directorio
-        for hijo in padre.children:
-            if hijo != nodo and hijo.nombre == nuevo_nombre:
-                print(f"Error: Ya existe un elemento llamado '{nuevo_nombre}' en esta ubicación.")
-                return False
+        existente = padre.buscar_hijo(nuevo_nombre)
+        if existente is not None and existente is not nodo:
+            self._error(f"Ya existe un elemento llamado '{nuevo_nombre}' en esta ubicación.")
+            return False
 
-        # Cambiar el nombre
-        nodo.nombre = nuevo_nombre
-        
-        # Vuelvo a ordenar los hijos de la carpeta padre para que el 'ls' siga siendo correcto
-        # (El método Nodo.agregar_hijo maneja el sort, pero como solo renombramos,
-        # lo forzamos en el padre).
-        padre.children.sort(key=lambda n: (n.tipo, n.nombre))
+        self._invalidar(nodo)
+
+        # Cambiar el nombre (el padre actualiza su índice y vuelve a ordenar
+        # sus hijos para que el 'ls' siga siendo correcto)
+        nombre_viejo = nodo.nombre
+        padre.renombrar_hijo(nodo, self._preparar_nombre(nuevo_nombre))
+        if self._indice_nombres is not None:
+            self._indice_nombres.renombrar(nodo, nombre_viejo)
+        self._anotar(RENOMBRAR, ruta, nuevo_nombre)
         
         return True
 
 
+    # =======================================================
+    # CARGA MASIVA (muchas rutas de una sola vez)
+    # =======================================================
+
+    def insertar_lote(self, entradas) -> ResultadoLote:
+        """
+        Inserta muchas rutas completas en una sola pasada. Cada entrada es
+        (ruta, tipo) o (ruta, tipo, contenido), por ejemplo ("/Docs/a.txt", "archivo", "hola").
+
+        - Las carpetas intermedias que falten se crean solas (como 'mkdir -p').
+        - Cada carpeta se ordena una sola vez al final, no en cada inserción.
+        - Los totales también se suman al final, en una pasada (no subiendo hasta la raíz por cada nodo).
+        - Los errores se guardan en el ResultadoLote, no se imprimen.
+        """
+        resultado = ResultadoLote()
+        carpetas = {"": self.raiz}  # Ruta de carpeta (sin barras de los bordes) -> Nodo
+        tocadas = {}                # Carpetas que recibieron hijos (id -> Nodo), para ordenarlas al final
+        nuevos = []                 # Nodos creados, en orden, para sumar los totales al final
+
+        try:
+            for entrada in entradas:
+                problema = _problema_de_entrada(entrada)
+                if problema is not None:
+                    ruta = entrada[0] if isinstance(entrada, (tuple, list)) and entrada else entrada
+                    resultado.errores.append((ruta, problema))
+                    continue
+                ruta, tipo = entrada[0], entrada[1]
+                contenido = entrada[2] if len(entrada) > 2 and tipo.lower() != "carpeta" else None # Ver insertar
+                partes = partes_de(ruta)
+                if not partes:
+                    resultado.errores.append((ruta, "No se puede insertar la raíz."))
+                    continue
+
+                nombre = partes[-1]
+                clave_padre = "/".join(partes[:-1])
+                padre = carpetas.get(clave_padre)
+                if padre is None:
+                    padre = self._carpeta_para_lote(partes[:-1], carpetas, tocadas, nuevos, resultado)
+                    if padre is None:
+                        resultado.errores.append((ruta, f"'/{clave_padre}' no es una carpeta."))
+                        continue
+
+                existente = padre.buscar_hijo(nombre)
+                if existente is not None:
+                    # Pedir una carpeta que ya existe no es error (igual que 'mkdir -p')
+                    if not (existente.es_carpeta() and tipo.lower() == "carpeta"):
+                        resultado.errores.append((ruta, f"Ya existe '{nombre}' en '/{clave_padre}'."))
+                    continue
+
+                nuevo_nodo = Nodo(self._preparar_nombre(nombre), tipo, self._preparar_contenido(contenido))
+                tocadas[id(padre)] = padre # Antes de agregarlo: si algo falla después, igual la ordeno
+                padre.agregar_hijo_sin_totales(nuevo_nodo)
+                nuevos.append(nuevo_nodo)
+                resultado.insertados += 1
+                self._indexar_nuevo(nuevo_nodo)
+                self._anotar(INSERTAR, "/" + clave_padre, nombre, tipo, contenido)
+        finally:
+            # Aunque una entrada lance una excepción, las carpetas tocadas no pueden quedar
+            # desordenadas (la búsqueda binaria de eliminar/renombrar tocaría otro hijo)
+            # ni con los totales sin sumar
+            sumar_totales_de_nuevos(nuevos)
+            for carpeta in tocadas.values():
+                carpeta.ordenar_hijos()
+        return resultado
+
+    def _carpeta_para_lote(self, partes: list, carpetas: dict, tocadas: dict, nuevos: list,
+                           resultado: ResultadoLote) -> Nodo:
+        """
+        Baja desde la raíz por las partes de la ruta, creando las carpetas que falten
+        y recordando cada prefijo en 'carpetas'. Retorna None si alguna parte es un archivo.
+        """
+        nodo_actual = self.raiz
+        for i, nombre in enumerate(partes):
+            clave = "/".join(partes[:i + 1])
+            siguiente = carpetas.get(clave)
+            if siguiente is None:
+                siguiente = nodo_actual.buscar_hijo(nombre)
+                if siguiente is None:
+                    siguiente = Nodo(self._preparar_nombre(nombre), "carpeta")
+                    tocadas[id(nodo_actual)] = nodo_actual
+                    nodo_actual.agregar_hijo_sin_totales(siguiente)
+                    nuevos.append(siguiente)
+                    resultado.carpetas_creadas += 1
+                    self._indexar_nuevo(siguiente)
+                    self._anotar(INSERTAR, "/" + "/".join(partes[:i]), nombre, "carpeta", None)
+                elif not siguiente.es_carpeta():
+                    return None
+                carpetas[clave] = siguiente
+            nodo_actual = siguiente
+        return nodo_actual
+
+    @classmethod
+    def desde_rutas(cls, entradas, **opciones):
+        """
+        Crea un árbol nuevo y lo llena con insertar_lote.
+        Retorna (arbol, resultado) para poder revisar los errores.
+        """
+        cls._solo_con_nodos("desde_rutas", opciones)
+        arbol = cls(**opciones)
+        return arbol, arbol.insertar_lote(entradas)
+
+    # =======================================================
+    # TRANSACCIONES (varios cambios, todos o ninguno)
+    # =======================================================
+
+    def transaccion(self) -> Transaccion:
+        """
+        Abre un lote de cambios (insertar, eliminar, mover, renombrar y
+        modificar_contenido) que se aplica entero al confirmar, o no se aplica
+        nada si alguna operación falla (ver transacciones.py). Se usa con 'with':
+
+            with fs.transaccion() as t:
+                t.insertar("/Docs", "a.txt", "archivo", "hola")
+                t.eliminar("/Temp")
+        """
+        return Transaccion(self)
+
+    def _aplicar_transaccion(self, transaccion: Transaccion):
+        """Aplica el lote y lo anota en el diario como un solo registro (todo o nada también al reproducir)."""
+        error = aplicar_transaccion(self, transaccion)
+        if error is None:
+            self._anotar(TRANSACCION, *transaccion.campos())
+        else:
+            self._error(transaccion.describir_error(error))
+        return error
+
+    # =======================================================
+    # ANÁLISIS DE TODO EL ÁRBOL (en paralelo, con procesos)
+    # =======================================================
+
+    def analizar(self, procesos: int = None, top: int = 10, profundidad_maxima: int = 1) -> dict:
+        """
+        Totales, archivos y bytes por extensión, histograma de tamaños de archivo,
+        las 'top' carpetas más pesadas y el 'du' de las carpetas hasta
+        'profundidad_maxima', calculados por un grupo de procesos (ver analisis.py).
+        Para analizar varias veces, conviene un AnalisisParalelo propio (reusa los procesos).
+        """
+        from analisis import AnalisisParalelo
+        with AnalisisParalelo(procesos) as analisis:
+            return analisis.analizar_arbol(self, top, profundidad_maxima)
+
+    def _exportar_metadatos(self) -> tuple:
+        """La tabla y los nombres del snapshot, sin contenidos (para analisis.py)."""
+        from persistencia import exportar_metadatos
+        return exportar_metadatos(self)
+
+    # =======================================================
+    # SNAPSHOTS EN DISCO
+    # =======================================================
+
+    def guardar(self, ruta: str):
+        """Guarda todo el árbol en un snapshot binario (ver persistencia.py)."""
+        from persistencia import guardar_snapshot
+        guardar_snapshot(self, ruta)
+
+    @classmethod
+    def cargar(cls, ruta: str, verificar_contenido: bool = False, **opciones):
+        """
+        Crea un árbol desde un snapshot. El archivo se mapea en memoria, así que
+        arrancar es casi instantáneo y los contenidos se leen recién al usarlos.
+        """
+        cls._solo_con_nodos("cargar", opciones)
+        from persistencia import cargar_snapshot
+        arbol = cargar_snapshot(cls(**opciones), ruta, verificar_contenido)
+        arbol._reconstruir_indices()
+        return arbol
+
+    def _reconstruir_indices(self):
+        """Vuelvo a llenar los índices opcionales después de armar el árbol por fuera (snapshot)."""
+        if self._indice_nombres is not None:
+            self._indice_nombres = IndiceNombres()
+        if self._indice_texto is not None:
+            self._indice_texto = IndiceTexto()
+        ancestros, self._ancestros = self._ancestros, None # Este lo armo entero de una vez, en O(n)
+        if self._indice_nombres is not None or self._indice_texto is not None:
+            for _, nodo in self.recorrer_dfs():
+                if nodo is not self.raiz:
+                    self._indexar_nuevo(nodo)
+        if ancestros is not None:
+            self._ancestros = IndiceAncestros(self.raiz)
+
+    def _indexar_nuevo(self, nodo: Nodo):
+        """Agrego un nodo recién creado a los índices opcionales que estén activos."""
+        if self._indice_nombres is not None:
+            self._indice_nombres.agregar(nodo)
+        if self._indice_texto is not None and not nodo.es_carpeta():
+            self._indice_texto.indexar(nodo, nodo.contenido)
+        if self._ancestros is not None:
+            self._ancestros.agregar(nodo)
+
+    # =======================================================
+    # DIARIO DE CAMBIOS (durabilidad entre snapshots)
+    # =======================================================
+
+    @classmethod
+    def abrir(cls, ruta_snapshot: str, ruta_diario: str, lote_fsync: int = 64,
+              intervalo_fsync: float = 0.05, **opciones):
+        """
+        Abre un árbol durable: cargo el último snapshot (si existe), reproduzco
+        encima los cambios del diario que el snapshot no tenga, y desde ahí cada
+        cambio exitoso se anota en el diario (con fsync en grupo, ver diario.py).
+        """
+        cls._solo_con_nodos("abrir", opciones)
+        if os.path.exists(ruta_snapshot):
+            arbol = cls.cargar(ruta_snapshot, **opciones)
+        else:
+            arbol = cls(**opciones)
+        arbol.ruta_snapshot = ruta_snapshot
+
+        diario = Diario(ruta_diario, lote_fsync, intervalo_fsync)
+        arbol._reproducir(diario)
+        diario.abrir_para_escribir()
+        arbol._diario = diario
+        return arbol
+
+    def _reproducir(self, diario: Diario):
+        """
+        Aplico los registros del diario más nuevos que el snapshot cargado.
+        Las inserciones seguidas las junto y las paso por insertar_lote (mucho más rápido).
+        """
+        aplicar = {
+            ELIMINAR: self.eliminar,
+            MOVER: self.mover,
+            COPIAR: self.copiar,
+            ANEXAR: self.anexar_contenido,
+            ESCRIBIR: lambda ruta, inicio, texto: self.escribir_contenido(ruta, int(inicio), texto),
+            MODIFICAR: self.modificar_contenido,
+            RENOMBRAR: self.renombrar,
+            TRANSACCION: lambda *campos: Transaccion.desde_campos(self, campos).confirmar(),
+        }
+        inserciones = []
+        for lsn, operacion, campos in diario.leer_registros():
+            if lsn <= self._lsn:
+                continue # Ya estaba incluido en el snapshot
+            if operacion == INSERTAR:
+                ruta_padre, nombre, tipo, contenido = campos
+                inserciones.append((ruta_padre.rstrip("/") + "/" + nombre, tipo, contenido))
+            else:
+                if inserciones:
+                    self.insertar_lote(inserciones)
+                    inserciones = []
+                aplicar[operacion](*campos)
+            self._lsn = lsn
+        if inserciones:
+            self.insertar_lote(inserciones)
+
+    def _anotar(self, operacion: int, *campos):
+        """Si hay diario, anoto el cambio con el siguiente número de secuencia."""
+        if self._diario is not None:
+            self._lsn += 1
+            self._diario.registrar(self._lsn, operacion, *campos)
+
+    def compactar(self):
+        """
+        Vuelca todo el diario en un snapshot nuevo y lo deja vacío.
+        El snapshot guarda el último LSN, así que si se corta entre los dos pasos
+        los registros viejos del diario simplemente se saltan al reproducir.
+        """
+        if self._diario is None or self.ruta_snapshot is None:
+            self._error("El árbol no se abrió con abrir(), no hay diario para compactar.")
+            return False
+        self._diario.sincronizar()
+        self.guardar(self.ruta_snapshot)
+        self._diario.vaciar()
+        return True
+
+    def cerrar(self):
+        """
+        Escribe en disco lo que quede pendiente del diario y lo cierra. También suelta
+        el snapshot mapeado por cargar() y cierra el archivo de derrame de los niveles
+        (memoria_contenidos): los contenidos que todavía no se leyeron del snapshot o
+        que bajaron a disco vienen de ahí, así que después de cerrar() ya no se pueden leer.
+        """
+        if self._diario is not None:
+            self._diario.cerrar()
+            self._diario = None
+        for mapa in self._mapas:
+            mapa.close()
+        self._mapas = []
+        if self._niveles is not None:
+            self._niveles.cerrar() # Con ruta_derrame=None es un temporal: se borra al cerrarlo
+
+    # =======================================================
+    # CACHÉ DE RUTAS (invalidación por generaciones)
+    # =======================================================
+
+    def _entrada_valida(self, nodo: Nodo, epoca: int) -> bool:
+        """
+        Una ruta guardada sigue siendo válida si ningún nodo del camino (ni él mismo)
+        cambió después de guardarla, y si el camino todavía llega hasta la raíz.
+        """
+        actual = nodo
+        while actual.padre is not None:
+            if actual.generacion > epoca:
+                return False
+            actual = actual.padre
+        return actual is self.raiz
+
+    def _invalidar(self, nodo: Nodo):
+        """Marco el nodo como cambiado: todas las rutas que pasan por él dejan de valer."""
+        self._epoca += 1
+        nodo.generacion = self._epoca
+
+    def estadisticas_cache(self) -> dict:
+        """Retorna los aciertos y fallos de la caché de rutas para poder dimensionarla."""
+        consultas = self.aciertos_cache + self.fallos_cache
+        return {
+            "aciertos": self.aciertos_cache,
+            "fallos": self.fallos_cache,
+            "tasa_aciertos": self.aciertos_cache / consultas if consultas else 0.0,
+            "entradas": len(self._cache),
+            "capacidad": self.tam_cache,
+        }
+
+
+    # =======================================================
+    # ANCESTROS (quién contiene a quién)
+    # =======================================================
+
+    def es_ancestro(self, ruta_a: str, ruta_b: str) -> bool:
+        """
+        True si lo que está en ruta_a contiene (a cualquier profundidad) a lo que
+        está en ruta_b. Con ArbolArchivos(indice_ancestros=True) es O(log n); sin
+        el índice subo por los padres de ruta_b (O(profundidad)).
+        """
+        a = self.buscar_nodo_por_ruta(ruta_a)
+        b = self.buscar_nodo_por_ruta(ruta_b)
+        if a is None or b is None:
+            self._error("Alguna de las dos rutas no existe.")
+            return False
+        return a is not b and self._contiene(a, b)
+
+    def profundidad(self, ruta: str) -> int:
+        """Cuántas carpetas hay entre la ruta y la raíz (la raíz es 0, '/Docs' es 1). -1 si no existe."""
+        nodo = self.buscar_nodo_por_ruta(ruta)
+        if nodo is None:
+            self._error(f"La ruta '{ruta}' no existe.")
+            return -1
+        if self._ancestros is not None:
+            return self._ancestros.profundidad(nodo)
+        profundidad = 0
+        while nodo.padre is not None:
+            profundidad += 1
+            nodo = nodo.padre
+        return profundidad
+
+    def _contiene(self, a: Nodo, b: Nodo) -> bool:
+        """'a' es 'b' o uno de sus ancestros (para no mover ni copiar una carpeta dentro de sí misma)."""
+        # El índice cuesta lo mismo a cualquier profundidad, pero subir unos pocos
+        # padres es más barato: lo consulto solo si 'b' está muy abajo
+        actual, niveles = b, 0
+        while actual is not None:
+            if actual is a:
+                return True
+            niveles += 1
+            if niveles == NIVELES_SIN_INDICE and self._ancestros is not None:
+                return self._ancestros.contiene(a, b)
+            actual = actual.padre
+        return False
+
+    # =======================================================
+    # ALMACÉN DE CONTENIDOS (deduplicación)
+    # =======================================================
+
+    def _preparar_nombre(self, nombre: str) -> str:
+        """Con internar_nombres, el nombre pasa por la tabla de símbolos; si no, lo dejo igual."""
+        return sys.intern(nombre) if self.internar_nombres else nombre
+
+    def _preparar_contenido(self, contenido):
+        """Con el almacén activo, cambio el texto por su blob compartido; si no, lo dejo igual."""
+        if self.umbral_trozos is not None and type(contenido) is str and len(contenido) > self.umbral_trozos:
+            return ContenidoEnTrozos.desde_texto(contenido) # Los grandes van en trozos (no se deduplican)
+        if self._almacen is not None and type(contenido) is str:
+            return self._almacen.guardar(contenido)
+        if self._niveles is not None and type(contenido) is str:
+            return self._niveles.registrar(contenido)
+        return contenido
+
+    def _liberar_contenido(self, contenido):
+        """El archivo que tenía este contenido ya no lo usa (le resto la referencia al blob)."""
+        if self._almacen is not None and es_blob(contenido):
+            self._almacen.liberar(contenido)
+        elif self._niveles is not None and type(contenido) is ContenidoEnNivel:
+            self._niveles.liberar(contenido)
+
+    def _reemplazar_contenido(self, nodo: Nodo, nuevo_contenido: str):
+        """Pongo el contenido nuevo (preparado para el almacén o en trozos) y suelto el anterior."""
+        anterior = nodo._contenido
+        nodo.contenido = self._preparar_contenido(nuevo_contenido)
+        self._liberar_contenido(anterior)
+        if self._indice_texto is not None:
+            self._indice_texto.indexar(nodo, nuevo_contenido)
+
+    def estadisticas_memoria(self) -> dict:
+        """
+        Cómo le va al presupuesto de memoria de los contenidos: tasa de aciertos,
+        desalojos a disco y bytes residentes. Necesita ArbolArchivos(memoria_contenidos=...).
+        """
+        if self._niveles is None:
+            self._error("No hay presupuesto de memoria (usa ArbolArchivos(memoria_contenidos=bytes)).")
+            return {}
+        return self._niveles.estadisticas()
+
+    def _liberar_subarbol(self, nodo: Nodo):
+        pila = [nodo]
+        while pila:
+            actual = pila.pop()
+            self._liberar_contenido(actual._contenido)
+            pila.extend(actual.children)
+
+    def estadisticas_contenido(self) -> dict:
+        """
+        Cuánto se ahorra con la deduplicación: blobs distintos, referencias,
+        bytes lógicos vs. guardados y la proporción entre ellos.
+        Necesita ArbolArchivos(deduplicar=True).
+        """
+        if self._almacen is None:
+            self._error("La deduplicación no está activada (usa ArbolArchivos(deduplicar=True)).")
+            return {}
+        return self._almacen.estadisticas()
+
+    # =======================================================
+    # CONTENIDOS GRANDES (rangos, escrituras parciales y lectura por partes)
+    # =======================================================
+
+    def escribir_contenido(self, ruta: str, inicio: int, texto: str) -> bool:
+        """
+        Escribe 'texto' sobre el archivo a partir del carácter 'inicio' (si pasa del
+        final, el archivo crece). En un archivo en trozos solo se tocan los trozos afectados.
+        """
+        nodo = self._archivo_para_escribir(ruta)
+        if nodo is None:
+            return False
+
+        largo = self._largo_contenido(nodo)
+        if not 0 <= inicio <= largo:
+            self._error(f"La posición {inicio} está fuera del archivo '{ruta}' (tiene {largo} caracteres).")
+            return False
+
+        self._escribir_en(nodo, inicio, texto)
+        self._anotar(ESCRIBIR, ruta, str(inicio), texto)
+        return True
+
+    def anexar_contenido(self, ruta: str, texto: str) -> bool:
+        """Agrega 'texto' al final del archivo (como abrirlo en modo 'a')."""
+        nodo = self._archivo_para_escribir(ruta)
+        if nodo is None:
+            return False
+
+        self._escribir_en(nodo, self._largo_contenido(nodo), texto)
+        self._anotar(ANEXAR, ruta, texto)
+        return True
+
+    def leer_por_partes(self, ruta: str, tamano: int = TAMANO_TROZO):
+        """
+        Generador que entrega el contenido del archivo de a 'tamano' caracteres,
+        para procesar archivos grandes sin tenerlos enteros en memoria.
+        """
+        nodo = self.buscar_nodo_por_ruta(ruta)
+
+        if not nodo or nodo.es_carpeta():
+            self._error(f"'{ruta}' no es un archivo.")
+            return
+        if tamano <= 0:
+            self._error("El tamaño de cada parte tiene que ser positivo.")
+            return
+
+        inicio = 0
+        while True:
+            parte = self._leer_rango(nodo, inicio, tamano)
+            if parte:
+                yield parte
+            if len(parte) < tamano:
+                return
+            inicio += tamano
+
+    def _archivo_para_escribir(self, ruta: str) -> Nodo:
+        """El nodo del archivo en la ruta, o None (con el error ya mostrado)."""
+        nodo = self.buscar_nodo_por_ruta(ruta)
+
+        if not nodo:
+            self._error(f"La ruta '{ruta}' no existe.")
+            return None
+
+        if nodo.es_carpeta():
+            self._error(f"'{ruta}' es una carpeta, no puedo modificar su contenido de texto.")
+            return None
+        return nodo
+
+    def _largo_contenido(self, nodo: Nodo) -> int:
+        contenido = nodo._contenido
+        if type(contenido) is ContenidoEnTrozos:
+            return contenido.longitud
+        return len(nodo.contenido or "")
+
+    def _leer_rango(self, nodo: Nodo, inicio: int, largo: int) -> str:
+        contenido = nodo._contenido
+        if es_blob(contenido) and type(contenido.texto) is ContenidoEnSnapshot:
+            contenido = contenido.texto # Blob que viene de un snapshot: leo el rango del mapa
+        if type(contenido) is ContenidoEnTrozos or type(contenido) is ContenidoEnSnapshot:
+            return contenido.leer(inicio, largo) # Sin decodificar el archivo entero
+        texto = nodo.contenido or ""
+        return texto[inicio:] if largo is None else texto[inicio:inicio + largo]
+
+    def _escribir_en(self, nodo: Nodo, inicio: int, texto: str):
+        contenido = nodo._contenido
+        if type(contenido) is ContenidoEnTrozos:
+            # Lo cambio en su lugar y aviso a los ancestros cuántos bytes cambió
+            antes = contenido.longitud_bytes
+            contenido.escribir(inicio, texto)
+            nodo._propagar_totales(0, 0, 0, contenido.longitud_bytes - antes)
+            if self._indice_texto is not None:
+                self._indice_texto.indexar(nodo, nodo.contenido)
+        else:
+            # Texto normal (o blob compartido, que no puedo tocar): armo el texto nuevo entero
+            actual = nodo.contenido or ""
+            self._reemplazar_contenido(nodo, actual[:inicio] + texto + actual[inicio + len(texto):])
+
+    # =======================================================
+    # MÉTRICAS (_error y capturar_errores vienen de ManejoDeErrores, ver errores.py)
+    # =======================================================
+
+    def activar_metricas(self, registro=None):
+        """
+        Empiezo a medir cada método público: llamadas, errores, histograma de
+        latencia, nodos visitados al resolver rutas y ancho de las carpetas que
+        recorro. Retorna el registro (RegistroMetricas, o cualquier objeto con
+        contar/observar/medidor, por ejemplo para mandar todo a otro sistema).
+        """
+        if self.metricas is not None:
+            self.desactivar_metricas()
+        self.metricas = RegistroMetricas() if registro is None else registro
+        instrumentar(self, self.metricas)
+        return self.metricas
+
+    def desactivar_metricas(self):
+        """Vuelvo a los métodos originales (las métricas juntadas quedan en el registro)."""
+        if self.metricas is not None:
+            desinstrumentar(self)
+            self.metricas = None
+
+    # =======================================================
+    # RECORRIDOS ITERATIVOS (sin recursión, perezosos)
+    # =======================================================
+
+    def recorrer_dfs(self, ruta: str = "/"):
+        """
+        Recorre en profundidad (preorden, en el orden del 'ls') y va entregando
+        (ruta, nodo) de a uno. Uso una pila de iteradores, así la memoria es
+        O(profundidad) y no hay límite de recursión.
+        """
+        inicio = self.buscar_nodo_por_ruta(ruta)
+        if not inicio:
+            self._error(f"La ruta '{ruta}' no existe.")
+            return
+
+        ruta = "/" + "/".join(p for p in ruta.split("/") if p) # La normalizo una vez
+        yield ruta, inicio
+        pila = [(iter(inicio.children), ruta if ruta != "/" else "")]
+        while pila:
+            hijos, ruta_padre = pila[-1]
+            hijo = next(hijos, None)
+            if hijo is None:
+                pila.pop()
+                continue
+            ruta_hijo = ruta_padre + "/" + hijo.nombre
+            yield ruta_hijo, hijo
+            if hijo.children:
+                pila.append((iter(hijo.children), ruta_hijo))
+
+    def recorrer_bfs(self, ruta: str = "/"):
+        """
+        Recorre por niveles y entrega (ruta, nodo). La cola guarda carpetas
+        pendientes (no todos sus hijos), así que crece con el ancho de un nivel.
+        """
+        inicio = self.buscar_nodo_por_ruta(ruta)
+        if not inicio:
+            self._error(f"La ruta '{ruta}' no existe.")
+            return
+
+        ruta = "/" + "/".join(p for p in ruta.split("/") if p)
+        yield ruta, inicio
+        cola = deque([(inicio, ruta if ruta != "/" else "")])
+        while cola:
+            carpeta, ruta_carpeta = cola.popleft()
+            for hijo in carpeta.children:
+                ruta_hijo = ruta_carpeta + "/" + hijo.nombre
+                yield ruta_hijo, hijo
+                if hijo.children:
+                    cola.append((hijo, ruta_hijo))
+
+    def recorrer(self, ruta: str = "/"):
+        """
+        Parecido a os.walk: por cada carpeta entrega (ruta, carpetas, archivos),
+        con los nombres de sus subcarpetas y de sus archivos, de arriba hacia abajo.
+        """
+        for ruta_actual, nodo in self.recorrer_dfs(ruta):
+            if nodo.es_carpeta():
+                carpetas = [hijo.nombre for hijo in nodo.children if hijo.es_carpeta()]
+                archivos = [hijo.nombre for hijo in nodo.children if not hijo.es_carpeta()]
+                yield ruta_actual, carpetas, archivos
+
+    # =======================================================
+    # BÚSQUEDA POR PATRONES
+    # =======================================================
+
+    def buscar(self, patron: str, regex: bool = False, sobre: str = "ruta") -> list:
+        """
+        Busca nodos por patrón y retorna sus rutas ordenadas.
+          - Glob (por defecto): '*', '?', '[abc]' dentro de un nombre y '**' para
+            cualquier cantidad de carpetas. Ej: '**/*.py', '/Docs/**', '/Apps/?ain.py'.
+          - regex=True: expresión regular sobre la ruta completa o sobre el nombre (sobre="nombre").
+        Con ArbolArchivos(indice_nombres=True) los '**/nombre' y '**/*.ext' no recorren el árbol.
+        """
+        if regex:
+            return buscar_regex(self, patron, sobre)
+        return buscar_glob(self, patron)
+
+    def buscar_texto(self, consulta: str) -> list:
+        """
+        Busca dentro del contenido de los archivos y retorna [(ruta, puntaje)],
+        los que más veces tienen las palabras primero. Necesita ArbolArchivos(indice_texto=True).
+        Sintaxis: 'a b' (las dos), 'a OR b' (alguna), '"a b"' (frase exacta).
+        """
+        if self._indice_texto is None:
+            self._error("El índice de texto no está activado (usa ArbolArchivos(indice_texto=True)).")
+            return []
+        return [(self.ruta_de(nodo), puntaje) for nodo, puntaje in self._indice_texto.buscar(consulta)]
+
+    def ruta_de(self, nodo: Nodo) -> str:
+        """Arma la ruta completa de un nodo subiendo por sus padres."""
+        partes = []
+        while nodo.padre is not None:
+            partes.append(nodo.nombre)
+            nodo = nodo.padre
+        return "/" + "/".join(reversed(partes))
+
     # =======================================================
     # UTILIDAD: Visualización del Árbol (para depuración)
     # =======================================================
 
-    def mostrar_arbol(self):
-        """Función auxiliar que me ayuda a ver la estructura completa del árbol."""
-        print("\n--- Estructura del Árbol de Archivos ---")
-        self._mostrar_arbol_recursivo(self.raiz)
-        print("---------------------------------------")
+    def mostrar_arbol(self, flujo=None, lineas_por_bloque: int = 1000):
+        """
+        Función auxiliar que me ayuda a ver la estructura completa del árbol.
+        Escribe en cualquier flujo de texto (por defecto la pantalla), juntando
+        las líneas en bloques en vez de hacer un print por nodo.
+        """
+        if flujo is None:
+            flujo = sys.stdout
+
+        bloque = ["\n--- Estructura del Árbol de Archivos ---"]
+        bloque.append(self._linea_arbol(self.raiz, ""))
+
+        # Pila de (hijos, posición del siguiente, prefijo de esos hijos): sin recursión
+        pila = [(self.raiz.children, 0, "")]
+        while pila:
+            hijos, i, prefijo = pila[-1]
+            if i == len(hijos):
+                pila.pop()
+                continue
+            pila[-1] = (hijos, i + 1, prefijo)
 
-    def _mostrar_arbol_recursivo(self, nodo, prefijo=""):
-        """Función recursiva para dibujar el árbol con indentación."""
-        
-        simbolo = "[CARPETA]" if nodo.es_carpeta() else "[ARCHIVO]"
-        
-        # Muestro el nodo actual
-        linea = f"{prefijo}{simbolo} {nodo.nombre}"
-        if not nodo.es_carpeta():
-            # Si es archivo, muestro un pedacito de su contenido
-            extracto = nodo.contenido[:30].replace('\n', ' ') + "..." if nodo.contenido and len(nodo.contenido) > 30 else nodo.contenido
-            linea += f" (Contenido: '{extracto}')" if extracto else " (Vacío)"
-            
-        print(linea)
-        
-        # Recorro a los hijos
-        num_hijos = len(nodo.children)
-        for i, hijo in enumerate(nodo.children):
             # Calculo el prefijo para dibujar las líneas de conexión (como un árbol)
-            es_ultimo = (i == num_hijos - 1)
-            
-            if es_ultimo:
-                conexion = "└── "
-                nuevo_prefijo = prefijo + "    "
-            else:
-                conexion = "├── "
-                nuevo_prefijo = prefijo + "│   "
-            
-            self._mostrar_arbol_recursivo(hijo, nuevo_prefijo)
+            es_ultimo = (i == len(hijos) - 1)
+            nuevo_prefijo = prefijo + ("    " if es_ultimo else "│   ")
+            hijo = hijos[i]
+            bloque.append(self._linea_arbol(hijo, nuevo_prefijo))
+            if hijo.children:
+                pila.append((hijo.children, 0, nuevo_prefijo))
+
+            if len(bloque) >= lineas_por_bloque:
+                flujo.write("\n".join(bloque) + "\n")
+                bloque = []
+
+        bloque.append("---------------------------------------")
+        flujo.write("\n".join(bloque) + "\n")
+
+    def _linea_arbol(self, nodo, prefijo: str) -> str:
+        """Arma la línea de un nodo para mostrar_arbol."""
+        if nodo.es_carpeta():
+            return f"{prefijo}[CARPETA] {nodo.nombre}"
+
+        # Si es archivo, muestro un pedacito de su contenido (sin leerlo entero)
+        contenido = self._leer_rango(nodo, 0, 31)
+        extracto = contenido[:30].replace('\n', ' ') + "..." if contenido and len(contenido) > 30 else contenido
+        return f"{prefijo}[ARCHIVO] {nodo.nombre}" + (f" (Contenido: '{extracto}')" if extracto else " (Vacío)")
+
+
+class ArbolConcurrente(ModoConcurrente, ArbolArchivos):
+    """
+    ArbolArchivos seguro para varios hilos, con candados de lectores/escritor
+    por nodo (ver concurrencia.py). Se crea con ArbolArchivos(concurrente=True).
+    """
+
 
 # =======================================================
 # EJEMPLO DE USO Y PRUEBA COMPLETA DE DÍAS 1-5
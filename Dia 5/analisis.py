@@ -0,0 +1,274 @@
+"""
+Análisis de todo el árbol en paralelo, con un grupo de procesos.
+
+Para saber cuánto pesa cada carpeta, cuántos archivos hay de cada extensión o
+cuáles son las carpetas más pesadas hay que mirar todos los nodos, y con
+millones eso en un solo hilo tarda (y más hilos no ayudan, por el GIL). Acá
+reparto el trabajo entre procesos sin mandarles ni un solo Nodo:
+
+  - La tabla del snapshot (persistencia.py) ya tiene todo lo que necesito: un
+    registro fijo por nodo, en preorden, con el índice del padre, si es carpeta,
+    dónde está su nombre y cuántos bytes tiene su contenido. Si el árbol ya está
+    guardado en un snapshot, cada proceso mapea ese archivo; si no, copio la
+    tabla y los nombres (sin contenidos) a un bloque de memoria compartida.
+  - Cada proceso recibe un rango de filas. En preorden el padre de una fila
+    siempre está antes que ella, así que sumo de abajo hacia arriba dentro del
+    rango, y lo que le toca a un padre de antes del rango (que siempre es un
+    ancestro de la primera fila) lo devuelvo como "arrastre".
+  - Las carpetas del rango cuyo subárbol sigue después del rango ("abiertas")
+    todavía no tienen su total: las devuelvo aparte y al juntar les sumo los
+    arrastres de los rangos siguientes. Las demás ya están cerradas y de esas
+    cada proceso me manda solo las N más pesadas.
+
+Juntar los resultados cuesta O(rangos x profundidad), no O(nodos).
+"""
+import heapq
+import mmap
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+from persistencia import ubicar_tabla, _REGISTRO, _ES_CARPETA
+
+# Con menos filas que esto por rango, repartir cuesta más de lo que ahorra
+FILAS_MINIMAS_POR_RANGO = 50_000
+RANGOS_POR_PROCESO = 4 # Más rangos que procesos, para que ninguno quede esperando al más lento
+
+
+# =======================================================
+# EN CADA PROCESO (funciones sueltas para poder mandarlas al grupo)
+# =======================================================
+
+def _abrir_fuente(fuente):
+    """Retorna (buffer, función para cerrarlo) del snapshot o de la memoria compartida."""
+    tipo, nombre = fuente[0], fuente[1]
+    if tipo == "snapshot":
+        with open(nombre, "rb") as archivo:
+            mapa = mmap.mmap(archivo.fileno(), 0, access=mmap.ACCESS_READ)
+        return mapa, mapa.close
+    memoria = shared_memory.SharedMemory(name=nombre)
+    return memoria.buf, memoria.close
+
+
+def _analizar_rango(fuente, inicio: int, fin: int, top: int, profundidad_maxima: int) -> dict:
+    buffer, cerrar = _abrir_fuente(fuente)
+    _, _, _, inicio_tabla, inicio_nombres, largo_nombres = fuente
+    vista = memoryview(buffer)
+    tabla = vista[inicio_tabla:inicio_nombres]
+    nombres = vista[inicio_nombres:inicio_nombres + largo_nombres]
+    try:
+        return _Rango(tabla, nombres, inicio, fin).analizar(top, profundidad_maxima)
+    finally:
+        # Sin vistas vivas, si no el buffer no se deja cerrar
+        nombres.release()
+        tabla.release()
+        vista.release()
+        cerrar()
+
+
+class _Rango:
+    """Las filas [inicio, fin) de la tabla y lo que hace falta para leer fuera de ellas."""
+
+    def __init__(self, tabla, nombres, inicio: int, fin: int):
+        self.tabla = tabla
+        self.nombres = nombres
+        self.inicio = inicio
+        self.fin = fin
+        self.cantidad = len(tabla) // _REGISTRO.size
+
+    def padre_de(self, fila: int) -> int:
+        return _REGISTRO.unpack_from(self.tabla, fila * _REGISTRO.size)[0]
+
+    def ruta_de(self, fila: int) -> str:
+        """Subo por los padres leyendo la tabla (solo para las carpetas que voy a devolver)."""
+        partes = []
+        while fila > 0:
+            padre, _, posicion, largo, _, _ = _REGISTRO.unpack_from(self.tabla, fila * _REGISTRO.size)
+            partes.append(str(self.nombres[posicion:posicion + largo], "utf-8"))
+            fila = padre
+        return "/" + "/".join(reversed(partes))
+
+    def analizar(self, top: int, profundidad_maxima: int) -> dict:
+        inicio, fin = self.inicio, self.fin
+        tamano = _REGISTRO.size
+        filas = list(_REGISTRO.iter_unpack(self.tabla[inicio * tamano:fin * tamano]))
+
+        # Los ancestros de la primera fila (de su padre hasta la raíz) y sus profundidades
+        cadena = []
+        padre = filas[0][0]
+        while padre >= 0:
+            cadena.append(padre)
+            padre = self.padre_de(padre)
+        profundidades = {fila: len(cadena) - 1 - k for k, fila in enumerate(cadena)}
+
+        # Los nombres están en el mismo orden que las filas: copio los de mi rango de una vez
+        base = filas[0][2]
+        bloque = bytes(self.nombres[base:filas[-1][2] + filas[-1][3]])
+
+        # Hacia adelante: profundidad de cada carpeta y lo que aporta cada archivo
+        archivos = bytes_total = 0
+        por_extension = {} # Extensión tal como está en los bytes -> [archivos, bytes]
+        tamanos = {}
+        carpetas = []
+        for i, (padre, banderas, posicion, largo, _, longitud) in enumerate(filas):
+            if banderas & _ES_CARPETA:
+                fila = inicio + i
+                profundidades[fila] = profundidades[padre] + 1 if padre >= 0 else 0
+                carpetas.append(fila)
+                continue
+            archivos += 1
+            bytes_total += longitud
+            # Igual que extension_de: el último punto, pero no el primer carácter
+            # (el punto es ASCII, así que lo busco en los bytes sin decodificar)
+            desde = posicion - base
+            punto = bloque.rfind(b".", desde + 1, desde + largo)
+            extension = bloque[punto:desde + largo] if punto >= 0 else b""
+            cuenta = por_extension.get(extension)
+            if cuenta is None:
+                por_extension[extension] = [1, longitud]
+            else:
+                cuenta[0] += 1
+                cuenta[1] += longitud
+            cota = 1 << longitud.bit_length()
+            tamanos[cota] = tamanos.get(cota, 0) + 1
+
+        # Hacia atrás: cada fila le suma sus bytes a su padre (si está antes del rango, va al arrastre)
+        bytes_de = [0] * len(filas)
+        arrastre = {}
+        for i in range(len(filas) - 1, -1, -1):
+            padre, banderas, _, _, _, longitud = filas[i]
+            aporte = bytes_de[i] if banderas & _ES_CARPETA else longitud
+            if padre >= inicio:
+                bytes_de[padre - inicio] += aporte
+            elif padre >= 0 and aporte:
+                arrastre[padre] = arrastre.get(padre, 0) + aporte
+
+        # Las carpetas abiertas son los ancestros (dentro del rango) de la fila que sigue al rango
+        abiertas = {}
+        if fin < self.cantidad:
+            fila = self.padre_de(fin)
+            while fila >= inicio:
+                abiertas[fila] = (bytes_de[fila - inicio], profundidades[fila], self.ruta_de(fila))
+                fila = self.padre_de(fila)
+
+        cerradas = [fila for fila in carpetas if fila not in abiertas]
+        pesadas = heapq.nlargest(top, cerradas, key=lambda fila: bytes_de[fila - inicio])
+        return {
+            "nodos": len(filas),
+            "archivos": archivos,
+            "bytes": bytes_total,
+            "por_extension": por_extension,
+            "tamanos": tamanos,
+            "pesadas": [(bytes_de[fila - inicio], self.ruta_de(fila)) for fila in pesadas],
+            "du": {self.ruta_de(fila): bytes_de[fila - inicio] for fila in cerradas
+                   if profundidades[fila] <= profundidad_maxima},
+            "abiertas": abiertas,
+            "arrastre": arrastre,
+            "cadena": cadena,
+        }
+
+
+# =======================================================
+# EN EL PROCESO PRINCIPAL
+# =======================================================
+
+def _juntar(resultados: list, top: int, profundidad_maxima: int) -> dict:
+    """Sumo los parciales y completo las carpetas abiertas con los arrastres de los rangos siguientes."""
+    extra = {}
+    for resultado in resultados:
+        # El arrastre a un ancestro también es de todos los ancestros de él (la cadena va hacia la raíz)
+        acumulado = 0
+        for fila in resultado["cadena"]:
+            acumulado += resultado["arrastre"].get(fila, 0)
+            if acumulado:
+                extra[fila] = extra.get(fila, 0) + acumulado
+
+    total = {"nodos": 0, "archivos": 0, "carpetas": 0, "bytes": 0}
+    por_extension, tamanos, du, pesadas = {}, {}, {}, []
+    for resultado in resultados:
+        total["nodos"] += resultado["nodos"]
+        total["archivos"] += resultado["archivos"]
+        total["bytes"] += resultado["bytes"]
+        for extension, (cantidad, bytes_) in resultado["por_extension"].items():
+            extension = str(extension, "utf-8").lower() # Recién acá junto '.TXT' con '.txt'
+            cuenta = por_extension.setdefault(extension, {"archivos": 0, "bytes": 0})
+            cuenta["archivos"] += cantidad
+            cuenta["bytes"] += bytes_
+        for cota, cantidad in resultado["tamanos"].items():
+            tamanos[cota] = tamanos.get(cota, 0) + cantidad
+        du.update(resultado["du"])
+        pesadas.extend(resultado["pesadas"])
+        for fila, (bytes_, profundidad, ruta) in resultado["abiertas"].items():
+            bytes_ += extra.get(fila, 0)
+            pesadas.append((bytes_, ruta))
+            if profundidad <= profundidad_maxima:
+                du[ruta] = bytes_
+    total["carpetas"] = total["nodos"] - total["archivos"]
+    total["por_extension"] = dict(sorted(por_extension.items(), key=lambda par: -par[1]["bytes"]))
+    total["tamanos_archivos"] = dict(sorted(tamanos.items()))
+    total["carpetas_mas_pesadas"] = [(ruta, bytes_) for bytes_, ruta in heapq.nlargest(top, pesadas)]
+    total["du"] = dict(sorted(du.items()))
+    return total
+
+
+class AnalisisParalelo:
+    """
+    Agregados de todo el árbol (du por carpeta, histogramas y las carpetas más
+    pesadas) calculados por un grupo de procesos. El grupo se crea la primera vez
+    y se reusa entre análisis; se cierra con cerrar() o usándolo con 'with'.
+    """
+
+    def __init__(self, procesos: int = None):
+        self.procesos = procesos or os.cpu_count() or 1
+        self._grupo = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excepcion):
+        self.cerrar()
+
+    def cerrar(self):
+        if self._grupo is not None:
+            self._grupo.shutdown()
+            self._grupo = None
+
+    def analizar_arbol(self, arbol, top: int = 10, profundidad_maxima: int = 1) -> dict:
+        """
+        Copio la tabla del árbol (sin contenidos) a memoria compartida y la analizo.
+        Esa copia recorre los Nodos en un solo proceso y cuesta más o menos lo mismo
+        que el análisis entero sin procesos: para analizar seguido un árbol grande
+        conviene guardarlo y usar analizar_snapshot.
+        """
+        cantidad, tabla, nombres = arbol._exportar_metadatos()
+        memoria = shared_memory.SharedMemory(create=True, size=max(len(tabla) + len(nombres), 1))
+        try:
+            memoria.buf[:len(tabla)] = tabla
+            memoria.buf[len(tabla):len(tabla) + len(nombres)] = nombres
+            del tabla, nombres # Ya están en la memoria compartida
+            fuente = ("memoria", memoria.name, cantidad, 0, _REGISTRO.size * cantidad, memoria.size)
+            return self._analizar(fuente, cantidad, top, profundidad_maxima)
+        finally:
+            memoria.close()
+            memoria.unlink()
+
+    def analizar_snapshot(self, ruta: str, top: int = 10, profundidad_maxima: int = 1) -> dict:
+        """Cada proceso mapea el snapshot por su cuenta: no hace falta cargar el árbol."""
+        cantidad, inicio_tabla, inicio_nombres, largo_nombres = ubicar_tabla(ruta)
+        fuente = ("snapshot", ruta, cantidad, inicio_tabla, inicio_nombres, largo_nombres)
+        return self._analizar(fuente, cantidad, top, profundidad_maxima)
+
+    def _analizar(self, fuente, cantidad: int, top: int, profundidad_maxima: int) -> dict:
+        piezas = min(self.procesos * RANGOS_POR_PROCESO, -(-cantidad // FILAS_MINIMAS_POR_RANGO))
+        paso = -(-cantidad // piezas)
+        rangos = [(inicio, min(inicio + paso, cantidad)) for inicio in range(0, cantidad, paso)]
+        if self.procesos == 1 or len(rangos) == 1:
+            resultados = [_analizar_rango(fuente, inicio, fin, top, profundidad_maxima)
+                          for inicio, fin in rangos]
+        else:
+            if self._grupo is None:
+                self._grupo = ProcessPoolExecutor(self.procesos)
+            futuros = [self._grupo.submit(_analizar_rango, fuente, inicio, fin, top, profundidad_maxima)
+                       for inicio, fin in rangos]
+            resultados = [futuro.result() for futuro in futuros]
+        return _juntar(resultados, top, profundidad_maxima)
@@ -0,0 +1,245 @@
+"""
+Índice de ancestros para mi ArbolArchivos (recorrido de Euler guardado en un treap).
+
+Para no mover una carpeta dentro de sí misma, mover() subía por los padres desde
+el destino hasta la raíz: O(profundidad) en cada movida, y en árboles profundos
+reorganizar mucho se nota. Con este índice guardo el recorrido de Euler de las
+carpetas: cada carpeta aparece dos veces, una "entrada" antes de todo su
+subárbol y una "salida" después. Los intervalos [entrada, salida] quedan
+anidados o separados, así que A es ancestro de B si y solo si la entrada de B
+cae entre la entrada y la salida de A.
+
+La secuencia vive en un treap implícito (árbol binario ordenado por posición y
+balanceado con prioridades al azar), así que:
+  - la posición de una ficha se calcula subiendo hasta la raíz del treap: O(log n);
+  - una carpeta con todo lo que tiene adentro es un rango contiguo: moverla es
+    cortar ese rango y pegarlo después de la entrada del nuevo padre, O(log n)
+    sin importar cuántas carpetas tenga;
+  - cada entrada pesa +1 y cada salida -1, y cada ficha guarda la suma de su
+    subárbol del treap: la profundidad de una carpeta es la suma hasta su entrada.
+
+Solo indexo carpetas (un archivo no puede tener nada adentro; para preguntar por
+un archivo uso su carpeta padre). La raíz está siempre y envuelve a todo.
+Eliminar sí cuesta O(carpetas del subárbol), porque tengo que olvidar cada una.
+"""
+from random import random
+
+# Hasta esta profundidad, subir por los padres es más rápido que preguntarle al treap
+NIVELES_SIN_INDICE = 32
+
+
+class _Ficha:
+    """Un elemento del recorrido de Euler (la entrada o la salida de una carpeta) y un nodo del treap."""
+    __slots__ = ("izq", "der", "padre", "prioridad", "tamano", "peso", "suma", "nodo", "salida")
+
+    def __init__(self, peso: int, nodo=None):
+        self.izq = None
+        self.der = None
+        self.padre = None
+        self.prioridad = random()
+        self.tamano = 1          # Fichas en mi subárbol del treap
+        self.peso = peso         # +1 si es una entrada, -1 si es una salida
+        self.suma = peso         # Suma de los pesos de mi subárbol del treap
+        self.nodo = nodo         # La carpeta (solo en las entradas)
+        self.salida = None       # En una entrada: la salida de la misma carpeta
+
+
+def _actualizar(ficha: _Ficha):
+    tamano, suma = 1, ficha.peso
+    izq, der = ficha.izq, ficha.der
+    if izq is not None:
+        tamano += izq.tamano
+        suma += izq.suma
+    if der is not None:
+        tamano += der.tamano
+        suma += der.suma
+    ficha.tamano = tamano
+    ficha.suma = suma
+
+
+def _unir(a: _Ficha, b: _Ficha) -> _Ficha:
+    """Pega la secuencia b después de la a (la recursión es de O(log n) niveles)."""
+    if a is None:
+        return b
+    if b is None:
+        return a
+    if a.prioridad > b.prioridad:
+        a.der = _unir(a.der, b)
+        a.der.padre = a
+        _actualizar(a)
+        return a
+    b.izq = _unir(a, b.izq)
+    b.izq.padre = b
+    _actualizar(b)
+    return b
+
+
+def _partir(ficha: _Ficha, cantidad: int):
+    """Separa la secuencia en (las primeras 'cantidad' fichas, el resto)."""
+    if ficha is None:
+        return None, None
+    izquierda = ficha.izq.tamano if ficha.izq is not None else 0
+    if cantidad <= izquierda:
+        primeras, resto = _partir(ficha.izq, cantidad)
+        ficha.izq = resto
+        if resto is not None:
+            resto.padre = ficha
+        _actualizar(ficha)
+        if primeras is not None:
+            primeras.padre = None
+        ficha.padre = None
+        return primeras, ficha
+    primeras, resto = _partir(ficha.der, cantidad - izquierda - 1)
+    ficha.der = primeras
+    if primeras is not None:
+        primeras.padre = ficha
+    _actualizar(ficha)
+    if resto is not None:
+        resto.padre = None
+    ficha.padre = None
+    return ficha, resto
+
+
+def _posicion(ficha: _Ficha) -> int:
+    """Cuántas fichas hay antes de esta en la secuencia (subiendo hasta la raíz del treap)."""
+    posicion = ficha.izq.tamano if ficha.izq is not None else 0
+    padre = ficha.padre
+    while padre is not None:
+        if padre.der is ficha:
+            posicion += 1 + (padre.izq.tamano if padre.izq is not None else 0)
+        ficha, padre = padre, padre.padre
+    return posicion
+
+
+def _suma_hasta(ficha: _Ficha) -> int:
+    """La suma de los pesos desde el principio hasta esta ficha (incluida)."""
+    suma = ficha.peso + (ficha.izq.suma if ficha.izq is not None else 0)
+    padre = ficha.padre
+    while padre is not None:
+        if padre.der is ficha:
+            suma += padre.peso + (padre.izq.suma if padre.izq is not None else 0)
+        ficha, padre = padre, padre.padre
+    return suma
+
+
+def _armar_treap(fichas: list) -> _Ficha:
+    """
+    Arma el treap de una secuencia ya ordenada en O(n), con una pila (árbol
+    cartesiano): cada ficha nueva se queda con las de menor prioridad como hijo izquierdo.
+    """
+    pila = []
+    for ficha in fichas:
+        ultima = None
+        while pila and pila[-1].prioridad < ficha.prioridad:
+            ultima = pila.pop()
+            _actualizar(ultima) # Su subárbol ya no cambia más
+        ficha.izq = ultima
+        if ultima is not None:
+            ultima.padre = ficha
+        if pila:
+            pila[-1].der = ficha
+            ficha.padre = pila[-1]
+        pila.append(ficha)
+    for ficha in reversed(pila):
+        _actualizar(ficha)
+    return pila[0] if pila else None
+
+
+class IndiceAncestros:
+    """Responde 'A contiene a B' y la profundidad de un nodo en O(log n)."""
+
+    def __init__(self, raiz):
+        self._entradas = {} # carpeta -> su ficha de entrada
+        self._raiz = _armar_treap(self._recorrido_de(raiz))
+
+    def _recorrido_de(self, carpeta) -> list:
+        """Las fichas del recorrido de Euler de las carpetas bajo 'carpeta' (sin recursión)."""
+        fichas = []
+        pila = [carpeta]
+        while pila:
+            actual = pila.pop()
+            if type(actual) is _Ficha:
+                fichas.append(actual) # La salida de una carpeta que ya recorrí entera
+                continue
+            entrada = _Ficha(1, actual)
+            entrada.salida = _Ficha(-1)
+            self._entradas[actual] = entrada
+            fichas.append(entrada)
+            pila.append(entrada.salida)
+            pila.extend(hijo for hijo in actual.children if hijo.es_carpeta())
+        return fichas
+
+    # =======================================================
+    # CAMBIOS (los archivos no están en el índice: los ignoro)
+    # =======================================================
+
+    def agregar(self, nodo):
+        """Una carpeta recién colgada de su padre (sus hijos se agregan después, cada uno)."""
+        if not nodo.es_carpeta():
+            return
+        entrada = _Ficha(1, nodo)
+        entrada.salida = _Ficha(-1)
+        self._entradas[nodo] = entrada
+        self._pegar_debajo(nodo.padre, _unir(entrada, entrada.salida))
+
+    def mover(self, nodo, nuevo_padre):
+        """La carpeta (con todo su subárbol) ahora cuelga de 'nuevo_padre'."""
+        if nodo.es_carpeta():
+            self._pegar_debajo(nuevo_padre, self._cortar(nodo))
+
+    def quitar_subarbol(self, nodo):
+        """Saco la carpeta y todas las que tenga adentro."""
+        if not nodo.es_carpeta():
+            return
+        pila = [self._cortar(nodo)]
+        while pila:
+            ficha = pila.pop()
+            if ficha.nodo is not None:
+                del self._entradas[ficha.nodo]
+            if ficha.izq is not None:
+                pila.append(ficha.izq)
+            if ficha.der is not None:
+                pila.append(ficha.der)
+
+    def _cortar(self, carpeta) -> _Ficha:
+        """Saca de la secuencia el rango [entrada, salida] de la carpeta y lo retorna como treap suelto."""
+        entrada = self._entradas[carpeta]
+        inicio, fin = _posicion(entrada), _posicion(entrada.salida) + 1
+        antes, resto = _partir(self._raiz, inicio)
+        rango, despues = _partir(resto, fin - inicio)
+        self._raiz = _unir(antes, despues)
+        return rango
+
+    def _pegar_debajo(self, padre, rango: _Ficha):
+        """Pego el rango justo después de la entrada del padre (el orden entre hermanos no importa)."""
+        posicion = _posicion(self._entradas[padre]) + 1
+        antes, despues = _partir(self._raiz, posicion)
+        self._raiz = _unir(_unir(antes, rango), despues)
+
+    # =======================================================
+    # CONSULTAS
+    # =======================================================
+
+    def contiene(self, a, b) -> bool:
+        """True si 'a' es 'b' o uno de sus ancestros."""
+        if not a.es_carpeta():
+            return a is b
+        if not b.es_carpeta():
+            b = b.padre # Un archivo está adentro de lo mismo que su carpeta (y de ella)
+            if b is None:
+                return False
+        entrada_a, entrada_b = self._entradas[a], self._entradas[b]
+        if entrada_a is entrada_b:
+            return True
+        inicio = _posicion(entrada_a)
+        posicion = _posicion(entrada_b)
+        return inicio < posicion and posicion < _posicion(entrada_a.salida)
+
+    def profundidad(self, nodo) -> int:
+        """Cuántas carpetas hay entre el nodo y la raíz (la raíz tiene profundidad 0)."""
+        if not nodo.es_carpeta():
+            return self.profundidad(nodo.padre) + 1
+        return _suma_hasta(self._entradas[nodo]) - 1
+
+    def estadisticas(self) -> dict:
+        return {"carpetas": len(self._entradas), "fichas": self._raiz.tamano if self._raiz else 0}
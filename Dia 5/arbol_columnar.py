@@ -0,0 +1,699 @@
+import sys
+from array import array # Arreglos compactos de enteros (mucho más livianos que listas de objetos)
+from bisect import bisect_left, insort
+
+from nodo import CARPETA, ARCHIVO, _bytes_de, _pagina_de_claves
+from diario import INSERTAR, ELIMINAR, MOVER, MODIFICAR, RENOMBRAR
+from errores import ManejoDeErrores, ErroresCapturados
+from transacciones import Transaccion
+from trozos import TAMANO_TROZO
+
+SIN_NODO = -1 # Marca "no hay nodo" dentro de los arreglos de índices
+
+# Banderas que guardo en un solo byte por nodo
+_VIVO = 1
+_ES_CARPETA = 2
+
+
+def _clave(padre: int, id_nombre: int) -> int:
+    """Junta (fila del padre, id del nombre) en un solo entero para el índice de hijos."""
+    return (padre << 32) | id_nombre
+
+
+class NodoColumnar:
+    """
+    Vista liviana de un nodo del motor columnar. No guarda datos propios: solo
+    el árbol y el índice de la fila, y lee todo de los arreglos cuando se pide.
+    Así el resto del código puede usar 'nodo.nombre', 'nodo.es_carpeta()', etc.
+    """
+    __slots__ = ("arbol", "indice")
+
+    def __init__(self, arbol, indice: int):
+        self.arbol = arbol
+        self.indice = indice
+
+    def __eq__(self, otro):
+        return isinstance(otro, NodoColumnar) and otro.arbol is self.arbol and otro.indice == self.indice
+
+    def __hash__(self):
+        return hash(self.indice)
+
+    def __repr__(self):
+        return f"<{self.tipo.upper()}: {self.nombre} (fila {self.indice})>"
+
+    @property
+    def nombre(self) -> str:
+        return self.arbol._nombres[self.arbol._nombre_id[self.indice]]
+
+    @property
+    def tipo(self) -> str:
+        return CARPETA if self.es_carpeta() else ARCHIVO
+
+    @property
+    def contenido(self) -> str:
+        return self.arbol._contenidos[self.indice]
+
+    @property
+    def padre(self):
+        indice_padre = self.arbol._padre[self.indice]
+        return None if indice_padre == SIN_NODO else NodoColumnar(self.arbol, indice_padre)
+
+    @property
+    def children(self) -> list:
+        """Hijos en el mismo orden que el 'ls', por (tipo, nombre)."""
+        return [NodoColumnar(self.arbol, i) for i in self.arbol._hijos_ordenados(self.indice)]
+
+    def es_carpeta(self) -> bool:
+        return bool(self.arbol._banderas[self.indice] & _ES_CARPETA)
+
+    # Los totales no se guardan en las filas (ocuparían 4 columnas más): los cuento
+    # recorriendo el subárbol, así que acá son O(tamaño del subárbol) y no O(1)
+    @property
+    def total_nodos(self) -> int:
+        return self.arbol._totales(self.indice)[0]
+
+    @property
+    def total_archivos(self) -> int:
+        return self.arbol._totales(self.indice)[1]
+
+    @property
+    def total_carpetas(self) -> int:
+        return self.arbol._totales(self.indice)[2]
+
+    @property
+    def total_bytes(self) -> int:
+        return self.arbol._totales(self.indice)[3]
+
+
+class ArbolColumnar(ManejoDeErrores):
+    """
+    Motor alternativo de mi sistema de archivos para árboles muy grandes.
+    En vez de un objeto Nodo por elemento, guardo cada nodo como una "fila"
+    repartida en arreglos paralelos:
+
+      - _padre, _primer_hijo, _siguiente, _anterior: la estructura (primer hijo / hermanos)
+      - _banderas: si la fila está viva y si es carpeta
+      - _nombre_id: el nombre como número, apuntando a una tabla de nombres sin repetir
+      - _contenidos: el texto de los archivos
+
+    Las filas de los nodos eliminados van a una lista libre y se reutilizan.
+    Tiene la misma API básica que ArbolArchivos (se elige con ArbolArchivos(motor="columnar")),
+    con las mismas firmas: listar de a páginas, leer rangos, copiar, escribir en el
+    medio, transacciones y capturar_errores (así el servidor también lo puede usar).
+    No tiene caché, índices, diario, deduplicación ni modo concurrente.
+    """
+    _diario = None # Sin diario (el servidor lo pregunta para saber si tiene que esperar un fsync)
+
+    def __init__(self):
+        self._padre = array("i")
+        self._primer_hijo = array("i")
+        self._siguiente = array("i")
+        self._anterior = array("i")
+        self._nombre_id = array("i")
+        self._banderas = bytearray()
+        self._contenidos = []
+
+        # Tabla de nombres sin repetir: id -> nombre y nombre -> id
+        self._nombres = []
+        self._id_de_nombre = {}
+
+        # Índice (padre, nombre) -> fila, para no recorrer los hermanos al buscar.
+        # La clave es un solo entero (ver _clave), más liviano que una tupla.
+        self._hijo_por_nombre = {}
+
+        self._libres = [] # Filas de nodos eliminados que puedo reutilizar
+
+        # Claves (tipo, nombre) ordenadas de cada carpeta ya listada, para no ordenar
+        # todos los hijos en cada página. La armo la primera vez que se lista la carpeta
+        # y después la mantengo al día en _enlazar, _desenlazar y _cambiar_nombre.
+        self._ls_ordenado = {}
+
+        self._raiz = self._nueva_fila(SIN_NODO, "/", True, None)
+        self.raiz = NodoColumnar(self, self._raiz)
+        self._capturados = ErroresCapturados()
+
+    # =======================================================
+    # MANEJO DE FILAS
+    # =======================================================
+
+    def _id_nombre(self, nombre: str) -> int:
+        """Retorna el número de un nombre, agregándolo a la tabla si es nuevo."""
+        id_nombre = self._id_de_nombre.get(nombre)
+        if id_nombre is None:
+            id_nombre = len(self._nombres)
+            self._nombres.append(nombre)
+            self._id_de_nombre[nombre] = id_nombre
+        return id_nombre
+
+    def _nueva_fila(self, padre: int, nombre: str, es_carpeta: bool, contenido) -> int:
+        """Ocupa una fila (reutilizando una libre si hay) con los datos del nodo."""
+        banderas = _VIVO | (_ES_CARPETA if es_carpeta else 0)
+        id_nombre = self._id_nombre(nombre)
+        if self._libres:
+            fila = self._libres.pop()
+            self._padre[fila] = padre
+            self._primer_hijo[fila] = SIN_NODO
+            self._siguiente[fila] = SIN_NODO
+            self._anterior[fila] = SIN_NODO
+            self._nombre_id[fila] = id_nombre
+            self._banderas[fila] = banderas
+            self._contenidos[fila] = contenido
+        else:
+            fila = len(self._padre)
+            self._padre.append(padre)
+            self._primer_hijo.append(SIN_NODO)
+            self._siguiente.append(SIN_NODO)
+            self._anterior.append(SIN_NODO)
+            self._nombre_id.append(id_nombre)
+            self._banderas.append(banderas)
+            self._contenidos.append(contenido)
+        return fila
+
+    def _enlazar(self, padre: int, fila: int):
+        """Conecto la fila como primer hijo de 'padre' (lista doblemente enlazada de hermanos)."""
+        primero = self._primer_hijo[padre]
+        self._padre[fila] = padre
+        self._anterior[fila] = SIN_NODO
+        self._siguiente[fila] = primero
+        if primero != SIN_NODO:
+            self._anterior[primero] = fila
+        self._primer_hijo[padre] = fila
+        self._hijo_por_nombre[_clave(padre, self._nombre_id[fila])] = fila
+        claves = self._ls_ordenado.get(padre)
+        if claves is not None:
+            insort(claves, self._clave_ls(fila))
+
+    def _desenlazar(self, fila: int):
+        """Saco la fila de la lista de hermanos de su padre en O(1)."""
+        padre = self._padre[fila]
+        anterior = self._anterior[fila]
+        siguiente = self._siguiente[fila]
+        if anterior != SIN_NODO:
+            self._siguiente[anterior] = siguiente
+        else:
+            self._primer_hijo[padre] = siguiente
+        if siguiente != SIN_NODO:
+            self._anterior[siguiente] = anterior
+        del self._hijo_por_nombre[_clave(padre, self._nombre_id[fila])]
+        claves = self._ls_ordenado.get(padre)
+        if claves is not None:
+            del claves[bisect_left(claves, self._clave_ls(fila))]
+        self._padre[fila] = SIN_NODO
+        self._anterior[fila] = SIN_NODO
+        self._siguiente[fila] = SIN_NODO
+
+    def _hijos(self, fila: int):
+        """Recorre los hijos directos de una fila (en orden de inserción)."""
+        hijo = self._primer_hijo[fila]
+        while hijo != SIN_NODO:
+            yield hijo
+            hijo = self._siguiente[hijo]
+
+    def _hijos_ordenados(self, fila: int) -> list:
+        """Los hijos ordenados como en el 'ls' de ArbolArchivos: por (tipo, nombre)."""
+        nombres = self._nombres
+        return sorted(self._hijos(fila),
+                      key=lambda h: (CARPETA if self._banderas[h] & _ES_CARPETA else ARCHIVO,
+                                     nombres[self._nombre_id[h]]))
+
+    def _claves_ordenadas(self, fila: int) -> list:
+        """Las claves del 'ls' de una carpeta, ordenadas (la lista guardada, no hay que modificarla)."""
+        claves = self._ls_ordenado.get(fila)
+        if claves is None:
+            claves = self._ls_ordenado[fila] = [self._clave_ls(h) for h in self._hijos_ordenados(fila)]
+        return claves
+
+    def _buscar_hijo(self, fila: int, nombre: str) -> int:
+        id_nombre = self._id_de_nombre.get(nombre)
+        if id_nombre is None:
+            return SIN_NODO # Ningún nodo se llama así en todo el árbol
+        return self._hijo_por_nombre.get(_clave(fila, id_nombre), SIN_NODO)
+
+    def _es_carpeta(self, fila: int) -> bool:
+        return bool(self._banderas[fila] & _ES_CARPETA)
+
+    def _clave_ls(self, fila: int) -> tuple:
+        """(tipo, nombre) de una fila, como las entradas de listar_contenido."""
+        return (CARPETA if self._es_carpeta(fila) else ARCHIVO, self._nombres[self._nombre_id[fila]])
+
+    def _liberar_subarbol(self, fila: int):
+        """Libero la fila (ya desenlazada) y todas las de su subárbol (con una pila, sin recursión)."""
+        pila = [fila]
+        while pila:
+            actual = pila.pop()
+            pila.extend(self._hijos(actual))
+            if actual != fila:
+                del self._hijo_por_nombre[_clave(self._padre[actual], self._nombre_id[actual])]
+            self._ls_ordenado.pop(actual, None)
+            self._banderas[actual] = 0
+            self._contenidos[actual] = None
+            self._primer_hijo[actual] = SIN_NODO
+            self._libres.append(actual)
+
+    def _totales(self, fila: int) -> tuple:
+        """(nodos, archivos, carpetas, bytes) del subárbol de la fila."""
+        nodos = archivos = carpetas = bytes_ = 0
+        pila = [fila]
+        while pila:
+            actual = pila.pop()
+            nodos += 1
+            if self._es_carpeta(actual):
+                carpetas += 1
+                pila.extend(self._hijos(actual))
+            else:
+                archivos += 1
+                bytes_ += _bytes_de(self._contenidos[actual])
+        return nodos, archivos, carpetas, bytes_
+
+    def _es_ancestro_fila(self, a: int, b: int) -> bool:
+        """'a' es 'b' o uno de sus ancestros (subo por los padres de 'b')."""
+        while b != SIN_NODO:
+            if b == a:
+                return True
+            b = self._padre[b]
+        return False
+
+    # =======================================================
+    # API (igual que ArbolArchivos)
+    # =======================================================
+
+    def buscar_nodo_por_ruta(self, ruta: str) -> NodoColumnar:
+        """Recorre las filas siguiendo una ruta como '/Docs/archivo.txt'."""
+        fila = self._buscar_fila(ruta)
+        return None if fila == SIN_NODO else NodoColumnar(self, fila)
+
+    def _buscar_fila(self, ruta: str) -> int:
+        fila = self._raiz
+        for nombre_objetivo in ruta.split("/"):
+            if not nombre_objetivo:
+                continue
+            fila = self._buscar_hijo(fila, nombre_objetivo)
+            if fila == SIN_NODO:
+                return SIN_NODO
+        return fila
+
+    def insertar(self, ruta_padre: str, nombre: str, tipo: str, contenido: str = None) -> bool:
+        """Inserta un nuevo archivo o carpeta en la ruta de su padre."""
+        padre = self._buscar_fila(ruta_padre)
+
+        if padre == SIN_NODO:
+            self._error(f"La ruta padre '{ruta_padre}' no existe.")
+            return False
+
+        if not self._es_carpeta(padre):
+            self._error(f"'{ruta_padre}' no es una carpeta, no puedo agregar hijos aquí.")
+            return False
+
+        if self._buscar_hijo(padre, nombre) != SIN_NODO:
+            self._error(f"Ya existe '{nombre}' en '{ruta_padre}'.")
+            return False
+
+        es_carpeta = tipo.lower() == CARPETA
+        # Las carpetas no guardan texto (igual que en ArbolArchivos): lo descarto
+        fila = self._nueva_fila(padre, nombre, es_carpeta, None if es_carpeta else contenido)
+        self._enlazar(padre, fila)
+        return True
+
+    def eliminar(self, ruta: str) -> bool:
+        """Elimina el nodo en la ruta y libera las filas de todo lo que contenga."""
+        fila = self._fila_para_eliminar(ruta)
+        if fila == SIN_NODO:
+            return False
+        self._desenlazar(fila)
+        self._liberar_subarbol(fila)
+        return True
+
+    def _fila_para_eliminar(self, ruta: str) -> int:
+        if ruta == "/":
+            self._error("¡No puedo eliminar la raíz!")
+            return SIN_NODO
+
+        fila = self._buscar_fila(ruta)
+
+        if fila == SIN_NODO or fila == self._raiz:
+            self._error("Nodo no encontrado.")
+            return SIN_NODO
+        return fila
+
+    def mover(self, ruta_origen: str, ruta_destino: str) -> bool:
+        """Mueve un nodo (archivo o carpeta) de un lugar a otro."""
+        fila = self._buscar_fila(ruta_origen)
+        nuevo_padre = self._buscar_fila(ruta_destino)
+
+        if fila == SIN_NODO or nuevo_padre == SIN_NODO:
+            self._error("La ruta de origen o la de destino no son válidas.")
+            return False
+
+        if not self._es_carpeta(nuevo_padre):
+            self._error("El destino debe ser una carpeta para poder mover algo dentro.")
+            return False
+
+        # Evito mover una carpeta dentro de sí misma (error de ciclo)
+        if self._es_ancestro_fila(fila, nuevo_padre):
+            self._error("No puedes mover una carpeta dentro de sí misma o de un subdirectorio.")
+            return False
+
+        if _clave(nuevo_padre, self._nombre_id[fila]) in self._hijo_por_nombre:
+            self._error(f"Ya existe un elemento llamado '{self._nombres[self._nombre_id[fila]]}' en el destino.")
+            return False
+
+        self._desenlazar(fila)
+        self._enlazar(nuevo_padre, fila)
+        return True
+
+    def copiar(self, ruta_origen: str, ruta_destino: str) -> bool:
+        """Copia un archivo o una carpeta entera dentro de la carpeta destino (como 'cp -r')."""
+        fila = self._buscar_fila(ruta_origen)
+        nuevo_padre = self._buscar_fila(ruta_destino)
+
+        if fila == SIN_NODO or nuevo_padre == SIN_NODO or fila == self._raiz:
+            self._error("La ruta de origen o la de destino no son válidas.")
+            return False
+
+        if not self._es_carpeta(nuevo_padre):
+            self._error("El destino debe ser una carpeta para poder copiar algo dentro.")
+            return False
+
+        if self._es_ancestro_fila(fila, nuevo_padre):
+            self._error("No puedes copiar una carpeta dentro de sí misma o de un subdirectorio.")
+            return False
+
+        if _clave(nuevo_padre, self._nombre_id[fila]) in self._hijo_por_nombre:
+            self._error(f"Ya existe un elemento llamado '{self._nombres[self._nombre_id[fila]]}' en el destino.")
+            return False
+
+        # Copio fila por fila con una pila de (fila original, fila del padre nuevo)
+        pila = [(fila, nuevo_padre)]
+        while pila:
+            original, padre = pila.pop()
+            nueva = self._nueva_fila(padre, self._nombres[self._nombre_id[original]],
+                                     self._es_carpeta(original), self._contenidos[original])
+            self._enlazar(padre, nueva)
+            pila.extend((hijo, nueva) for hijo in self._hijos(original))
+        return True
+
+    def calcular_tamano(self, nodo=None) -> int:
+        """Cuenta cuántos archivos y carpetas hay desde el punto dado (con una pila)."""
+        fila = self._raiz if nodo is None else nodo.indice
+        total = 0
+        pila = [fila]
+        while pila:
+            actual = pila.pop()
+            total += 1
+            pila.extend(self._hijos(actual))
+        return total
+
+    def estadisticas_tamano(self, ruta: str = "/") -> dict:
+        """Los totales del subárbol en la ruta (acá los cuento recorriéndolo, ver NodoColumnar)."""
+        fila = self._buscar_fila(ruta)
+
+        if fila == SIN_NODO:
+            self._error(f"La ruta '{ruta}' no existe.")
+            return {}
+
+        nodos, archivos, carpetas, bytes_ = self._totales(fila)
+        return {"nodos": nodos, "archivos": archivos, "carpetas": carpetas, "bytes": bytes_}
+
+    def listar_contenido(self, ruta: str, desde=None, limite: int = None, tipo: str = None,
+                         prefijo: str = None):
+        """
+        Lista los elementos dentro de una carpeta (simula el comando 'ls'). Los
+        filtros y las páginas funcionan igual que en ArbolArchivos: con 'limite' (y
+        'desde') retorna (página, cursor), y el cursor es la última entrada entregada.
+        """
+        paginado = desde is not None or limite is not None
+        if limite is not None and limite < 1:
+            self._error("El límite de una página tiene que ser al menos 1.")
+            return [], None
+
+        fila = self._buscar_fila(ruta)
+
+        if fila == SIN_NODO:
+            self._error(f"La ruta '{ruta}' no existe.")
+            return ([], None) if paginado else []
+
+        if self._es_carpeta(fila):
+            claves = self._claves_ordenadas(fila)
+        else:
+            claves = [self._clave_ls(fila)]
+        if not paginado and tipo is None and not prefijo:
+            return list(claves) # Una copia: la lista guardada la sigo manteniendo yo
+        pagina = _pagina_de_claves(claves, desde, limite, tipo, prefijo)
+        return pagina if paginado else pagina[0]
+
+    def iterar_contenido(self, ruta: str, tipo: str = None, prefijo: str = None, desde=None,
+                         tamano_pagina: int = 1000):
+        """Como listar_contenido pero de a una página a la vez (igual que en ArbolArchivos)."""
+        while True:
+            pagina, desde = self.listar_contenido(ruta, desde, tamano_pagina, tipo, prefijo)
+            yield from pagina
+            if desde is None:
+                return
+
+    def modificar_contenido(self, ruta: str, nuevo_contenido: str) -> bool:
+        """Cambia el texto dentro de un archivo (simula un comando 'edit')."""
+        fila = self._buscar_fila(ruta)
+
+        if fila == SIN_NODO:
+            self._error(f"La ruta '{ruta}' no existe.")
+            return False
+
+        if self._es_carpeta(fila):
+            self._error(f"'{ruta}' es una carpeta, no puedo modificar su contenido de texto.")
+            return False
+
+        self._contenidos[fila] = nuevo_contenido
+        return True
+
+    def escribir_contenido(self, ruta: str, inicio: int, texto: str) -> bool:
+        """Escribe 'texto' sobre el archivo a partir del carácter 'inicio' (si pasa del final, crece)."""
+        fila = self._fila_de_archivo(ruta)
+        if fila == SIN_NODO:
+            return False
+
+        actual = self._contenidos[fila] or ""
+        if not 0 <= inicio <= len(actual):
+            self._error(f"La posición {inicio} está fuera del archivo '{ruta}' (tiene {len(actual)} caracteres).")
+            return False
+
+        self._contenidos[fila] = actual[:inicio] + texto + actual[inicio + len(texto):]
+        return True
+
+    def anexar_contenido(self, ruta: str, texto: str) -> bool:
+        """Agrega 'texto' al final del archivo (como abrirlo en modo 'a')."""
+        fila = self._fila_de_archivo(ruta)
+        if fila == SIN_NODO:
+            return False
+
+        self._contenidos[fila] = (self._contenidos[fila] or "") + texto
+        return True
+
+    def _fila_de_archivo(self, ruta: str) -> int:
+        """La fila del archivo en la ruta, o SIN_NODO (con el error ya mostrado)."""
+        fila = self._buscar_fila(ruta)
+
+        if fila == SIN_NODO:
+            self._error(f"La ruta '{ruta}' no existe.")
+            return SIN_NODO
+
+        if self._es_carpeta(fila):
+            self._error(f"'{ruta}' es una carpeta, no puedo modificar su contenido de texto.")
+            return SIN_NODO
+        return fila
+
+    def leer_archivo(self, ruta: str, inicio: int = 0, largo: int = None) -> str:
+        """
+        Retorna el contenido completo de un archivo (simula el comando 'cat'),
+        o solo esos caracteres si se pasa 'inicio' y/o 'largo'.
+        """
+        fila = self._buscar_fila(ruta)
+
+        if fila == SIN_NODO:
+            return self._error_de_lectura(f"Archivo o ruta '{ruta}' no encontrado.")
+
+        if self._es_carpeta(fila):
+            return self._error_de_lectura(f"'{ruta}' es una carpeta, no puedo leer su contenido como archivo.")
+
+        if inicio < 0 or (largo is not None and largo < 0):
+            return self._error_de_lectura("El inicio y el largo no pueden ser negativos.")
+
+        contenido = self._contenidos[fila]
+        if inicio or largo is not None:
+            texto = contenido or ""
+            return texto[inicio:] if largo is None else texto[inicio:inicio + largo]
+        return contenido if contenido is not None else "El archivo está vacío."
+
+    def leer_por_partes(self, ruta: str, tamano: int = TAMANO_TROZO):
+        """Generador que entrega el contenido del archivo de a 'tamano' caracteres."""
+        fila = self._buscar_fila(ruta)
+
+        if fila == SIN_NODO or self._es_carpeta(fila):
+            self._error(f"'{ruta}' no es un archivo.")
+            return
+        if tamano <= 0:
+            self._error("El tamaño de cada parte tiene que ser positivo.")
+            return
+
+        inicio = 0
+        while True:
+            parte = (self._contenidos[fila] or "")[inicio:inicio + tamano]
+            if parte:
+                yield parte
+            if len(parte) < tamano:
+                return
+            inicio += tamano
+
+    def es_ancestro(self, ruta_a: str, ruta_b: str) -> bool:
+        """True si lo que está en ruta_a contiene (a cualquier profundidad) a lo que está en ruta_b."""
+        a = self._buscar_fila(ruta_a)
+        b = self._buscar_fila(ruta_b)
+        if a == SIN_NODO or b == SIN_NODO:
+            self._error("Alguna de las dos rutas no existe.")
+            return False
+        return a != b and self._es_ancestro_fila(a, b)
+
+    def profundidad(self, ruta: str) -> int:
+        """Cuántas carpetas hay entre la ruta y la raíz (la raíz es 0). -1 si no existe."""
+        fila = self._buscar_fila(ruta)
+        if fila == SIN_NODO:
+            self._error(f"La ruta '{ruta}' no existe.")
+            return -1
+        profundidad = 0
+        while self._padre[fila] != SIN_NODO:
+            profundidad += 1
+            fila = self._padre[fila]
+        return profundidad
+
+    def renombrar(self, ruta: str, nuevo_nombre: str) -> bool:
+        """Cambia el nombre de un archivo o carpeta en la ruta especificada."""
+        fila = self._buscar_fila(ruta)
+
+        if fila == SIN_NODO or fila == self._raiz:
+            self._error(f"Nodo en '{ruta}' no encontrado o no se puede renombrar la raíz.")
+            return False
+
+        padre = self._padre[fila]
+        existente = self._buscar_hijo(padre, nuevo_nombre)
+        if existente != SIN_NODO and existente != fila:
+            self._error(f"Ya existe un elemento llamado '{nuevo_nombre}' en esta ubicación.")
+            return False
+
+        self._cambiar_nombre(fila, self._id_nombre(nuevo_nombre))
+        return True
+
+    # =======================================================
+    # TRANSACCIONES (todo o nada, como en ArbolArchivos)
+    # =======================================================
+
+    def transaccion(self) -> Transaccion:
+        """Abre un lote de cambios que se aplica entero o no se aplica (ver transacciones.py)."""
+        return Transaccion(self)
+
+    def _aplicar_transaccion(self, transaccion: Transaccion):
+        """
+        Aplico las operaciones una por una con los métodos de siempre, anotando cómo
+        deshacer cada una. Las filas eliminadas solo se desenlazan: si algo falla las
+        vuelvo a enlazar, y recién al terminar bien las libero.
+        """
+        error = transaccion._validar()
+        if error is None:
+            deshacer = []   # (función, argumentos), en el orden en que se aplicaron
+            eliminadas = []
+            with self.capturar_errores() as errores:
+                for numero, operacion in enumerate(transaccion.operaciones):
+                    if not self._aplicar_operacion(operacion, deshacer, eliminadas):
+                        error = (numero, errores[-1] if errores else "No se pudo aplicar.")
+                        break
+            if error is None:
+                for fila in eliminadas:
+                    self._liberar_subarbol(fila)
+            else:
+                for funcion, argumentos in reversed(deshacer):
+                    funcion(*argumentos)
+        if error is not None:
+            self._error(transaccion.describir_error(error))
+        return error
+
+    def _aplicar_operacion(self, operacion: tuple, deshacer: list, eliminadas: list) -> bool:
+        codigo, ruta = operacion[0], operacion[1]
+        if codigo == INSERTAR:
+            if not self.insertar(*operacion[1:]):
+                return False
+            fila = self._buscar_hijo(self._buscar_fila(ruta), operacion[2])
+            deshacer.append((self._quitar, (fila,)))
+            return True
+
+        if codigo == ELIMINAR:
+            fila = self._fila_para_eliminar(ruta)
+            if fila == SIN_NODO:
+                return False
+            deshacer.append((self._enlazar, (self._padre[fila], fila)))
+            self._desenlazar(fila)
+            eliminadas.append(fila)
+            return True
+
+        fila = self._buscar_fila(ruta)
+        if codigo == MOVER:
+            padre = self._padre[fila] if fila != SIN_NODO else SIN_NODO
+            if not self.mover(*operacion[1:]):
+                return False
+            deshacer.append((self._volver_a, (fila, padre)))
+        elif codigo == RENOMBRAR:
+            id_nombre = self._nombre_id[fila] if fila != SIN_NODO else None
+            if not self.renombrar(*operacion[1:]):
+                return False
+            deshacer.append((self._cambiar_nombre, (fila, id_nombre)))
+        elif codigo == MODIFICAR:
+            contenido = self._contenidos[fila] if fila != SIN_NODO else None
+            if not self.modificar_contenido(*operacion[1:]):
+                return False
+            deshacer.append((self._contenidos.__setitem__, (fila, contenido)))
+        return True
+
+    def _quitar(self, fila: int):
+        self._desenlazar(fila)
+        self._liberar_subarbol(fila)
+
+    def _volver_a(self, fila: int, padre: int):
+        self._desenlazar(fila)
+        self._enlazar(padre, fila)
+
+    def _cambiar_nombre(self, fila: int, id_nombre: int):
+        padre = self._padre[fila]
+        claves = self._ls_ordenado.get(padre)
+        if claves is not None:
+            del claves[bisect_left(claves, self._clave_ls(fila))]
+        del self._hijo_por_nombre[_clave(padre, self._nombre_id[fila])]
+        self._nombre_id[fila] = id_nombre
+        self._hijo_por_nombre[_clave(padre, id_nombre)] = fila
+        if claves is not None:
+            insort(claves, self._clave_ls(fila))
+
+    def mostrar_arbol(self, flujo=None, lineas_por_bloque: int = 1000):
+        """Dibuja la estructura completa del árbol (mismo formato y mismos parámetros que ArbolArchivos)."""
+        if flujo is None:
+            flujo = sys.stdout
+
+        bloque = ["\n--- Estructura del Árbol de Archivos ---"]
+        pila = [(self._raiz, "")]
+        while pila:
+            fila, prefijo = pila.pop()
+            nombre = self._nombres[self._nombre_id[fila]]
+            if self._es_carpeta(fila):
+                bloque.append(f"{prefijo}[CARPETA] {nombre}")
+            else:
+                contenido = self._contenidos[fila]
+                extracto = contenido[:30].replace('\n', ' ') + "..." if contenido and len(contenido) > 30 else contenido
+                bloque.append(f"{prefijo}[ARCHIVO] {nombre}" + (f" (Contenido: '{extracto}')" if extracto else " (Vacío)"))
+
+            hijos = self._hijos_ordenados(fila)
+            for i in range(len(hijos) - 1, -1, -1): # Al revés, para que la pila los saque en orden
+                nuevo_prefijo = prefijo + ("    " if i == len(hijos) - 1 else "│   ")
+                pila.append((hijos[i], nuevo_prefijo))
+
+            if len(bloque) >= lineas_por_bloque:
+                flujo.write("\n".join(bloque) + "\n")
+                bloque = []
+
+        bloque.append("---------------------------------------")
+        flujo.write("\n".join(bloque) + "\n")
@@ -0,0 +1,1419 @@
+"""
+Pequeñas mediciones de rendimiento para mi ArbolArchivos.
+Se ejecuta igual que ARBOL.py (con la carpeta de nodo.py en el PYTHONPATH):
+
+    PYTHONPATH="Dia 4" python "Dia 5/benchmark.py"
+
+Con --suite corre solo la suite por forma de árbol y puede guardar los
+resultados en JSON y compararlos con una corrida anterior (ver main()).
+"""
+import argparse
+import contextlib
+import gc
+import io
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+from ARBOL import ArbolArchivos
+from nodo import Nodo
+from versiones import ArbolPersistente
+
+
+def medir(funcion, repeticiones: int) -> float:
+    """Ejecuta la función varias veces y retorna los microsegundos promedio por llamada."""
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        funcion()
+    return (time.perf_counter() - inicio) / repeticiones * 1e6
+
+
+# =======================================================
+# BÚSQUEDA POR RUTA vs. ANCHO DEL DIRECTORIO
+# =======================================================
+
+def benchmark_busqueda_por_ancho(anchos=(10, 1_000, 100_000), repeticiones=20_000):
+    """
+    Lleno una carpeta con 'ancho' archivos y busco el último insertado.
+    Con el índice de nombres el costo debe quedar igual sin importar el ancho.
+    """
+    resultados = {}
+    for ancho in anchos:
+        fs = ArbolArchivos()
+        fs.insertar("/", "Documentos", "carpeta")
+        carpeta = fs.buscar_nodo_por_ruta("/Documentos")
+        for i in range(ancho):
+            # Agrego directo al nodo para que el llenado no domine la medición
+            carpeta.agregar_hijo(type(carpeta)(f"archivo_{i:07d}.txt", "archivo"))
+
+        ruta = f"/Documentos/archivo_{ancho - 1:07d}.txt"
+        resultados[ancho] = medir(lambda: fs.buscar_nodo_por_ruta(ruta), repeticiones)
+        print(f"ancho={ancho:>7}: buscar_nodo_por_ruta -> {resultados[ancho]:.2f} µs")
+    return resultados
+
+
+# =======================================================
+# LLENADO DE UNA CARPETA GRANDE (inserciones ordenadas)
+# =======================================================
+
+def benchmark_llenado_carpeta(tamanos=(1_000, 10_000, 100_000)):
+    """
+    Inserto 'n' archivos en orden aleatorio en una sola carpeta usando insertar().
+    Con la inserción binaria el tiempo por elemento casi no debe crecer con 'n'.
+    """
+    resultados = {}
+    for n in tamanos:
+        nombres = [f"archivo_{i:07d}.txt" for i in range(n)]
+        random.Random(n).shuffle(nombres)
+
+        fs = ArbolArchivos()
+        fs.insertar("/", "Documentos", "carpeta")
+        inicio = time.perf_counter()
+        for nombre in nombres:
+            fs.insertar("/Documentos", nombre, "archivo")
+        total = time.perf_counter() - inicio
+
+        resultados[n] = total / n * 1e6
+        print(f"n={n:>7}: insertar -> {resultados[n]:.2f} µs por archivo ({total:.2f} s en total)")
+    return resultados
+
+
+# =======================================================
+# CACHÉ DE RUTAS CALIENTES
+# =======================================================
+
+def benchmark_cache_rutas(profundidad=20, repeticiones=200_000):
+    """Comparo buscar la misma ruta profunda con la caché apagada y prendida."""
+    resultados = {}
+    for tam_cache in (0, 1024):
+        fs = ArbolArchivos(tam_cache=tam_cache)
+        ruta = ""
+        for i in range(profundidad):
+            fs.insertar(ruta or "/", f"nivel_{i}", "carpeta")
+            ruta += f"/nivel_{i}"
+        resultados[tam_cache] = medir(lambda: fs.buscar_nodo_por_ruta(ruta), repeticiones)
+        print(f"tam_cache={tam_cache:>5}: {resultados[tam_cache]:.2f} µs por búsqueda "
+              f"({fs.estadisticas_cache()['tasa_aciertos']:.0%} aciertos)")
+    return resultados
+
+
+def benchmark_rutas_preparadas(profundidad=20, repeticiones=200_000, proyectos=20_000):
+    """
+    La misma ruta profunda como texto y como Ruta (ya partida), con la caché
+    apagada y prendida; y la memoria de un árbol de nombres repetidos con y sin
+    internar_nombres.
+    """
+    from rutas import Ruta
+
+    resultados = {}
+    for tam_cache in (0, 1024):
+        fs = ArbolArchivos(tam_cache=tam_cache)
+        texto = ""
+        for i in range(profundidad):
+            fs.insertar(texto or "/", f"nivel_{i}", "carpeta")
+            texto += f"/nivel_{i}"
+        ruta = Ruta(texto)
+        resultados[f"texto_{tam_cache}_us"] = medir(lambda: fs.buscar_nodo_por_ruta(texto), repeticiones)
+        resultados[f"ruta_{tam_cache}_us"] = medir(lambda: fs.buscar_nodo_por_ruta(ruta), repeticiones)
+        print(f"tam_cache={tam_cache:>5}: texto {resultados[f'texto_{tam_cache}_us']:.2f} µs, "
+              f"Ruta {resultados[f'ruta_{tam_cache}_us']:.2f} µs por búsqueda")
+
+    repetidos = ("src/__init__.py", "src/main.py", "tests/__init__.py", "tests/test_main.py",
+                 "README.md", "setup.py")
+    for internar in (False, True):
+        gc.collect()
+        tracemalloc.start()
+        fs, _ = ArbolArchivos.desde_rutas(((f"/proyecto_{p}/{resto}", "archivo", None)
+                                           for p in range(proyectos) for resto in repetidos),
+                                          internar_nombres=internar)
+        memoria = tracemalloc.get_traced_memory()[0] / fs.calcular_tamano()
+        tracemalloc.stop()
+        del fs
+        resultados[f"internar_{internar}_bytes_por_nodo"] = memoria
+        print(f"internar_nombres={internar!s:<5}: {memoria:6.1f} bytes/nodo (nombres repetidos)")
+    return resultados
+
+
+# =======================================================
+# MEMORIA Y TIEMPO DE CONSTRUCCIÓN POR NODO
+# =======================================================
+
+class _NodoAnterior:
+    """Copia de cómo era el nodo antes de __slots__ (con __dict__, uuid y lista siempre)."""
+    def __init__(self, nombre, tipo, contenido=None, padre=None):
+        self.id = str(uuid.uuid4())
+        self.nombre = nombre
+        self.tipo = tipo.lower()
+        self.contenido = contenido
+        self.children = []
+        self.claves_hijos = []
+        self.hijos_por_nombre = {}
+        self.padre = padre
+        self.generacion = 0
+
+
+def _medir_nodos(clase, cantidad: int):
+    """Crea 'cantidad' archivos y retorna (bytes por nodo, µs por nodo)."""
+    nombres = [f"archivo_{i}.txt" for i in range(cantidad)] # Los nombres no cuentan
+    tracemalloc.start()
+    antes = tracemalloc.get_traced_memory()[0]
+    inicio = time.perf_counter()
+    nodos = [clase(nombre, "archivo") for nombre in nombres]
+    duracion = time.perf_counter() - inicio
+    despues = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del nodos
+    return (despues - antes) / cantidad, duracion / cantidad * 1e6
+
+
+def benchmark_memoria_nodos(cantidad=200_000):
+    """Comparo bytes por nodo y costo de construcción entre el nodo anterior y el actual."""
+    resultados = {}
+    for etiqueta, clase in (("anterior", _NodoAnterior), ("actual", Nodo)):
+        bytes_por_nodo, us_por_nodo = _medir_nodos(clase, cantidad)
+        resultados[etiqueta] = {"bytes_por_nodo": bytes_por_nodo, "us_por_nodo": us_por_nodo}
+        print(f"{etiqueta:>8}: {bytes_por_nodo:7.1f} bytes/nodo, {us_por_nodo:.2f} µs/nodo")
+    return resultados
+
+
+def benchmark_motores(carpetas=200, archivos_por_carpeta=500):
+    """Construyo el mismo árbol con el motor de nodos y con el columnar y comparo memoria."""
+    resultados = {}
+    for motor in ("nodos", "columnar"):
+        tracemalloc.start()
+        inicio = time.perf_counter()
+        fs = ArbolArchivos(motor=motor)
+        for c in range(carpetas):
+            fs.insertar("/", f"carpeta_{c}", "carpeta")
+            for a in range(archivos_por_carpeta):
+                fs.insertar(f"/carpeta_{c}", f"archivo_{a}.txt", "archivo")
+        duracion = time.perf_counter() - inicio
+        memoria = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        total = fs.calcular_tamano()
+        resultados[motor] = {"bytes_por_nodo": memoria / total, "segundos": duracion}
+        print(f"{motor:>8}: {memoria / total:7.1f} bytes/nodo, {duracion:.2f} s para {total} nodos")
+    return resultados
+
+
+# =======================================================
+# CARGA MASIVA CON insertar_lote
+# =======================================================
+
+def generar_rutas(cantidad: int):
+    """Genera 'cantidad' rutas de archivos repartidas en carpetas de dos niveles."""
+    for i in range(cantidad):
+        yield (f"/proyecto_{i % 1000:03d}/modulo_{i % 37:02d}/archivo_{i}.txt", "archivo", "x")
+
+
+def benchmark_carga_masiva(cantidad=1_000_000):
+    """Cargo 'cantidad' rutas con insertar_lote y reporto el rendimiento."""
+    inicio = time.perf_counter()
+    fs, resultado = ArbolArchivos.desde_rutas(generar_rutas(cantidad))
+    duracion = time.perf_counter() - inicio
+    print(f"{cantidad} rutas en {duracion:.2f} s ({cantidad / duracion:,.0f} rutas/s) -> {resultado}")
+    return {"rutas": cantidad, "segundos": duracion, "nodos": fs.calcular_tamano()}
+
+
+# =======================================================
+# DIARIO DE CAMBIOS: ESCRITURA EN GRUPO Y REPRODUCCIÓN
+# =======================================================
+
+def benchmark_diario(cantidad=200_000, lote_fsync=256):
+    """Anoto 'cantidad' inserciones con fsync en grupo y mido cuánto tarda reproducirlas."""
+    with tempfile.TemporaryDirectory() as carpeta:
+        ruta_snapshot = os.path.join(carpeta, "arbol.snap")
+        ruta_diario = os.path.join(carpeta, "arbol.diario")
+
+        fs = ArbolArchivos.abrir(ruta_snapshot, ruta_diario, lote_fsync=lote_fsync)
+        inicio = time.perf_counter()
+        fs.insertar_lote(generar_rutas(cantidad))
+        fs.cerrar()
+        escritura = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        fs = ArbolArchivos.abrir(ruta_snapshot, ruta_diario)
+        reproduccion = time.perf_counter() - inicio
+        fs.cerrar()
+
+    print(f"{cantidad} cambios: escritura {escritura:.2f} s, "
+          f"reproducción {reproduccion:.2f} s ({cantidad / reproduccion:,.0f} registros/s)")
+    return {"registros": cantidad, "escritura_s": escritura, "reproduccion_s": reproduccion}
+
+
+# =======================================================
+# BÚSQUEDA POR PATRONES (con y sin índice de nombres)
+# =======================================================
+
+def benchmark_busqueda_patrones(cantidad=300_000, patrones=("**/*.py", "**/archivo_7.txt", "/proyecto_001/**")):
+    """Comparo buscar() recorriendo el árbol contra buscar() usando el índice de nombres."""
+    entradas = list(generar_rutas(cantidad))
+    entradas += [(f"/proyecto_{i % 1000:03d}/modulo_00/script_{i}.py", "archivo") for i in range(1000)]
+    resultados = {}
+    for indice in (False, True):
+        fs, _ = ArbolArchivos.desde_rutas(entradas, indice_nombres=indice)
+        for patron in patrones:
+            inicio = time.perf_counter()
+            encontrados = len(fs.buscar(patron))
+            duracion = (time.perf_counter() - inicio) * 1e3
+            resultados[(indice, patron)] = duracion
+            print(f"indice={str(indice):>5} {patron:<20}: {duracion:8.2f} ms ({encontrados} resultados)")
+    return resultados
+
+
+# =======================================================
+# ÍNDICE DE TEXTO COMPLETO
+# =======================================================
+
+def benchmark_indice_texto(cantidad=1_000_000, consultas=("palabra_1", "palabra_1 palabra_2",
+                                                          "palabra_3 OR palabra_4000", '"palabra_1 palabra_2"')):
+    """Indexo 'cantidad' archivos con texto al azar y mido la latencia de algunas consultas."""
+    generador = random.Random(12)
+    vocabulario = [f"palabra_{i}" for i in range(5000)]
+    pesos = [1 / (i + 1) for i in range(len(vocabulario))] # Pocas palabras muy comunes (tipo Zipf)
+
+    def entradas():
+        for i in range(cantidad):
+            texto = " ".join(generador.choices(vocabulario, pesos, k=8))
+            yield (f"/proyecto_{i % 1000:03d}/archivo_{i}.txt", "archivo", texto)
+
+    inicio = time.perf_counter()
+    fs, _ = ArbolArchivos.desde_rutas(entradas(), indice_texto=True)
+    print(f"indexar {cantidad} archivos: {time.perf_counter() - inicio:.1f} s, {fs._indice_texto.estadisticas()}")
+
+    resultados = {}
+    for consulta in consultas:
+        inicio = time.perf_counter()
+        encontrados = fs.buscar_texto(consulta)
+        resultados[consulta] = (time.perf_counter() - inicio) * 1e3
+        print(f"{consulta!r:<32}: {resultados[consulta]:9.2f} ms ({len(encontrados)} resultados)")
+    return resultados
+
+
+# =======================================================
+# PRUEBA DE ESTRÉS DEL MODO CONCURRENTE
+# =======================================================
+
+def verificar_invariantes(fs) -> list:
+    """
+    Revisa todo el árbol a mano y retorna la lista de problemas encontrados:
+    padres mal enlazados, hijos desordenados o totales del subárbol que no coinciden.
+    """
+    problemas = []
+    pila = [(fs.raiz, False)]
+    totales = {}
+    while pila:
+        nodo, listo = pila.pop()
+        if not listo:
+            pila.append((nodo, True))
+            for hijo in nodo.children:
+                if hijo.padre is not nodo:
+                    problemas.append(f"'{hijo.nombre}' no apunta a su padre '{nodo.nombre}'")
+                if nodo.hijos_por_nombre.get(hijo.nombre) is not hijo:
+                    problemas.append(f"'{hijo.nombre}' falta en el índice de '{nodo.nombre}'")
+                pila.append((hijo, False))
+            if list(nodo.claves_hijos) != sorted(nodo.claves_hijos):
+                problemas.append(f"Los hijos de '{nodo.nombre}' están desordenados")
+            continue
+        # Postorden: ya tengo los totales de los hijos
+        nodos = 1 + sum(totales[id(hijo)] for hijo in nodo.children)
+        totales[id(nodo)] = nodos
+        if nodo.total_nodos != nodos:
+            problemas.append(f"'{nodo.nombre}' dice {nodo.total_nodos} nodos pero tiene {nodos}")
+    return problemas
+
+
+def benchmark_concurrencia(hilos=8, operaciones=20_000, carpetas=8, subcarpetas=16):
+    """
+    Varios hilos leen, insertan, eliminan, renombran y mueven carpetas al mismo tiempo
+    (incluso intentos de mover una carpeta dentro de sí misma). Al final reviso que
+    no haya errores, ni hilos trabados, y que el árbol siga siendo consistente.
+    """
+    fs = ArbolArchivos(concurrente=True)
+    for c in range(carpetas):
+        fs.insertar("/", f"c{c}", "carpeta")
+        for s in range(subcarpetas):
+            fs.insertar(f"/c{c}", f"s{c}_{s}", "carpeta")
+            fs.insertar(f"/c{c}/s{c}_{s}", "leeme.txt", "archivo", "hola")
+    iniciales = fs.calcular_tamano()
+
+    errores = []
+    netos = [0] * hilos # Nodos insertados menos eliminados por cada hilo
+
+    def trabajar(numero: int):
+        generador = random.Random(numero)
+        try:
+            for i in range(operaciones):
+                c, d = generador.randrange(carpetas), generador.randrange(carpetas)
+                sub = f"s{generador.randrange(carpetas)}_{generador.randrange(subcarpetas)}"
+                opcion = generador.random()
+                if opcion < 0.5:
+                    fs.leer_archivo(f"/c{c}/{sub}/leeme.txt")
+                    fs.listar_contenido(f"/c{c}/{sub}")
+                elif opcion < 0.6:
+                    netos[numero] += fs.insertar(f"/c{c}/{sub}", f"h{numero}_{i}", "archivo", "x" * 10)
+                elif opcion < 0.7:
+                    nombre = f"h{numero}_{generador.randrange(max(i, 1))}"
+                    netos[numero] -= fs.eliminar(f"/c{c}/{sub}/{nombre}")
+                elif opcion < 0.8:
+                    fs.modificar_contenido(f"/c{c}/{sub}/leeme.txt", "chau" * generador.randrange(5))
+                elif opcion < 0.97:
+                    fs.mover(f"/c{c}/{sub}", f"/c{d}")            # Cambia de carpeta
+                elif opcion < 0.99:
+                    fs.mover(f"/c{c}", f"/c{c}/{sub}")            # Ciclo: siempre debe fallar
+                else:
+                    fs.renombrar(f"/c{c}/{sub}/leeme.txt", "leeme.txt")
+        except Exception as error: # Cualquier excepción en un hilo es una falla de la prueba
+            errores.append(repr(error))
+
+    trabajadores = [threading.Thread(target=trabajar, args=(n,)) for n in range(hilos)]
+    inicio = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()): # Los "Error: ..." esperados no me interesan acá
+        for hilo in trabajadores:
+            hilo.start()
+        for hilo in trabajadores:
+            hilo.join(timeout=120)
+    duracion = time.perf_counter() - inicio
+
+    trabados = sum(hilo.is_alive() for hilo in trabajadores)
+    problemas = verificar_invariantes(fs)
+    if fs.calcular_tamano() != iniciales + sum(netos):
+        problemas.append(f"Hay {fs.calcular_tamano()} nodos y esperaba {iniciales + sum(netos)}")
+    total = hilos * operaciones
+    print(f"{hilos} hilos x {operaciones} operaciones: {duracion:.2f} s ({total / duracion:,.0f} ops/s), "
+          f"{len(errores)} excepciones, {trabados} hilos trabados, {len(problemas)} inconsistencias")
+    for problema in (errores + problemas)[:10]:
+        print("  ", problema)
+    return {"segundos": duracion, "excepciones": len(errores), "trabados": trabados,
+            "inconsistencias": len(problemas)}
+
+
+def probar_recorridos_concurrentes(hilos=4, vueltas=30):
+    """
+    Chequeo (con assert, no solo mido) el candado global del modo concurrente:
+      1. Dos recorridos de todo el árbol corren a la vez: mientras mostrar_arbol está
+         frenado a la mitad, buscar y ruta_de de otro hilo terminan igual.
+      2. Un cambio sí espera a ese recorrido, y termina apenas el recorrido suelta.
+      3. Un generador a medio consumir (recorrer_dfs, leer_por_partes) no deja nada
+         tomado: un cambio de otro hilo pasa mientras el generador está quieto.
+      4. Varios hilos recorriendo todo (buscar, recorrer_dfs, es_ancestro, profundidad,
+         mostrar_arbol, leer_por_partes) mientras otros cambian el árbol: sin
+         excepciones, sin hilos trabados y con el árbol consistente al final.
+    """
+    fs = ArbolArchivos(concurrente=True)
+    for c in range(8):
+        fs.insertar("/", f"c{c}", "carpeta")
+        for a in range(50):
+            fs.insertar(f"/c{c}", f"a{a}.txt", "archivo", "hola " * 20)
+    fs.insertar("/", "grande.txt", "archivo", "x" * 10_000)
+
+    def en_otro_hilo(funcion, *argumentos):
+        hecho = threading.Event()
+        def correr():
+            funcion(*argumentos)
+            hecho.set()
+        threading.Thread(target=correr, daemon=True).start()
+        return hecho
+
+    # 1 y 2: frenar mostrar_arbol adentro del candado, con un flujo que espera
+    adentro, seguir = threading.Event(), threading.Event()
+    class FlujoQueFrena(io.StringIO):
+        def write(self, texto):
+            adentro.set()
+            seguir.wait(timeout=30)
+            return super().write(texto)
+    recorrido = en_otro_hilo(fs.mostrar_arbol, FlujoQueFrena(), 10)
+    assert adentro.wait(timeout=10), "mostrar_arbol no arrancó"
+    assert en_otro_hilo(fs.buscar, "**/a1.txt").wait(timeout=10), \
+        "buscar quedó esperando a otro recorrido (el candado global no es compartido)"
+    assert en_otro_hilo(fs.ruta_de, fs.raiz).wait(timeout=10), "ruta_de quedó esperando a otro recorrido"
+    cambio = en_otro_hilo(fs.insertar, "/c0", "nuevo.txt", "archivo")
+    assert not cambio.wait(timeout=0.3), "un cambio pasó en medio de un recorrido de todo el árbol"
+    seguir.set()
+    assert recorrido.wait(timeout=10) and cambio.wait(timeout=10), "el cambio no siguió después del recorrido"
+
+    # 3: generadores a medio consumir
+    nodos = fs.recorrer_dfs("/")
+    next(nodos)
+    assert en_otro_hilo(fs.insertar, "/c1", "durante_dfs.txt", "archivo").wait(timeout=10), \
+        "recorrer_dfs dejó un candado tomado mientras estaba quieto"
+    assert sum(1 for _ in nodos) >= fs.calcular_tamano() - 2
+    partes = fs.leer_por_partes("/grande.txt", 100)
+    next(partes)
+    assert en_otro_hilo(fs.modificar_contenido, "/grande.txt", "y" * 10_000).wait(timeout=10), \
+        "leer_por_partes dejó un candado tomado entre una parte y otra"
+    partes.close()
+
+    # 4: recorridos y cambios mezclados
+    errores = []
+    def recorrer(numero: int):
+        try:
+            for _ in range(vueltas):
+                assert "/c0" in fs.buscar("/c*")
+                assert sum(1 for _ in fs.recorrer_dfs("/")) > 0
+                assert fs.es_ancestro("/", "/c1")
+                assert fs.profundidad("/c2") == 1
+                fs.mostrar_arbol(io.StringIO())
+                assert len("".join(fs.leer_por_partes("/grande.txt", 999))) == 10_000
+        except Exception as error:
+            errores.append(repr(error))
+    def cambiar(numero: int):
+        try:
+            for i in range(vueltas * 20):
+                c = (numero + i) % 8
+                fs.insertar(f"/c{c}", f"h{numero}_{i}", "archivo", "z")
+                fs.modificar_contenido("/grande.txt", "xy"[i % 2] * 10_000)
+                fs.eliminar(f"/c{c}/h{numero}_{i}")
+        except Exception as error:
+            errores.append(repr(error))
+    trabajadores = [threading.Thread(target=recorrer, args=(n,)) for n in range(hilos)]
+    trabajadores += [threading.Thread(target=cambiar, args=(n,)) for n in range(hilos)]
+    inicio = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for hilo in trabajadores:
+            hilo.start()
+        for hilo in trabajadores:
+            hilo.join(timeout=120)
+    trabados = sum(hilo.is_alive() for hilo in trabajadores)
+    problemas = verificar_invariantes(fs)
+    assert not errores, errores[:5]
+    assert not trabados, f"{trabados} hilos trabados"
+    assert not problemas, problemas[:5]
+    print(f"Recorridos compartidos y sin candados en los yield: ok "
+          f"({hilos} hilos recorriendo + {hilos} cambiando, {time.perf_counter() - inicio:.2f} s)")
+
+
+# =======================================================
+# VERSIONES PERSISTENTES (copy-on-write)
+# =======================================================
+
+def benchmark_versiones(cantidad=200_000, cambios=20_000, retener=1_000):
+    """
+    Mido cuánto cuesta cada cambio en el motor persistente, cuánta memoria extra
+    ocupan las últimas 'retener' versiones y si una foto vieja sigue igual
+    mientras el árbol cambia.
+    """
+    fs = ArbolPersistente(retener=retener) # Igual que ArbolArchivos(motor="persistente"), eligiendo 'retener'
+    inicio = time.perf_counter()
+    for i in range(cantidad):
+        if i % 1000 == 0:
+            fs.insertar("/", f"proyecto_{i // 1000:03d}", "carpeta")
+        fs.insertar(f"/proyecto_{i // 1000:03d}", f"archivo_{i}.txt", "archivo", "x")
+    print(f"{cantidad} inserciones: {(time.perf_counter() - inicio) / cantidad * 1e6:.1f} µs por cambio")
+
+    foto = fs.snapshot()
+    listado = foto.listar_contenido("/proyecto_000")
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    proyectos = cantidad // 1000
+    for i in range(cambios):
+        proyecto = i % proyectos
+        fs.modificar_contenido(f"/proyecto_{proyecto:03d}/archivo_{proyecto * 1000 + i % 1000}.txt", str(i))
+    duracion = time.perf_counter() - inicio
+    memoria, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    igual = foto.listar_contenido("/proyecto_000") == listado and foto.leer_archivo("/proyecto_000/archivo_0.txt") == "x"
+    print(f"{cambios} modificaciones (con tracemalloc): {duracion / cambios * 1e6:.1f} µs por cambio, "
+          f"{memoria / retener / 1024:.1f} KiB por versión retenida, foto vieja intacta: {igual}")
+    return {"us_por_cambio": duracion / cambios * 1e6, "bytes_por_version": memoria / retener,
+            "foto_intacta": igual}
+
+
+# =======================================================
+# DEDUPLICACIÓN DE CONTENIDOS
+# =======================================================
+
+def benchmark_deduplicacion(cantidad=200_000, distintos=500, tamano=2_000):
+    """
+    Cargo 'cantidad' archivos cuyos contenidos salen de solo 'distintos' textos
+    (como copias de la misma plantilla) y comparo la memoria con y sin almacén.
+    Después copio una carpeta grande con copiar() y mido cuánto tarda.
+    """
+    def entradas():
+        for i in range(cantidad):
+            # Armo un str nuevo para cada archivo, como si lo leyera de un archivo distinto
+            texto = f"plantilla {i % distintos} " + "x" * tamano
+            yield (f"/proyecto_{i % 100:03d}/archivo_{i}.txt", "archivo", texto)
+
+    resultados = {}
+    for deduplicar in (False, True):
+        tracemalloc.start()
+        fs, _ = ArbolArchivos.desde_rutas(entradas(), deduplicar=deduplicar)
+        memoria, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        inicio = time.perf_counter()
+        fs.copiar("/proyecto_000", "/proyecto_001")
+        copia = (time.perf_counter() - inicio) * 1e3
+        resultados[deduplicar] = {"memoria_mb": memoria / 1e6, "copiar_ms": copia}
+        print(f"deduplicar={str(deduplicar):>5}: {memoria / 1e6:8.1f} MB, "
+              f"copiar una carpeta de {cantidad // 100} archivos: {copia:.1f} ms")
+        if deduplicar:
+            estadisticas = fs.estadisticas_contenido()
+            print(f"  proporción {estadisticas['proporcion_dedup']:.0f}x, "
+                  f"{estadisticas['bytes_ahorrados'] / 1e6:.1f} MB ahorrados, {estadisticas['blobs']} blobs")
+            resultados["estadisticas"] = estadisticas
+    return resultados
+
+
+def probar_snapshot_deduplicado():
+    """
+    Chequeo (con assert) que guardar y cargar con deduplicar=True devuelve los mismos
+    contenidos cuando hay archivos vacíos: un archivo vacío queda en la misma posición
+    del snapshot que el siguiente con contenido, y no tienen que terminar compartiendo blob.
+    La carpeta la inserto con un texto, que se descarta: si no, los bytes totales
+    cambiarían al cargar. Lo pruebo con guardar()/cargar() y con abrir()/compactar()/abrir().
+    """
+    esperados = {"/a.txt": "", "/b.txt": "contenido importante", "/c.txt": "",
+                 "/d.txt": "contenido importante", "/docs/e.txt": "", "/docs/f.txt": "otro texto"}
+
+    def llenar(fs):
+        fs.insertar("/", "docs", "carpeta", "las carpetas no guardan texto")
+        for ruta, texto in esperados.items():
+            carpeta, nombre = ruta.rsplit("/", 1)
+            fs.insertar(carpeta or "/", nombre, "archivo", texto)
+
+    def revisar(fs, como):
+        for ruta, texto in esperados.items():
+            assert fs.leer_archivo(ruta) == texto, f"{como}: {ruta} quedó con {fs.leer_archivo(ruta)!r}"
+        assert fs.estadisticas_tamano("/")["bytes"] == sum(map(len, esperados.values())), \
+            f"{como}: los bytes totales no coinciden"
+
+    with tempfile.TemporaryDirectory() as carpeta:
+        ruta_snapshot = os.path.join(carpeta, "arbol.snap")
+        fs = ArbolArchivos(deduplicar=True)
+        llenar(fs)
+        fs.guardar(ruta_snapshot)
+        cargado = ArbolArchivos.cargar(ruta_snapshot, deduplicar=True)
+        revisar(cargado, "guardar/cargar")
+        cargado.cerrar()
+
+        ruta_snapshot = os.path.join(carpeta, "durable.snap")
+        ruta_diario = os.path.join(carpeta, "durable.diario")
+        fs = ArbolArchivos.abrir(ruta_snapshot, ruta_diario, deduplicar=True)
+        llenar(fs)
+        assert fs.compactar()
+        fs.cerrar()
+        fs = ArbolArchivos.abrir(ruta_snapshot, ruta_diario, deduplicar=True)
+        revisar(fs, "abrir/compactar")
+        fs.cerrar()
+    print("snapshot con archivos vacíos y deduplicar=True: ok")
+
+
+# =======================================================
+# CONTENIDOS GRANDES EN TROZOS
+# =======================================================
+
+def benchmark_trozos(megas=8, repeticiones=200):
+    """
+    Un archivo de 'megas' MB: comparo editar 10 caracteres, agregar una línea y
+    leer 100 caracteres del medio, con el archivo como texto entero y en trozos.
+    """
+    texto = ("línea de registro número 123456789 con algo de texto\n" * (megas * 20_000))[:megas * 1_000_000]
+    mitad = len(texto) // 2
+    resultados = {}
+    for umbral in (None, 1_000):
+        fs = ArbolArchivos(umbral_trozos=umbral)
+        fs.insertar("/", "grande.log", "archivo", texto)
+        if umbral is None:
+            editar = lambda: fs.modificar_contenido("/grande.log", texto[:mitad] + "EDITADO!!!" + texto[mitad + 10:])
+        else:
+            editar = lambda: fs.escribir_contenido("/grande.log", mitad, "EDITADO!!!")
+        tiempos = {
+            "editar_us": medir(editar, repeticiones),
+            "anexar_us": medir(lambda: fs.anexar_contenido("/grande.log", "nueva línea\n"), repeticiones),
+            "leer_rango_us": medir(lambda: fs.leer_archivo("/grande.log", mitad, 100), repeticiones),
+        }
+        nombre = "texto entero" if umbral is None else "en trozos"
+        print(f"{nombre:>12}: " + ", ".join(f"{clave} {valor:,.1f}" for clave, valor in tiempos.items()))
+        resultados[nombre] = tiempos
+    return resultados
+
+
+# =======================================================
+# CONTENIDOS EN MEMORIA Y DISCO (presupuesto con LRU)
+# =======================================================
+
+def benchmark_niveles(cantidad=200_000, tamano=1_000, presupuesto=20_000_000, lecturas=200_000):
+    """
+    Cargo 'cantidad' archivos de 'tamano' bytes con un presupuesto de memoria
+    mucho menor que el total, y leo con una distribución sesgada (pocos archivos
+    muy leídos) para ver la tasa de aciertos y el costo de traer de disco.
+    """
+    tracemalloc.start()
+    fs, _ = ArbolArchivos.desde_rutas(
+        ((f"/proyecto_{i % 1000:03d}/archivo_{i}.txt", "archivo", f"{i:08d}" + "x" * (tamano - 8))
+         for i in range(cantidad)), memoria_contenidos=presupuesto)
+    memoria, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    generador = random.Random(17)
+    rutas = [f"/proyecto_{i % 1000:03d}/archivo_{i}.txt"
+             for i in (min(int(generador.paretovariate(0.3)) - 1, cantidad - 1) * 7919 % cantidad
+                       for _ in range(lecturas))]
+    inicio = time.perf_counter()
+    for ruta in rutas:
+        fs.leer_archivo(ruta)
+    duracion = time.perf_counter() - inicio
+
+    estadisticas = fs.estadisticas_memoria()
+    print(f"{cantidad} archivos ({cantidad * tamano / 1e6:.0f} MB de contenido), presupuesto {presupuesto / 1e6:.0f} MB: "
+          f"{memoria / 1e6:.0f} MB en memoria después de cargar")
+    print(f"{lecturas} lecturas: {duracion / lecturas * 1e6:.1f} µs promedio, "
+          f"aciertos {estadisticas['tasa_aciertos']:.1%}, {estadisticas['desalojos']} desalojos, "
+          f"{estadisticas['bytes_residentes'] / 1e6:.1f} MB residentes")
+    return {"memoria_mb": memoria / 1e6, "us_por_lectura": duracion / lecturas * 1e6, **estadisticas}
+
+
+# =======================================================
+# TRANSACCIONES: UN TRABAJO DE IMPORTACIÓN ENTERO
+# =======================================================
+
+def operaciones_de_importacion(proyectos: int, archivos: int):
+    """
+    Lo que haría un importador que lee varias fuentes a la vez: crea las carpetas,
+    carga los archivos intercalando proyectos (más carpetas que la caché de rutas)
+    y después corrige algunos.
+    """
+    bases = [f"/importacion/proyecto_{p:05d}" for p in range(proyectos)]
+    for base in bases:
+        yield ("insertar", "/importacion", base.rsplit("/", 1)[1], "carpeta")
+        yield ("insertar", base, "src", "carpeta")
+    for a in range(archivos):
+        for base in bases:
+            yield ("insertar", base + "/src", f"archivo_{a}.py", "archivo", f"print({a})")
+    for base in bases:
+        yield ("modificar_contenido", f"{base}/src/archivo_0.py", "# cabecera")
+        yield ("renombrar", f"{base}/src/archivo_1.py", "principal.py")
+        yield ("mover", f"{base}/src/archivo_2.py", base)
+        yield ("eliminar", f"{base}/src/archivo_3.py")
+
+
+def _importar(fs, operaciones, en_transaccion: bool) -> float:
+    """Aplica las operaciones (una por una o en una transacción) y retorna los segundos."""
+    fs.insertar("/", "importacion", "carpeta")
+    inicio = time.perf_counter()
+    if en_transaccion:
+        with fs.transaccion() as transaccion:
+            for nombre, *argumentos in operaciones:
+                getattr(transaccion, nombre)(*argumentos)
+        assert transaccion.error is None
+    else:
+        for nombre, *argumentos in operaciones:
+            getattr(fs, nombre)(*argumentos)
+    fs.cerrar()
+    return time.perf_counter() - inicio
+
+
+def benchmark_transacciones(proyectos=5_000, archivos=40):
+    """La misma importación con una llamada por operación y con una sola transacción, con y sin diario."""
+    operaciones = list(operaciones_de_importacion(proyectos, archivos))
+    resultados = {"operaciones": len(operaciones)}
+
+    for en_transaccion in (False, True):
+        clave = "transaccion" if en_transaccion else "individual"
+        fs = ArbolArchivos()
+        resultados[clave + "_s"] = _importar(fs, operaciones, en_transaccion)
+        del fs
+        gc.collect() # El árbol anterior tiene ciclos (padre <-> hijos): que no moleste en la medición
+        with tempfile.TemporaryDirectory() as carpeta:
+            fs = ArbolArchivos.abrir(os.path.join(carpeta, "arbol.snap"), os.path.join(carpeta, "arbol.diario"))
+            resultados[clave + "_diario_s"] = _importar(fs, operaciones, en_transaccion)
+            del fs
+            gc.collect()
+
+    # Si la última operación falla, se deshace todo lo anterior
+    fs = ArbolArchivos()
+    fs.insertar("/", "importacion", "carpeta")
+    inicio = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        with fs.transaccion() as transaccion:
+            for nombre, *argumentos in operaciones:
+                getattr(transaccion, nombre)(*argumentos)
+            transaccion.eliminar("/no_existe")
+    resultados["deshacer_s"] = time.perf_counter() - inicio
+    assert fs.calcular_tamano() == 2
+
+    for sufijo, titulo in (("_s", "en memoria"), ("_diario_s", "con diario")):
+        individual, en_lote = resultados["individual" + sufijo], resultados["transaccion" + sufijo]
+        print(f"{len(operaciones)} operaciones {titulo}: una por una {individual:.2f} s, "
+              f"en una transacción {en_lote:.2f} s ({individual / en_lote:.1f}x)")
+    print(f"transacción fallida en la última operación: {resultados['deshacer_s']:.2f} s (árbol intacto)")
+    return resultados
+
+
+# =======================================================
+# SUITE POR FORMA DE ÁRBOL (resultados en JSON para comparar corridas)
+# =======================================================
+#
+#   python benchmark.py --suite --tamanos 1000 100000 --json hoy.json --comparar ayer.json
+#
+# Cada forma es un generador de (ruta_padre, nombre, tipo) con semilla fija: la
+# misma semilla arma siempre el mismo árbol, así dos corridas son comparables.
+
+PROFUNDIDAD = 256   # Carpetas por cadena en la forma "profunda"
+RAMAS = 10          # Hijos por carpeta en la forma "balanceada"
+CORRIDAS = 5        # Corridas de cada medición (cada una sobre un árbol nuevo); comparo medianas
+MINIMO_TOLERANCIA = 0.05 # Aunque el ruido medido sea casi cero, menos de un 5% no cuenta como regresión
+SIGMAS = 3          # Cuántas veces el ruido entre corridas puede moverse una mediana sin ser regresión
+MINIMO_SEGUNDOS = 0.05 # Lo mínimo que dura cada medición de una lectura (se repite hasta llegar)
+
+
+def forma_ancha(cantidad: int, semilla: int = 0):
+    """Una sola carpeta con todo adentro (el peor caso para listar y ordenar)."""
+    yield ("/", "ancha", "carpeta")
+    for i in range(cantidad - 2):
+        yield ("/ancha", f"archivo_{i}.txt", "archivo")
+
+
+def forma_profunda(cantidad: int, semilla: int = 0):
+    """Cadenas de PROFUNDIDAD carpetas, cada una terminada en un archivo (rutas muy largas)."""
+    ruta = "/"
+    for i in range(cantidad - 1):
+        nivel = i % PROFUNDIDAD
+        if nivel == 0:
+            ruta = "/"
+        if nivel == PROFUNDIDAD - 1 or i == cantidad - 2:
+            yield (ruta, f"archivo_{i}.txt", "archivo")
+        else:
+            yield (ruta, f"d{i}", "carpeta")
+            ruta = ruta.rstrip("/") + f"/d{i}"
+
+
+def forma_balanceada(cantidad: int, semilla: int = 0):
+    """Árbol completo con RAMAS hijos por carpeta; las hojas son archivos."""
+    rutas = {0: "/"} # Solo guardo las rutas de las carpetas (una de cada RAMAS nodos)
+    for i in range(1, cantidad):
+        padre = (i - 1) // RAMAS
+        ruta_padre = rutas[padre]
+        if i * RAMAS + 1 < cantidad:
+            yield (ruta_padre, f"d{i}", "carpeta")
+            rutas[i] = ruta_padre.rstrip("/") + f"/d{i}"
+        else:
+            yield (ruta_padre, f"archivo_{i}.txt", "archivo")
+        if i % RAMAS == 0:
+            del rutas[padre] # Ya tuvo todos sus hijos
+
+
+def forma_realista(cantidad: int, semilla: int = 0, proporcion_carpetas: float = 0.15):
+    """
+    Hijos repartidos con ley de potencia (enganche preferencial): cada nodo nuevo
+    elige carpeta con probabilidad proporcional a los hijos que ya tiene + 1.
+    Quedan unas pocas carpetas enormes y muchas chicas, como en un disco real.
+    """
+    azar = random.Random(semilla)
+    rutas = ["/"]  # Ruta de cada carpeta
+    urna = [0]     # Cada carpeta aparece 1 + (cantidad de hijos) veces
+    for i in range(1, cantidad):
+        padre = urna[azar.randrange(len(urna))]
+        urna.append(padre)
+        if azar.random() < proporcion_carpetas:
+            yield (rutas[padre], f"d{i}", "carpeta")
+            rutas.append(rutas[padre].rstrip("/") + f"/d{i}")
+            urna.append(len(rutas) - 1)
+        else:
+            yield (rutas[padre], f"archivo_{i}.txt", "archivo")
+
+
+FORMAS = {
+    "ancha": forma_ancha,
+    "profunda": forma_profunda,
+    "balanceada": forma_balanceada,
+    "realista": forma_realista,
+}
+
+
+def _muestrear(muestra: list, tamano: int, elemento, vistos: int, azar: random.Random):
+    """Muestreo de reservorio: 'tamano' elementos al azar sin guardar todos."""
+    if len(muestra) < tamano:
+        muestra.append(elemento)
+    else:
+        j = azar.randrange(vistos)
+        if j < tamano:
+            muestra[j] = elemento
+
+
+def _cronometrar(funcion, argumentos: list, repetir: bool = False) -> float:
+    """
+    Segundos que tarda una pasada llamando a la función con cada tupla de argumentos.
+    Con repetir=True (solo para lo que no cambia el árbol) hago pasadas hasta juntar
+    MINIMO_SEGUNDOS y promedio: una sola pasada de un par de milisegundos es puro ruido.
+    """
+    gc.collect() # Que la basura de la medición anterior no se cobre en esta
+    pasadas = 0
+    inicio = time.perf_counter()
+    while True:
+        for argumento in argumentos:
+            funcion(*argumento)
+        pasadas += 1
+        duracion = time.perf_counter() - inicio
+        if not repetir or duracion >= MINIMO_SEGUNDOS:
+            return duracion / pasadas
+
+
+def _referencia() -> float:
+    """
+    Segundos de una carga fija de Python puro (partir rutas, diccionarios de strings,
+    ordenar): lo mismo que hace el árbol, pero sin el árbol. Si la máquina anda más
+    lenta (otra carga, la frecuencia de la CPU), esto se pone más lento en la misma
+    proporción, así que dividiendo por esto se cancela.
+    """
+    rutas = [f"/carpeta_{i % 97}/sub_{i % 13}/archivo_{i}.txt" for i in range(20_000)]
+    gc.collect()
+    inicio = time.perf_counter()
+    tabla = {}
+    for ruta in rutas:
+        partes = [parte for parte in ruta.split("/") if parte]
+        tabla.setdefault(partes[0], []).append(partes[-1])
+    for nombres in tabla.values():
+        nombres.sort()
+        for nombre in nombres:
+            tabla.get(nombre)
+    return time.perf_counter() - inicio
+
+
+def _mediana(valores: list) -> float:
+    ordenados = sorted(valores)
+    medio = len(ordenados) // 2
+    return ordenados[medio] if len(ordenados) % 2 else (ordenados[medio - 1] + ordenados[medio]) / 2
+
+
+def _resumir(operaciones: int, duraciones: list, referencias: list) -> dict:
+    """
+    Junta las corridas de una operación: la mediana del tiempo por operación, la
+    mediana del tiempo relativo a la carga de referencia de su corrida (lo que se
+    compara, ver _referencia) y el ruido entre corridas de ese relativo, como
+    desvío robusto (1.4826 * MAD / mediana: con corridas normales es el desvío
+    estándar, y una corrida rara no lo infla).
+    """
+    cantidad = max(operaciones, 1)
+    por_op = [duracion / cantidad * 1e6 for duracion in duraciones]
+    relativos = [tiempo / (referencia * 1e6) for tiempo, referencia in zip(por_op, referencias)]
+    mediana, relativo = _mediana(por_op), _mediana(relativos)
+    desvio = 1.4826 * _mediana([abs(valor - relativo) for valor in relativos])
+    return {"operaciones": operaciones, "us_por_op": mediana,
+            "ops_por_s": 1e6 / mediana if mediana else 0.0, "relativo": relativo,
+            "corridas_us": por_op, "corridas_relativo": relativos,
+            "ruido": desvio / relativo if relativo else 0.0}
+
+
+def _rutas_de_muestra(generador, cantidad: int, muestras: int, semilla: int) -> tuple:
+    """Archivos y carpetas elegidos al azar (siempre los mismos para la misma semilla)."""
+    azar = random.Random(semilla)
+    archivos, carpetas = [], ["/"]
+    vistos_archivos = vistos_carpetas = 0
+    for ruta_padre, nombre, tipo in generador(cantidad, semilla):
+        ruta = ruta_padre.rstrip("/") + "/" + nombre
+        if tipo == "carpeta":
+            vistos_carpetas += 1
+            _muestrear(carpetas, muestras, ruta, vistos_carpetas, azar)
+        else:
+            vistos_archivos += 1
+            _muestrear(archivos, muestras, ruta, vistos_archivos, azar)
+    azar.shuffle(archivos)
+    azar.shuffle(carpetas)
+    todas = archivos + carpetas
+    azar.shuffle(todas)
+    return archivos, carpetas, todas
+
+
+def _una_corrida(forma: str, cantidad: int, semilla: int, archivos: list, carpetas: list,
+                 todas: list) -> dict:
+    """
+    Una corrida completa sobre un árbol recién armado: operación -> (cantidad, segundos).
+    Los cambios van al final, así no afectan a las lecturas, y la corrida siguiente
+    arma su propio árbol (nunca mido renombrar/mover/eliminar sobre lo que dejó otra).
+    """
+    generador = FORMAS[forma]
+    corrida = {}
+    referencia = _referencia()
+    fs = ArbolArchivos()
+    corrida["insertar"] = (cantidad - 1, _cronometrar(fs.insertar, list(generador(cantidad, semilla))))
+
+    # Lecturas
+    rutas = [(ruta,) for ruta in todas]
+    corrida["buscar_nodo_por_ruta"] = (len(rutas), _cronometrar(fs.buscar_nodo_por_ruta, rutas, True))
+    nodos = [(fs.buscar_nodo_por_ruta(ruta),) for ruta in todas]
+    corrida["calcular_tamano"] = (len(nodos), _cronometrar(fs.calcular_tamano, nodos, True))
+    listados = [(ruta,) for ruta in carpetas]
+    corrida["listar_contenido"] = (len(carpetas), _cronometrar(fs.listar_contenido, listados, True))
+    with open(os.devnull, "w") as nulo:
+        corrida["mostrar_arbol"] = (1, _cronometrar(lambda: fs.mostrar_arbol(nulo), [()], True))
+
+    # Cambios (solo sobre archivos: así ninguno cambia la ruta de otro de la muestra)
+    fs.insertar("/", "_destino", "carpeta")
+    renombrados = [(ruta, f"renombrado_{i}") for i, ruta in enumerate(archivos)]
+    corrida["renombrar"] = (len(renombrados), _cronometrar(fs.renombrar, renombrados))
+    movidos = [(ruta.rsplit("/", 1)[0] + f"/renombrado_{i}", "/_destino") for i, ruta in enumerate(archivos)]
+    corrida["mover"] = (len(movidos), _cronometrar(fs.mover, movidos))
+    eliminados = [(f"/_destino/renombrado_{i}",) for i in range(len(archivos))]
+    corrida["eliminar"] = (len(eliminados), _cronometrar(fs.eliminar, eliminados))
+    assert fs.calcular_tamano() == cantidad + 1 - len(archivos)
+    del fs, nodos
+    # La referencia antes y después: si la máquina cambió de ritmo a la mitad, uso el promedio
+    corrida["referencia"] = (1, (referencia + _referencia()) / 2)
+    return corrida
+
+
+def medir_forma(forma: str, cantidad: int, muestras: int = 10_000, semilla: int = 0,
+                corridas: int = CORRIDAS) -> dict:
+    """
+    Arma un árbol de 'cantidad' nodos con la forma dada y mide cada operación.
+    Lo hago 'corridas' veces, cada una sobre un árbol nuevo, y de cada operación
+    guardo la mediana y el ruido entre corridas (ver comparar_resultados).
+
+    Cada corrida va en un intérprete nuevo (uno por vez, para no competir por la
+    CPU): dentro de un mismo proceso las corridas salen casi iguales, pero entre
+    dos ejecuciones cambian la semilla de hash de los strings y dónde queda cada
+    objeto en memoria, y eso solo ya mueve algunas operaciones un 20%. Si no lo
+    mido acá, comparar contra la corrida de ayer lo confunde con una regresión.
+    """
+    generador = FORMAS[forma]
+    archivos, carpetas, todas = _rutas_de_muestra(generador, cantidad, muestras, semilla)
+
+    duraciones = {}
+    with ProcessPoolExecutor(1, mp_context=get_context("spawn"), max_tasks_per_child=1) as grupo:
+        for _ in range(corridas):
+            corrida = grupo.submit(_una_corrida, forma, cantidad, semilla, archivos, carpetas, todas).result()
+            for operacion, (operaciones, duracion) in corrida.items():
+                duraciones.setdefault(operacion, (operaciones, []))[1].append(duracion)
+    referencias = duraciones.pop("referencia")[1]
+    resultado = {operacion: _resumir(operaciones, lista, referencias)
+                 for operacion, (operaciones, lista) in duraciones.items()}
+    resultado["referencia"] = {"us": _mediana(referencias) * 1e6, "corridas_us": [r * 1e6 for r in referencias]}
+    resultado["mostrar_arbol"]["us_por_nodo"] = resultado["mostrar_arbol"]["us_por_op"] / cantidad
+
+    # Memoria: armo el mismo árbol otra vez con tracemalloc (aparte, porque lo hace más lento).
+    # No depende de la máquina, así que alcanza con una vez
+    gc.collect()
+    tracemalloc.start()
+    fs = ArbolArchivos()
+    fs.insertar_lote((ruta_padre.rstrip("/") + "/" + nombre, tipo)
+                     for ruta_padre, nombre, tipo in generador(cantidad, semilla))
+    memoria = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    resultado["memoria"] = {"bytes": memoria, "bytes_por_nodo": memoria / cantidad}
+    del fs
+    gc.collect()
+    return resultado
+
+
+def suite_por_forma(tamanos=(1_000, 10_000, 100_000), formas=tuple(FORMAS), muestras: int = 10_000,
+                    semilla: int = 0, corridas: int = CORRIDAS) -> dict:
+    """Corre medir_forma para cada forma y tamaño y junta todo en un dict listo para JSON."""
+    resultados = {}
+    for forma in formas:
+        for cantidad in tamanos:
+            medicion = medir_forma(forma, cantidad, muestras, semilla, corridas)
+            resultados.setdefault(forma, {})[str(cantidad)] = medicion
+            print(f"{forma:>10} n={cantidad:>9}: " + ", ".join(
+                f"{operacion} {datos['us_por_op']:.2f} µs (±{datos['ruido']:.0%})"
+                for operacion, datos in medicion.items()
+                if operacion not in ("memoria", "mostrar_arbol", "referencia"))
+                + f", mostrar_arbol {medicion['mostrar_arbol']['us_por_nodo']:.2f} µs/nodo"
+                + f", {medicion['memoria']['bytes_por_nodo']:.0f} bytes/nodo")
+    return {
+        "entorno": {
+            "python": platform.python_version(),
+            "implementacion": platform.python_implementation(),
+            "plataforma": platform.platform(),
+            "fecha": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "parametros": {"tamanos": list(tamanos), "formas": list(formas), "muestras": muestras, "semilla": semilla,
+                       "corridas": corridas},
+        "resultados": resultados,
+    }
+
+
+def comparar_resultados(anterior: dict, actual: dict, tolerancia: float = MINIMO_TOLERANCIA) -> list:
+    """
+    Compara dos corridas de suite_por_forma. Retorna las regresiones: (forma, tamaño,
+    operación, antes, ahora, cambio, umbral) donde la mediana del tiempo relativo a
+    la referencia (o la memoria por nodo) empeoró más que el umbral; 'antes' y
+    'ahora' son los µs por operación (o bytes por nodo) para mostrar, y 'cambio'
+    es lo que empeoró lo comparado. El umbral sale del ruido que midieron las dos
+    corridas: SIGMAS veces la suma (cuadrática) de los dos ruidos, y nunca menos
+    que 'tolerancia'. Así una operación que varía un 20% entre corridas no salta
+    por un 25%, y una muy estable sí avisa con un 10%. Además todas las corridas
+    nuevas tienen que ser más lentas que todas las viejas: con 5 y 5 eso pasa por
+    azar 1 vez en 252, y corta las falsas alarmas de una medición con ruido
+    subestimado. Solo compara lo que está en las dos (a resultados viejos sin
+    'relativo' ni 'ruido' los comparo en µs, con ruido 0 y sin mirar las corridas).
+    """
+    regresiones = []
+    for forma, por_tamano in actual["resultados"].items():
+        for cantidad, mediciones in por_tamano.items():
+            previas = anterior["resultados"].get(forma, {}).get(cantidad)
+            if previas is None:
+                continue
+            for operacion, datos in mediciones.items():
+                if operacion not in previas or operacion == "referencia":
+                    continue
+                previa = previas[operacion]
+                clave = "bytes_por_nodo" if operacion == "memoria" else "us_por_op"
+                comparada = "relativo" if "relativo" in previa and "relativo" in datos else clave
+                if not previa[comparada]:
+                    continue
+                cambio = datos[comparada] / previa[comparada] - 1
+                ruido = (previa.get("ruido", 0.0) ** 2 + datos.get("ruido", 0.0) ** 2) ** 0.5
+                umbral = max(tolerancia, SIGMAS * ruido)
+                if comparada == "relativo" and min(datos["corridas_relativo"]) <= max(previa["corridas_relativo"]):
+                    continue # Las corridas se solapan: no es una diferencia clara
+                if cambio > umbral:
+                    regresiones.append((forma, int(cantidad), operacion, previa[clave], datos[clave],
+                                        cambio, umbral))
+    return regresiones
+
+
+# =======================================================
+# COSTO DE LAS MÉTRICAS (apagadas vs. prendidas)
+# =======================================================
+
+def benchmark_metricas(cantidad=200_000, busquedas=200_000):
+    """Las mismas inserciones y búsquedas sin métricas y con métricas."""
+    rutas = [f"/proyecto_{i % 1000:03d}/archivo_{i}.txt" for i in range(cantidad)]
+    azar = random.Random(0)
+    consultas = [azar.choice(rutas) for _ in range(busquedas)]
+    resultados = {}
+    for metricas in (False, True):
+        fs = ArbolArchivos(metricas=metricas)
+        for p in range(1000):
+            fs.insertar("/", f"proyecto_{p:03d}", "carpeta")
+        gc.collect()
+        inicio = time.perf_counter()
+        for i in range(cantidad):
+            fs.insertar(f"/proyecto_{i % 1000:03d}", f"archivo_{i}.txt", "archivo")
+        insertar = (time.perf_counter() - inicio) / cantidad * 1e6
+        inicio = time.perf_counter()
+        for ruta in consultas:
+            fs.buscar_nodo_por_ruta(ruta)
+        buscar = (time.perf_counter() - inicio) / busquedas * 1e6
+        clave = "con_metricas" if metricas else "sin_metricas"
+        resultados[clave] = {"insertar_us": insertar, "buscar_us": buscar}
+        print(f"{clave:>13}: insertar {insertar:.2f} µs, buscar_nodo_por_ruta {buscar:.2f} µs")
+        if metricas:
+            latencia = fs.metricas.instantanea()["histogramas"]["duracion_segundos"]["insertar"]
+            print(f"{'':>13}  insertar p50 <= {latencia['p50'] * 1e6:.1f} µs, p99 <= {latencia['p99'] * 1e6:.1f} µs")
+        del fs
+    return resultados
+
+
+# =======================================================
+# ÍNDICE DE ANCESTROS (chequeo de ciclos en árboles profundos)
+# =======================================================
+
+def benchmark_ancestros(profundidades=(16, 256, 4096), movidas=2_000):
+    """
+    Una cadena de carpetas de cada profundidad y una carpeta que va y viene entre
+    la punta y la raíz. Mido el chequeo de ciclos solo (_contiene) y mover() entero,
+    sin y con indice_ancestros.
+    """
+    resultados = {}
+    for profundidad in profundidades:
+        for indice in (False, True):
+            fs = ArbolArchivos(indice_ancestros=indice)
+            ruta = ""
+            for i in range(profundidad):
+                fs.insertar(ruta or "/", f"c{i}", "carpeta")
+                ruta += f"/c{i}"
+            fs.insertar("/", "viajera", "carpeta")
+            viajera, punta = fs.buscar_nodo_por_ruta("/viajera"), fs.buscar_nodo_por_ruta(ruta)
+            gc.collect()
+
+            chequeo = medir(lambda: fs._contiene(viajera, punta), movidas)
+            inicio = time.perf_counter()
+            for i in range(movidas // 2):
+                fs.mover("/viajera", ruta)
+                fs.mover(ruta + "/viajera", "/")
+            mover = (time.perf_counter() - inicio) / movidas * 1e6
+
+            clave = "con_indice" if indice else "sin_indice"
+            resultados.setdefault(profundidad, {})[clave] = {"chequeo_us": chequeo, "mover_us": mover}
+            print(f"profundidad {profundidad:>5}, {clave}: chequeo de ciclo {chequeo:7.2f} µs, mover {mover:8.2f} µs")
+            del fs
+    return resultados
+
+
+# =======================================================
+# ANÁLISIS EN PARALELO (grupo de procesos)
+# =======================================================
+
+def benchmark_analisis(cantidad=500_000):
+    """
+    Extensiones y carpetas más pesadas de todo el árbol: recorriendo los Nodos en
+    un solo proceso, y con AnalisisParalelo desde el árbol vivo y desde un snapshot.
+    """
+    from analisis import AnalisisParalelo
+    from busqueda import extension_de
+
+    azar = random.Random(0)
+    extensiones = ["py", "txt", "md", "json", "png"]
+    entradas = [(f"/proyecto_{i % 500:03d}/modulo_{i % 13}/archivo_{i}.{azar.choice(extensiones)}",
+                 "archivo", "x" * (i % 700)) for i in range(cantidad)]
+    fs, _ = ArbolArchivos.desde_rutas(entradas)
+    del entradas
+    resultados = {"procesadores": os.cpu_count()}
+
+    gc.collect()
+    inicio = time.perf_counter()
+    por_extension, carpetas = {}, []
+    for ruta, nodo in fs.recorrer_dfs():
+        if nodo.es_carpeta():
+            carpetas.append((nodo.total_bytes, ruta))
+        else:
+            extension = extension_de(nodo.nombre)
+            por_extension[extension] = por_extension.get(extension, 0) + nodo.total_bytes
+    sorted(carpetas, reverse=True)[:10]
+    resultados["un_proceso_s"] = time.perf_counter() - inicio
+    print(f"recorriendo los Nodos (1 proceso): {resultados['un_proceso_s']:.2f} s")
+
+    with tempfile.TemporaryDirectory() as carpeta:
+        ruta = os.path.join(carpeta, "arbol.snap")
+        fs.guardar(ruta)
+        for procesos in sorted({1, os.cpu_count() or 1}):
+            with AnalisisParalelo(procesos) as analisis:
+                analisis.analizar_arbol(fs) # Calienta el grupo (crear los procesos no cuenta)
+                inicio = time.perf_counter()
+                analisis.analizar_arbol(fs)
+                desde_arbol = time.perf_counter() - inicio
+                inicio = time.perf_counter()
+                analisis.analizar_snapshot(ruta)
+                desde_snapshot = time.perf_counter() - inicio
+            resultados[f"{procesos}_procesos"] = {"arbol_s": desde_arbol, "snapshot_s": desde_snapshot}
+            print(f"AnalisisParalelo, {procesos:>2} procesos: desde el árbol {desde_arbol:.2f} s "
+                  f"(incluye copiar la tabla), desde el snapshot {desde_snapshot:.2f} s")
+    return resultados
+
+
+# =======================================================
+# LISTAR CARPETAS ENORMES (páginas con cursor)
+# =======================================================
+
+def benchmark_paginacion(cantidad=1_000_000, limite=1_000, repeticiones=200):
+    """Listar una carpeta de 'cantidad' hijos entera vs. una página, una página con cursor y un prefijo."""
+    fs, _ = ArbolArchivos.desde_rutas((f"/enorme/archivo_{i:07d}.txt", "archivo", None) for i in range(cantidad))
+    mitad = ("archivo", f"archivo_{cantidad // 2:07d}.txt")
+
+    resultados = {
+        "entera_ms": medir(lambda: fs.listar_contenido("/enorme"), 5) / 1e3,
+        "primera_pagina_ms": medir(lambda: fs.listar_contenido("/enorme", None, limite), repeticiones) / 1e3,
+        "pagina_del_medio_ms": medir(lambda: fs.listar_contenido("/enorme", mitad, limite), repeticiones) / 1e3,
+        "prefijo_ms": medir(lambda: fs.listar_contenido("/enorme", prefijo="archivo_05000"), repeticiones) / 1e3,
+    }
+    gc.collect()
+    inicio = time.perf_counter()
+    vistos = sum(1 for _ in fs.iterar_contenido("/enorme", tamano_pagina=limite))
+    resultados["iterar_todo_s"] = time.perf_counter() - inicio
+
+    print(f"listar_contenido entera ({cantidad:,} hijos): {resultados['entera_ms']:8.2f} ms")
+    print(f"una página de {limite} (desde el principio): {resultados['primera_pagina_ms']:8.3f} ms")
+    print(f"una página de {limite} (cursor en el medio): {resultados['pagina_del_medio_ms']:8.3f} ms")
+    print(f"prefijo 'archivo_05000' (100 hijos):       {resultados['prefijo_ms']:8.3f} ms")
+    print(f"iterar_contenido completo ({vistos:,}):     {resultados['iterar_todo_s']:8.2f} s")
+    return resultados
+
+
+# =======================================================
+# SERVIDOR ASYNCIO (generador de carga por localhost)
+# =======================================================
+
+def _servir_para_benchmark(cola, archivos: int, megas: int):
+    """Corre en otro proceso: arma el árbol, levanta el servidor y avisa el puerto por la cola."""
+    import asyncio
+    from servidor import ServidorArbol
+
+    fs, _ = ArbolArchivos.desde_rutas((f"/datos/archivo_{i}.txt", "archivo", f"contenido {i}")
+                                      for i in range(archivos))
+    fs.insertar("/", "grande.bin", "archivo", "x" * (megas * 1024 * 1024))
+
+    async def principal():
+        servidor = await ServidorArbol(fs).iniciar()
+        cola.put(servidor.puerto)
+        await servidor.servir_para_siempre()
+
+    asyncio.run(principal())
+
+
+def benchmark_servidor(pedidos=20_000, archivos=10_000, megas=32, conexiones=4, ventana=512):
+    """
+    Pedidos por segundo contra el servidor en otro proceso: de a uno (esperando
+    cada respuesta), en pipeline (ventanas de 'ventana' pedidos a la vez), una
+    mezcla de 90% lecturas y 10% cambios, y leer un archivo grande de a partes.
+    """
+    import asyncio
+    import multiprocessing
+    from cliente import ClienteArbol
+
+    cola = multiprocessing.Queue()
+    proceso = multiprocessing.Process(target=_servir_para_benchmark, args=(cola, archivos, megas), daemon=True)
+    proceso.start()
+    puerto = cola.get(timeout=120)
+    azar = random.Random(0)
+    rutas = [f"/datos/archivo_{azar.randrange(archivos)}.txt" for _ in range(pedidos)]
+    resultados = {}
+
+    async def en_ventanas(pedido, cantidad: int) -> float:
+        inicio = time.perf_counter()
+        for desde in range(0, cantidad, ventana):
+            await asyncio.gather(*(pedido(i) for i in range(desde, min(desde + ventana, cantidad))))
+        return cantidad / (time.perf_counter() - inicio)
+
+    async def medir_todo():
+        async with ClienteArbol(puerto=puerto, conexiones=conexiones) as cliente:
+            secuenciales = pedidos // 10
+            inicio = time.perf_counter()
+            for ruta in rutas[:secuenciales]:
+                await cliente.leer(ruta)
+            resultados["de_a_uno_por_s"] = secuenciales / (time.perf_counter() - inicio)
+
+            resultados["pipeline_por_s"] = await en_ventanas(lambda i: cliente.leer(rutas[i]), pedidos)
+
+            def mezcla(i):
+                if i % 10 == 0:
+                    return cliente.modificar_contenido(rutas[i], f"cambio {i}")
+                return cliente.leer(rutas[i])
+            resultados["mezcla_por_s"] = await en_ventanas(mezcla, pedidos)
+
+            inicio = time.perf_counter()
+            texto = await cliente.leer("/grande.bin")
+            resultados["archivo_grande_mb_s"] = len(texto) / 1024 / 1024 / (time.perf_counter() - inicio)
+
+    try:
+        asyncio.run(medir_todo())
+    finally:
+        proceso.terminate()
+        proceso.join()
+
+    for etiqueta, valor, unidad in (
+            ("de a uno (esperando cada respuesta)", resultados["de_a_uno_por_s"], "pedidos/s"),
+            (f"en pipeline (ventanas de {ventana})", resultados["pipeline_por_s"], "pedidos/s"),
+            ("90% lecturas / 10% cambios", resultados["mezcla_por_s"], "pedidos/s"),
+            (f"leer {megas} MB de a partes", resultados["archivo_grande_mb_s"], "MB/s")):
+        print(f"{etiqueta + ':':<38} {valor:9,.0f} {unidad}")
+    return resultados
+
+
+def correr_todo():
+    """Todas las mediciones de arriba, una detrás de otra (lo que hace el script sin opciones)."""
+    print("--- Búsqueda por ruta según el ancho de la carpeta ---")
+    benchmark_busqueda_por_ancho()
+
+    print("\n--- Llenado de una carpeta con insertar() ---")
+    benchmark_llenado_carpeta()
+
+    print("\n--- Caché de rutas (ruta profunda repetida) ---")
+    benchmark_cache_rutas()
+
+    print("\n--- Rutas ya partidas y nombres internados ---")
+    benchmark_rutas_preparadas()
+
+    print("\n--- Memoria por nodo (archivos) ---")
+    benchmark_memoria_nodos()
+
+    print("\n--- Motor de nodos vs. motor columnar ---")
+    benchmark_motores()
+
+    print("\n--- Carga masiva (insertar_lote) ---")
+    benchmark_carga_masiva()
+
+    print("\n--- Diario de cambios ---")
+    benchmark_diario()
+
+    print("\n--- Búsqueda por patrones ---")
+    benchmark_busqueda_patrones()
+
+    print("\n--- Índice de texto completo ---")
+    benchmark_indice_texto()
+
+    print("\n--- Estrés del modo concurrente ---")
+    benchmark_concurrencia()
+    probar_recorridos_concurrentes()
+
+    print("\n--- Versiones persistentes ---")
+    benchmark_versiones()
+
+    print("\n--- Deduplicación de contenidos ---")
+    benchmark_deduplicacion()
+    probar_snapshot_deduplicado()
+
+    print("\n--- Contenidos grandes en trozos ---")
+    benchmark_trozos()
+
+    print("\n--- Contenidos en memoria y disco ---")
+    benchmark_niveles()
+
+    print("\n--- Transacciones (importación) ---")
+    benchmark_transacciones()
+
+    print("\n--- Costo de las métricas ---")
+    benchmark_metricas()
+
+    print("\n--- Índice de ancestros ---")
+    benchmark_ancestros()
+
+    print("\n--- Análisis en paralelo ---")
+    benchmark_analisis()
+
+    print("\n--- Listar carpetas enormes (páginas) ---")
+    benchmark_paginacion()
+
+    print("\n--- Servidor asyncio (localhost) ---")
+    benchmark_servidor()
+
+
+def main(argumentos=None) -> int:
+    parser = argparse.ArgumentParser(description="Mediciones de rendimiento de ArbolArchivos.")
+    parser.add_argument("--suite", action="store_true",
+                        help="Corre solo la suite por forma de árbol (en vez de todas las mediciones).")
+    parser.add_argument("--tamanos", type=int, nargs="+", default=[1_000, 10_000, 100_000],
+                        help="Cantidades de nodos (de 10^3 hasta 10^7; 10^7 necesita varios GB de RAM).")
+    parser.add_argument("--formas", nargs="+", choices=sorted(FORMAS), default=list(FORMAS))
+    parser.add_argument("--muestras", type=int, default=10_000, help="Rutas al azar para cada operación.")
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--json", help="Archivo donde guardar los resultados.")
+    parser.add_argument("--comparar", help="Resultados JSON de una corrida anterior para buscar regresiones.")
+    parser.add_argument("--corridas", type=int, default=CORRIDAS,
+                        help="Veces que se mide cada forma y tamaño (cada una con un árbol nuevo).")
+    parser.add_argument("--tolerancia", type=float, default=MINIMO_TOLERANCIA,
+                        help="Lo mínimo que tiene que empeorar una mediana para contar como regresión "
+                             "(0.05 = 5%%); si el ruido medido entre corridas es mayor, manda el ruido.")
+    opciones = parser.parse_args(argumentos)
+
+    if not opciones.suite:
+        correr_todo()
+        return 0
+
+    print("--- Suite por forma de árbol ---")
+    actual = suite_por_forma(opciones.tamanos, opciones.formas, opciones.muestras, opciones.semilla,
+                             opciones.corridas)
+    if opciones.json:
+        with open(opciones.json, "w", encoding="utf-8") as archivo:
+            json.dump(actual, archivo, indent=2, ensure_ascii=False)
+        print(f"Resultados guardados en '{opciones.json}'.")
+
+    if opciones.comparar:
+        with open(opciones.comparar, encoding="utf-8") as archivo:
+            anterior = json.load(archivo)
+        regresiones = comparar_resultados(anterior, actual, opciones.tolerancia)
+        for forma, cantidad, operacion, antes, ahora, cambio, umbral in regresiones:
+            print(f"REGRESIÓN {forma} n={cantidad} {operacion}: {antes:.2f} -> {ahora:.2f} "
+                  f"({cambio:+.0%} respecto de la referencia, umbral {umbral:.0%})")
+        if regresiones:
+            return 1
+        print(f"Sin regresiones respecto de '{opciones.comparar}' "
+              f"(umbral según el ruido, al menos {opciones.tolerancia:.0%}).")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
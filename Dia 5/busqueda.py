@@ -0,0 +1,189 @@
+"""
+Búsqueda por patrones sobre mi ArbolArchivos: globs con '*', '?', '[...]' y '**',
+y expresiones regulares sobre nombres o rutas completas.
+
+El IndiceNombres es un índice invertido global (nombre -> nodos y extensión -> nodos)
+que ArbolArchivos mantiene al día en insertar, eliminar y renombrar (mover no cambia
+nombres). Con él, un patrón como '**/*.py' o '/Docs/**/informe.txt' se responde
+mirando solo los candidatos del índice, sin recorrer todo el árbol.
+"""
+import re
+from fnmatch import fnmatchcase
+
+_COMODINES = re.compile(r"[*?\[]")
+
+
+def extension_de(nombre: str) -> str:
+    """'.py' para 'main.py' (en minúsculas); '' si el nombre no tiene extensión."""
+    punto = nombre.rfind(".")
+    return nombre[punto:].lower() if punto > 0 else ""
+
+
+def es_literal(segmento: str) -> bool:
+    """True si el segmento del patrón no tiene comodines."""
+    return _COMODINES.search(segmento) is None
+
+
+class IndiceNombres:
+    """Índice invertido de todo el árbol: nombre -> nodos y extensión -> nodos."""
+
+    def __init__(self):
+        self.por_nombre = {}
+        self.por_extension = {}
+
+    def agregar(self, nodo):
+        self.por_nombre.setdefault(nodo.nombre, set()).add(nodo)
+        extension = extension_de(nodo.nombre)
+        if extension:
+            self.por_extension.setdefault(extension, set()).add(nodo)
+
+    def quitar(self, nodo, nombre: str = None):
+        """Saca el nodo del índice (con 'nombre' si ya se lo cambiaron)."""
+        nombre = nodo.nombre if nombre is None else nombre
+        self._quitar_de(self.por_nombre, nombre, nodo)
+        extension = extension_de(nombre)
+        if extension:
+            self._quitar_de(self.por_extension, extension, nodo)
+
+    def agregar_subarbol(self, nodo):
+        """Agrega el nodo y todos sus descendientes (con una pila, sin recursión)."""
+        pila = [nodo]
+        while pila:
+            actual = pila.pop()
+            self.agregar(actual)
+            pila.extend(actual.children)
+
+    def quitar_subarbol(self, nodo):
+        pila = [nodo]
+        while pila:
+            actual = pila.pop()
+            self.quitar(actual)
+            pila.extend(actual.children)
+
+    def renombrar(self, nodo, nombre_viejo: str):
+        """Se llama después de cambiarle el nombre al nodo."""
+        self.quitar(nodo, nombre_viejo)
+        self.agregar(nodo)
+
+    @staticmethod
+    def _quitar_de(indice: dict, clave: str, nodo):
+        nodos = indice.get(clave)
+        if nodos is not None:
+            nodos.discard(nodo)
+            if not nodos:
+                del indice[clave]
+
+
+# =======================================================
+# GLOBS
+# =======================================================
+
+def _candidatos_del_indice(indice: IndiceNombres, ultimo: str):
+    """
+    Si el último segmento se puede responder con el índice, retorno los nodos
+    candidatos (todavía sin filtrar por carpeta base). Si no, retorno None.
+    """
+    if es_literal(ultimo):
+        return indice.por_nombre.get(ultimo, ())
+    if ultimo.startswith("*.") and es_literal(ultimo[2:]):
+        return indice.por_extension.get(ultimo[1:].lower(), ())
+    return None
+
+
+def _esta_debajo(nodo, base) -> bool:
+    """True si 'base' es un ancestro estricto de 'nodo'."""
+    actual = nodo.padre
+    while actual is not None:
+        if actual is base:
+            return True
+        actual = actual.padre
+    return False
+
+
+def buscar_glob(arbol, patron: str) -> list:
+    """
+    Retorna las rutas que coinciden con el glob. Los patrones sin '/' inicial
+    se toman desde la raíz. '**' coincide con cualquier cantidad de carpetas (incluso cero).
+    """
+    segmentos = [s for s in patron.split("/") if s]
+
+    # 1. La parte literal del principio me dice desde qué carpeta buscar
+    literales = 0
+    while literales < len(segmentos) and segmentos[literales] != "**" and es_literal(segmentos[literales]):
+        literales += 1
+    base = arbol.buscar_nodo_por_ruta("/" + "/".join(segmentos[:literales]))
+    if base is None:
+        return []
+    resto = segmentos[literales:]
+    if not resto:
+        return [arbol.ruta_de(base)]
+
+    # 2. Caso rápido '**/<nombre>' o '**/*.ext': uso el índice y filtro por la base
+    indice = arbol._indice_nombres
+    if indice is not None and len(resto) == 2 and resto[0] == "**":
+        candidatos = _candidatos_del_indice(indice, resto[1])
+        if candidatos is not None:
+            return sorted(arbol.ruta_de(nodo) for nodo in candidatos
+                          if fnmatchcase(nodo.nombre, resto[1]) and _esta_debajo(nodo, base))
+
+    # 3. Caso general: bajo por el subárbol de la base, segmento por segmento
+    return sorted(arbol.ruta_de(nodo) for nodo in _recorrer_patron(base, resto))
+
+
+def _recorrer_patron(base, segmentos: list):
+    """
+    Recorre solo lo que el patrón permite. Cada estado es (nodo, cuántos segmentos
+    ya coincidieron); 'vistos' evita repetir estados cuando hay varios '**'.
+    """
+    pila = [(base, 0)]
+    vistos = set()
+    encontrados = set()
+    while pila:
+        nodo, i = pila.pop()
+        if (id(nodo), i) in vistos:
+            continue
+        vistos.add((id(nodo), i))
+
+        if i == len(segmentos):
+            if id(nodo) not in encontrados:
+                encontrados.add(id(nodo))
+                yield nodo
+            continue
+
+        segmento = segmentos[i]
+        if segmento == "**":
+            pila.append((nodo, i + 1))                  # '**' sin consumir nada
+            for hijo in reversed(nodo.children):
+                pila.append((hijo, i))                  # '**' consume una carpeta más
+        elif es_literal(segmento):
+            hijo = nodo.buscar_hijo(segmento)           # Sin comodines: voy directo con el índice del nodo
+            if hijo is not None:
+                pila.append((hijo, i + 1))
+        else:
+            for hijo in reversed(nodo.children):
+                if fnmatchcase(hijo.nombre, segmento):
+                    pila.append((hijo, i + 1))
+
+
+# =======================================================
+# EXPRESIONES REGULARES
+# =======================================================
+
+def buscar_regex(arbol, patron: str, sobre: str = "ruta") -> list:
+    """
+    Retorna las rutas cuyo nombre (sobre="nombre") o ruta completa (sobre="ruta")
+    contiene una coincidencia de la expresión regular.
+    Sobre nombres, si hay índice, pruebo cada nombre distinto una sola vez.
+    """
+    expresion = re.compile(patron)
+
+    if sobre == "nombre" and arbol._indice_nombres is not None:
+        rutas = []
+        for nombre, nodos in arbol._indice_nombres.por_nombre.items():
+            if expresion.search(nombre):
+                rutas.extend(arbol.ruta_de(nodo) for nodo in nodos)
+        return sorted(rutas)
+
+    if sobre == "nombre":
+        return sorted(ruta for ruta, nodo in arbol.recorrer_dfs() if expresion.search(nodo.nombre))
+    return sorted(ruta for ruta, _ in arbol.recorrer_dfs() if expresion.search(ruta))
@@ -0,0 +1,332 @@
+"""
+Cliente asyncio para el servidor de servidor.py.
+
+Abre varias conexiones y reparte los pedidos en la que tenga menos esperando.
+Cada pedido es una corrutina, y se pueden lanzar muchos a la vez (con
+asyncio.gather, por ejemplo): todos los que se piden en una vuelta del event
+loop salen juntos en una sola escritura por conexión, sin esperar respuestas.
+
+    async with ClienteArbol(puerto=9400) as cliente:
+        await cliente.insertar("/", "docs", "carpeta")
+        textos = await asyncio.gather(*(cliente.leer(ruta) for ruta in rutas))
+
+Los cambios retornan True o lanzan ErrorArbolRemoto con el mensaje del árbol.
+
+Para archivos o carpetas enormes están leer_por_partes e iterar_contenido, que
+entregan cada PARTE apenas llega (con 'async for') en vez de juntar todo:
+
+    async for parte in cliente.leer_por_partes("/logs/enorme.txt"):
+        procesar(parte)
+
+Si una conexión se corta, los pedidos siguientes van por las que siguen vivas
+y la cortada se vuelve a abrir en el próximo pedido.
+"""
+import asyncio
+from collections import deque
+
+from diario import INSERTAR, ELIMINAR, MOVER, MODIFICAR, RENOMBRAR, COPIAR, ANEXAR, ESCRIBIR
+from servidor import codificar_marco, leer_marcos, BUSCAR, LISTAR, LEER, ESTADISTICAS, ERROR, PARTE
+
+# Si quien itera una respuesta larga tiene tantas partes sin leer, dejo de leer
+# esa conexión (y el servidor, al no poder escribir, deja de mandar)
+MAXIMO_PARTES_EN_COLA = 16
+
+_FIN = object() # Marca el final de una respuesta larga en su cola
+
+
+class ErrorArbolRemoto(Exception):
+    """El servidor no pudo hacer lo pedido (el mensaje es el error del árbol)."""
+
+
+class _ConexionCliente(asyncio.Protocol):
+    def __init__(self):
+        self.transporte = None
+        self.entrada = bytearray()
+        self.salida = bytearray()
+        self.esperando = {}   # id -> futuro de la respuesta
+        self.partes = {}      # id -> campos de las PARTE que ya llegaron
+        self.flujos = {}      # id -> cola de una respuesta que se itera (PARTE por PARTE)
+        self.pausada = False
+        self.sin_procesar = deque() # Marcos que llegaron mientras estaba pausada
+        self.siguiente_id = 0
+        self.programado = False
+        self.error = None
+
+    def connection_made(self, transporte):
+        self.transporte = transporte
+
+    def pendientes(self) -> int:
+        return len(self.esperando) + len(self.flujos)
+
+    def pedir(self, codigo: int, campos) -> asyncio.Future:
+        futuro = asyncio.get_running_loop().create_future()
+        self.esperando[self._encolar(codigo, campos)] = futuro
+        return futuro
+
+    def pedir_flujo(self, codigo: int, campos) -> tuple:
+        """Como pedir, pero cada PARTE va a una cola apenas llega. Retorna (id, cola)."""
+        identificador = self._encolar(codigo, campos)
+        cola = self.flujos[identificador] = asyncio.Queue()
+        return identificador, cola
+
+    def soltar_flujo(self, identificador: int):
+        """Ya nadie itera esa respuesta: lo que siga llegando se descarta."""
+        self.flujos.pop(identificador, None)
+        self.reanudar()
+
+    def reanudar(self):
+        if self.pausada and all(cola.qsize() < MAXIMO_PARTES_EN_COLA for cola in self.flujos.values()):
+            self.pausada = False
+            self._procesar()
+            if not self.pausada and self.error is None:
+                self.transporte.resume_reading()
+
+    def _encolar(self, codigo: int, campos) -> int:
+        if self.error is not None:
+            raise self.error
+        self.siguiente_id = (self.siguiente_id + 1) & 0xFFFFFFFF
+        self.salida += codificar_marco(self.siguiente_id, codigo, campos)
+        if not self.programado:
+            # Los demás pedidos de esta vuelta del loop se suman al mismo write
+            self.programado = True
+            asyncio.get_running_loop().call_soon(self._enviar)
+        return self.siguiente_id
+
+    def _enviar(self):
+        self.programado = False
+        if self.salida and self.error is None:
+            self.transporte.write(self.salida)
+        self.salida = bytearray()
+
+    def data_received(self, datos: bytes):
+        self.entrada += datos
+        try:
+            marcos = leer_marcos(self.entrada)
+        except ValueError as error:
+            self.transporte.close()
+            self._fallar(ConnectionError(f"Respuesta inválida del servidor: {error}"))
+            return
+        self.sin_procesar.extend(marcos)
+        self._procesar()
+
+    def _procesar(self, hasta_el_final: bool = False):
+        # Una sola lectura del socket trae muchas PARTE: si me pausé a la mitad, el
+        # resto espera acá (y no en la cola de quien itera) hasta que reanude
+        sin_procesar = self.sin_procesar
+        while sin_procesar and (hasta_el_final or not self.pausada):
+            identificador, estado, campos = sin_procesar.popleft()
+            cola = self.flujos.get(identificador)
+            if cola is not None:
+                self._al_flujo(identificador, cola, estado, campos)
+                continue
+            if estado == PARTE:
+                if identificador in self.esperando:
+                    self.partes.setdefault(identificador, []).extend(campos)
+                continue
+            futuro = self.esperando.pop(identificador, None)
+            anteriores = self.partes.pop(identificador, None)
+            if futuro is None or futuro.done():
+                continue # Nadie lo espera (lo cancelaron)
+            if estado == ERROR:
+                futuro.set_exception(ErrorArbolRemoto(campos[0] if campos else "Error en el servidor."))
+            else:
+                futuro.set_result(anteriores + campos if anteriores else campos)
+
+    def _al_flujo(self, identificador: int, cola: asyncio.Queue, estado: int, campos):
+        if estado == ERROR:
+            cola.put_nowait(ErrorArbolRemoto(campos[0] if campos else "Error en el servidor."))
+        elif campos:
+            cola.put_nowait(campos)
+        if estado != PARTE:
+            cola.put_nowait(_FIN)
+            del self.flujos[identificador]
+        elif cola.qsize() >= MAXIMO_PARTES_EN_COLA and not self.pausada:
+            self.pausada = True
+            self.transporte.pause_reading()
+
+    def connection_lost(self, excepcion):
+        self._procesar(hasta_el_final=True) # Lo que ya llegó se entrega antes del error
+        self._fallar(ConnectionError("Se cortó la conexión con el servidor."))
+
+    def _fallar(self, error: Exception):
+        self.error = error
+        for futuro in self.esperando.values():
+            if not futuro.done():
+                futuro.set_exception(error)
+        for cola in self.flujos.values():
+            cola.put_nowait(error)
+        self.esperando.clear()
+        self.partes.clear()
+        self.flujos.clear()
+
+
+class ClienteArbol:
+    """Un pool de conexiones a un ServidorArbol (por TCP o por un socket Unix)."""
+
+    def __init__(self, direccion: str = "127.0.0.1", puerto: int = 9400, ruta_unix: str = None,
+                 conexiones: int = 4):
+        self.direccion = direccion
+        self.puerto = puerto
+        self.ruta_unix = ruta_unix
+        self.cantidad_conexiones = conexiones
+        self._conexiones = []
+        self._reconectando = None # Tarea que vuelve a abrir las conexiones cortadas
+
+    async def conectar(self):
+        for _ in range(self.cantidad_conexiones):
+            self._conexiones.append(await self._abrir())
+        return self
+
+    async def _abrir(self) -> _ConexionCliente:
+        loop = asyncio.get_running_loop()
+        if self.ruta_unix is not None:
+            _, conexion = await loop.create_unix_connection(_ConexionCliente, self.ruta_unix)
+        else:
+            _, conexion = await loop.create_connection(_ConexionCliente, self.direccion, self.puerto)
+        return conexion
+
+    async def _reabrir_cortadas(self):
+        try:
+            for i, conexion in enumerate(list(self._conexiones)):
+                if conexion.error is None:
+                    continue
+                try:
+                    nueva = await self._abrir()
+                except OSError:
+                    continue # El servidor no contesta: sigo con las que están vivas
+                if i < len(self._conexiones) and self._conexiones[i] is conexion:
+                    self._conexiones[i] = nueva
+                else:
+                    nueva.transporte.close() # Cerraron el cliente mientras tanto
+        finally:
+            self._reconectando = None
+
+    async def cerrar(self):
+        for conexion in self._conexiones:
+            conexion.transporte.close()
+        self._conexiones = []
+        await asyncio.sleep(0) # Dejo que los transportes terminen de cerrarse
+
+    async def __aenter__(self):
+        return await self.conectar()
+
+    async def __aexit__(self, *excepcion):
+        await self.cerrar()
+
+    async def _conexion(self) -> _ConexionCliente:
+        """La conexión viva con menos pedidos en curso (antes reabro las que se cortaron)."""
+        if not self._conexiones:
+            raise ConnectionError("El cliente no está conectado (falta conectar()).")
+        if any(conexion.error is not None for conexion in self._conexiones):
+            # Una sola tarea reabre para todos los pedidos que llegan a la vez
+            if self._reconectando is None:
+                self._reconectando = asyncio.ensure_future(self._reabrir_cortadas())
+            await asyncio.shield(self._reconectando)
+        vivas = [conexion for conexion in self._conexiones if conexion.error is None]
+        if not vivas:
+            raise ConnectionError("Todas las conexiones con el servidor están cortadas.")
+        return min(vivas, key=_ConexionCliente.pendientes)
+
+    async def _pedir(self, codigo: int, *campos) -> list:
+        return await (await self._conexion()).pedir(codigo, campos)
+
+    async def _flujo(self, codigo: int, *campos):
+        """Generador asíncrono con los campos de cada PARTE (y del LISTO) de una respuesta."""
+        conexion = await self._conexion()
+        identificador, cola = conexion.pedir_flujo(codigo, campos)
+        try:
+            while True:
+                campos = await cola.get()
+                conexion.reanudar()
+                if campos is _FIN:
+                    return
+                if isinstance(campos, Exception):
+                    raise campos
+                yield campos
+        finally:
+            conexion.soltar_flujo(identificador) # Si cortan el 'async for' antes del final
+
+    # =======================================================
+    # LECTURAS
+    # =======================================================
+
+    async def buscar(self, ruta: str):
+        """{'nombre', 'tipo', 'nodos', 'bytes'} del nodo, o None si no existe."""
+        campos = await self._pedir(BUSCAR, ruta)
+        if not campos:
+            return None
+        nombre, tipo, nodos, cantidad_bytes = campos
+        return {"nombre": nombre, "tipo": tipo, "nodos": int(nodos), "bytes": int(cantidad_bytes)}
+
+    async def listar(self, ruta: str, tipo: str = None, prefijo: str = None) -> list:
+        """
+        Las tuplas (tipo, nombre), como listar_contenido (con los mismos filtros).
+        Una carpeta enorme llega de a partes.
+        """
+        if tipo is None and prefijo is None:
+            campos = await self._pedir(LISTAR, ruta)
+        else:
+            campos = await self._pedir(LISTAR, ruta, tipo, prefijo)
+        return list(zip(campos[0::2], campos[1::2]))
+
+    async def iterar_contenido(self, ruta: str, tipo: str = None, prefijo: str = None):
+        """Las mismas tuplas (tipo, nombre) que listar, pero de a una página a medida que llegan."""
+        campos = (ruta,) if tipo is None and prefijo is None else (ruta, tipo, prefijo)
+        async for pagina in self._flujo(LISTAR, *campos):
+            for entrada in zip(pagina[0::2], pagina[1::2]):
+                yield entrada
+
+    async def leer(self, ruta: str, inicio: int = None, largo: int = None) -> str:
+        """El contenido del archivo (o solo ese rango); un archivo grande llega de a partes."""
+        if inicio is None and largo is None:
+            campos = await self._pedir(LEER, ruta)
+        else:
+            campos = await self._pedir(LEER, ruta, str(inicio or 0), None if largo is None else str(largo))
+        return "".join(campos)
+
+    async def leer_por_partes(self, ruta: str):
+        """El contenido del archivo en las partes que manda el servidor, apenas llega cada una."""
+        async for campos in self._flujo(LEER, ruta):
+            for parte in campos:
+                if parte:
+                    yield parte
+
+    async def estadisticas(self, ruta: str = "/") -> dict:
+        valores = await self._pedir(ESTADISTICAS, ruta)
+        return dict(zip(("nodos", "archivos", "carpetas", "bytes"), map(int, valores)))
+
+    # =======================================================
+    # CAMBIOS
+    # =======================================================
+
+    async def insertar(self, ruta_padre: str, nombre: str, tipo: str, contenido: str = None) -> bool:
+        await self._pedir(INSERTAR, ruta_padre, nombre, tipo, contenido)
+        return True
+
+    async def eliminar(self, ruta: str) -> bool:
+        await self._pedir(ELIMINAR, ruta)
+        return True
+
+    async def mover(self, ruta_origen: str, ruta_destino: str) -> bool:
+        await self._pedir(MOVER, ruta_origen, ruta_destino)
+        return True
+
+    async def copiar(self, ruta_origen: str, ruta_destino: str) -> bool:
+        await self._pedir(COPIAR, ruta_origen, ruta_destino)
+        return True
+
+    async def renombrar(self, ruta: str, nuevo_nombre: str) -> bool:
+        await self._pedir(RENOMBRAR, ruta, nuevo_nombre)
+        return True
+
+    async def modificar_contenido(self, ruta: str, nuevo_contenido: str) -> bool:
+        await self._pedir(MODIFICAR, ruta, nuevo_contenido)
+        return True
+
+    async def anexar_contenido(self, ruta: str, texto: str) -> bool:
+        await self._pedir(ANEXAR, ruta, texto)
+        return True
+
+    async def escribir_contenido(self, ruta: str, inicio: int, texto: str) -> bool:
+        await self._pedir(ESCRIBIR, ruta, str(inicio), texto)
+        return True
@@ -0,0 +1,381 @@
+"""
+Modo concurrente de mi ArbolArchivos: para usarlo desde varios hilos a la vez
+(por ejemplo un servidor que atiende a muchos clientes).
+
+La idea es un candado de lectores/escritor (CandadoLE) por carpeta o archivo,
+pero solo para los nodos que alguien está usando en ese momento:
+
+  - Quien lee una ruta toma en modo lectura todos los nodos del camino, desde
+    la raíz hacia abajo. Los lectores nunca se bloquean entre ellos, así que
+    lecturas de subárboles distintos (o del mismo) van en paralelo.
+  - Quien cambia algo toma lectura en el camino y escritura en la carpeta que
+    cambia (el padre al insertar, eliminar o renombrar; el archivo al modificarlo).
+    Como los lectores de más abajo también tienen tomada esa carpeta, nadie
+    puede estar caminando por un subárbol mientras lo desconectan.
+  - mover baja por los dos caminos a la vez y toma escritura en los dos padres
+    (copiar hace lo mismo, pero solo lee el origen).
+
+Para que nunca haya un abrazo mortal (deadlock), todos los candados se toman en
+el mismo orden: por profundidad y, en la misma profundidad, por id del nodo.
+
+Además hay un CandadoLE global para todo el árbol:
+
+  - Las operaciones que recorren todo el árbol (buscar, guardar, mostrar_arbol,
+    ruta_de, recorrer...) lo toman en modo lectura: corren a la vez entre ellas
+    y con los lectores de rutas, y solo frenan a los cambios.
+  - Los cambios lo toman en modo escritura, después de sus candados de ruta y
+    solo para el paso que cambia el árbol. Los totales del subárbol (que suben
+    hasta la raíz), los índices, la época de la caché y el número de secuencia
+    del diario son compartidos por todo el árbol, así que ese paso (que es muy
+    corto) no puede correr en dos hilos a la vez. Lo que sí va en paralelo con
+    un cambio son todas las lecturas de rutas que no pasan por la carpeta que
+    cambia: esas no tocan el candado global.
+
+Ningún candado queda tomado mientras un generador (recorrer_dfs, recorrer_bfs,
+leer_por_partes) le entrega algo a quien lo usa: toma los candados para
+preparar cada bloque y los suelta antes de entregarlo.
+"""
+import threading
+from contextlib import contextmanager
+
+from trozos import TAMANO_TROZO
+from rutas import partes_de as _partes # Si me pasan una Ruta, uso sus partes ya hechas
+
+
+class CandadoLE:
+    """
+    Candado de lectores/escritor: muchos pueden leer a la vez, o uno solo escribir.
+    Si hay un escritor esperando, los lectores nuevos esperan detrás de él
+    (si no, con lectores llegando todo el tiempo el escritor no entraría nunca).
+    """
+    __slots__ = ("_condicion", "_lectores", "_escribiendo", "_escritores_esperando")
+
+    def __init__(self):
+        self._condicion = threading.Condition(threading.Lock())
+        self._lectores = 0
+        self._escribiendo = False
+        self._escritores_esperando = 0
+
+    def adquirir_lectura(self):
+        with self._condicion:
+            while self._escribiendo or self._escritores_esperando:
+                self._condicion.wait()
+            self._lectores += 1
+
+    def liberar_lectura(self):
+        with self._condicion:
+            self._lectores -= 1
+            if not self._lectores:
+                self._condicion.notify_all()
+
+    def adquirir_escritura(self):
+        with self._condicion:
+            self._escritores_esperando += 1
+            while self._escribiendo or self._lectores:
+                self._condicion.wait()
+            self._escritores_esperando -= 1
+            self._escribiendo = True
+
+    def liberar_escritura(self):
+        with self._condicion:
+            self._escribiendo = False
+            self._condicion.notify_all()
+
+
+class _EstadoHilo(threading.local):
+    # Cuántas operaciones del árbol tiene abiertas este hilo (si es > 0 ya tiene
+    # sus candados y las búsquedas internas no deben volver a tomarlos)
+    dentro = 0
+
+
+class ModoConcurrente:
+    """
+    Se mezcla con ArbolArchivos (ver ArbolConcurrente en ARBOL.py): cada método
+    público toma sus candados y después llama a la versión normal.
+    Los recorridos (recorrer_dfs, recorrer_bfs, recorrer) avanzan de a bloques de
+    BLOQUE_RECORRIDO nodos: cada bloque sale de un árbol quieto, pero entre un bloque
+    y otro puede haber cambios (igual que os.walk sobre un disco que se está usando).
+    """
+    BLOQUE_RECORRIDO = 1000
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # La caché de rutas es un OrderedDict que hasta los lectores modifican, y
+        # de todas formas tengo que tomar el candado de cada nodo del camino: la apago.
+        self.tam_cache = 0
+
+        self._candados = {}                    # nodo -> [CandadoLE, cuántos hilos lo usan]
+        self._candado_tabla = threading.Lock() # Protege el diccionario de arriba
+        self._arbol = CandadoLE()              # Global: lectura para recorrer todo, escritura para cambiar
+        self._hilo = _EstadoHilo()
+
+    # =======================================================
+    # TABLA DE CANDADOS (solo existen los que alguien está usando)
+    # =======================================================
+
+    def _tomar_nodo(self, nodo, escritura: bool):
+        with self._candado_tabla:
+            entrada = self._candados.get(nodo)
+            if entrada is None:
+                entrada = self._candados[nodo] = [CandadoLE(), 0]
+            entrada[1] += 1
+        # Espero afuera de la tabla, para no frenar a los que toman otros nodos
+        if escritura:
+            entrada[0].adquirir_escritura()
+        else:
+            entrada[0].adquirir_lectura()
+
+    def _soltar_nodo(self, nodo, escritura: bool):
+        with self._candado_tabla:
+            entrada = self._candados[nodo]
+            if escritura:
+                entrada[0].liberar_escritura()
+            else:
+                entrada[0].liberar_lectura()
+            entrada[1] -= 1
+            if not entrada[1]:
+                del self._candados[nodo]
+
+    def _tomar_caminos(self, caminos) -> list:
+        """
+        'caminos' es una lista de (partes de la ruta, ¿escritura en el último nodo?).
+        Bajo por todos a la vez, nivel por nivel, y en cada nivel tomo los nodos
+        ordenados por id. Si un camino no existe me quedo hasta donde llegué
+        (la operación normal después se da cuenta y muestra el error).
+        Retorna los (nodo, escritura) tomados, para soltarlos después.
+        """
+        tomados = []
+        if len(caminos) == 1:
+            # Caso común: un solo camino, un nodo por nivel (ya está en orden)
+            partes, escritura = caminos[0]
+            nodo = self.raiz
+            for nivel in range(len(partes) + 1):
+                modo = escritura and nivel == len(partes)
+                self._tomar_nodo(nodo, modo)
+                tomados.append((nodo, modo))
+                if nivel == len(partes):
+                    break
+                nodo = nodo.buscar_hijo(partes[nivel])
+                if nodo is None:
+                    break
+            return tomados
+
+        actuales = [self.raiz] * len(caminos)
+        nivel = 0
+        while any(nodo is not None for nodo in actuales):
+            pedidos = {}
+            for nodo, (partes, escritura) in zip(actuales, caminos):
+                if nodo is not None:
+                    pedidos[nodo] = pedidos.get(nodo, False) or (escritura and nivel == len(partes))
+            for nodo in sorted(pedidos, key=id):
+                self._tomar_nodo(nodo, pedidos[nodo])
+                tomados.append((nodo, pedidos[nodo]))
+
+            for i, (partes, _) in enumerate(caminos):
+                if actuales[i] is not None:
+                    actuales[i] = actuales[i].buscar_hijo(partes[nivel]) if nivel < len(partes) else None
+            nivel += 1
+        return tomados
+
+    @contextmanager
+    def _operacion(self, caminos=(), cambia: bool = False):
+        """Toma los candados de los caminos (y el global en escritura si la operación cambia el árbol)."""
+        if self._hilo.dentro:
+            yield # Llamada interna: ya tengo todo lo que necesito
+            return
+        tomados = self._tomar_caminos(caminos)
+        self._hilo.dentro += 1
+        try:
+            if cambia:
+                self._arbol.adquirir_escritura()
+                try:
+                    yield
+                finally:
+                    self._arbol.liberar_escritura()
+            else:
+                yield
+        finally:
+            self._hilo.dentro -= 1
+            for nodo, escritura in reversed(tomados):
+                self._soltar_nodo(nodo, escritura)
+
+    @contextmanager
+    def _todo_el_arbol(self, cambia: bool = False):
+        """
+        Para recorrer el árbol entero: ningún cambio puede pasar mientras tanto, pero
+        otros recorridos sí (con cambia=True es exclusivo, para compactar).
+        """
+        if self._hilo.dentro:
+            yield # Ya estoy dentro de una operación (el CandadoLE no es reentrante)
+            return
+        if cambia:
+            self._arbol.adquirir_escritura()
+        else:
+            self._arbol.adquirir_lectura()
+        self._hilo.dentro += 1
+        try:
+            yield
+        finally:
+            self._hilo.dentro -= 1
+            if cambia:
+                self._arbol.liberar_escritura()
+            else:
+                self._arbol.liberar_lectura()
+
+    def _de_a_bloques(self, generador):
+        """
+        Entrega lo que produce 'generador' (que recorre el árbol) sin tener candados
+        tomados mientras quien lo usa procesa cada elemento: avanzo de a
+        BLOQUE_RECORRIDO elementos con el candado global en lectura y entrego el
+        bloque ya suelto.
+        """
+        while True:
+            with self._todo_el_arbol():
+                bloque = [elemento for _, elemento in zip(range(self.BLOQUE_RECORRIDO), generador)]
+            yield from bloque
+            if len(bloque) < self.BLOQUE_RECORRIDO:
+                return
+
+    # =======================================================
+    # LECTURAS
+    # =======================================================
+
+    def buscar_nodo_por_ruta(self, ruta: str):
+        if self._hilo.dentro:
+            return self._resolver_ruta(ruta)
+        with self._operacion([(_partes(ruta), False)]):
+            return self._resolver_ruta(ruta)
+
+    def listar_contenido(self, ruta: str, desde=None, limite: int = None, tipo: str = None,
+                         prefijo: str = None):
+        # iterar_contenido pasa por acá en cada página: no tengo la carpeta tomada entre una y otra
+        with self._operacion([(_partes(ruta), False)]):
+            return super().listar_contenido(ruta, desde, limite, tipo, prefijo)
+
+    def leer_archivo(self, ruta: str, inicio: int = 0, largo: int = None) -> str:
+        with self._operacion([(_partes(ruta), False)]):
+            return super().leer_archivo(ruta, inicio, largo)
+
+    def leer_por_partes(self, ruta: str, tamano: int = TAMANO_TROZO):
+        # Cada parte se lee con el camino tomado en lectura, pero entre una parte y otra
+        # el archivo puede cambiar (igual que leer un archivo real mientras lo escriben)
+        partes = super().leer_por_partes(ruta, tamano)
+        camino = [(_partes(ruta), False)]
+        while True:
+            with self._operacion(camino):
+                parte = next(partes, None)
+            if parte is None:
+                return
+            yield parte
+
+    def estadisticas_tamano(self, ruta: str = "/") -> dict:
+        with self._operacion([(_partes(ruta), False)]):
+            return super().estadisticas_tamano(ruta)
+
+    # =======================================================
+    # CAMBIOS
+    # =======================================================
+
+    def insertar(self, ruta_padre: str, nombre: str, tipo: str, contenido: str = None) -> bool:
+        with self._operacion([(_partes(ruta_padre), True)], cambia=True):
+            return super().insertar(ruta_padre, nombre, tipo, contenido)
+
+    def eliminar(self, ruta: str) -> bool:
+        with self._operacion([(_partes(ruta)[:-1], True)], cambia=True):
+            return super().eliminar(ruta)
+
+    def mover(self, ruta_origen: str, ruta_destino: str) -> bool:
+        # Escritura en el padre de donde sale y en la carpeta a donde llega. Como tengo
+        # tomado todo el camino del destino, el chequeo de ciclos no puede cambiar a medias.
+        caminos = [(_partes(ruta_origen)[:-1], True), (_partes(ruta_destino), True)]
+        with self._operacion(caminos, cambia=True):
+            return super().mover(ruta_origen, ruta_destino)
+
+    def copiar(self, ruta_origen: str, ruta_destino: str) -> bool:
+        # Lectura de todo lo que copio (tengo tomado su padre) y escritura en el destino
+        caminos = [(_partes(ruta_origen)[:-1], False), (_partes(ruta_destino), True)]
+        with self._operacion(caminos, cambia=True):
+            return super().copiar(ruta_origen, ruta_destino)
+
+    def modificar_contenido(self, ruta: str, nuevo_contenido: str) -> bool:
+        with self._operacion([(_partes(ruta), True)], cambia=True):
+            return super().modificar_contenido(ruta, nuevo_contenido)
+
+    def escribir_contenido(self, ruta: str, inicio: int, texto: str) -> bool:
+        with self._operacion([(_partes(ruta), True)], cambia=True):
+            return super().escribir_contenido(ruta, inicio, texto)
+
+    def anexar_contenido(self, ruta: str, texto: str) -> bool:
+        with self._operacion([(_partes(ruta), True)], cambia=True):
+            return super().anexar_contenido(ruta, texto)
+
+    def renombrar(self, ruta: str, nuevo_nombre: str) -> bool:
+        with self._operacion([(_partes(ruta)[:-1], True)], cambia=True):
+            return super().renombrar(ruta, nuevo_nombre)
+
+    def insertar_lote(self, entradas):
+        # Un lote puede tocar cualquier carpeta: escritura en la raíz deja afuera a todos los lectores
+        with self._operacion([([], True)], cambia=True):
+            return super().insertar_lote(entradas)
+
+    def _aplicar_transaccion(self, transaccion):
+        # Igual que un lote: puede tocar cualquier carpeta, así que escritura en la raíz
+        with self._operacion([([], True)], cambia=True):
+            return super()._aplicar_transaccion(transaccion)
+
+    # =======================================================
+    # OPERACIONES SOBRE TODO EL ÁRBOL
+    # =======================================================
+
+    def guardar(self, ruta: str):
+        with self._todo_el_arbol():
+            return super().guardar(ruta)
+
+    def compactar(self):
+        # Vacía el diario: nadie puede estar anotando ni guardando a la vez
+        with self._todo_el_arbol(cambia=True):
+            return super().compactar()
+
+    def _exportar_metadatos(self):
+        # Solo la copia de la tabla frena los cambios; el análisis en sí corre después, sin candados
+        with self._todo_el_arbol():
+            return super()._exportar_metadatos()
+
+    def buscar(self, patron: str, regex: bool = False, sobre: str = "ruta") -> list:
+        with self._todo_el_arbol():
+            return super().buscar(patron, regex, sobre)
+
+    def buscar_texto(self, consulta: str) -> list:
+        with self._todo_el_arbol():
+            return super().buscar_texto(consulta)
+
+    def ruta_de(self, nodo) -> str:
+        with self._todo_el_arbol():
+            return super().ruta_de(nodo)
+
+    def es_ancestro(self, ruta_a: str, ruta_b: str) -> bool:
+        # El índice de ancestros es uno solo para todo el árbol (y sin índice subo hasta la raíz)
+        with self._todo_el_arbol():
+            return super().es_ancestro(ruta_a, ruta_b)
+
+    def profundidad(self, ruta: str) -> int:
+        with self._todo_el_arbol():
+            return super().profundidad(ruta)
+
+    def mostrar_arbol(self, flujo=None, lineas_por_bloque: int = 1000):
+        with self._todo_el_arbol():
+            return super().mostrar_arbol(flujo, lineas_por_bloque)
+
+    # Son generadores (con yield from) igual que los del árbol base: así las métricas
+    # las reconocen como recorridos y cuentan los elementos (ver metricas.py)
+    def recorrer_dfs(self, ruta: str = "/"):
+        if self._hilo.dentro:
+            yield from super().recorrer_dfs(ruta) # Llamada interna: ya tengo el árbol quieto
+        else:
+            yield from self._de_a_bloques(super().recorrer_dfs(ruta))
+
+    def recorrer_bfs(self, ruta: str = "/"):
+        if self._hilo.dentro:
+            yield from super().recorrer_bfs(ruta)
+        else:
+            yield from self._de_a_bloques(super().recorrer_bfs(ruta))
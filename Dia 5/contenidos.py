@@ -0,0 +1,104 @@
+"""
+Almacén de contenidos deduplicado para mi ArbolArchivos.
+
+Cada texto distinto se guarda una sola vez, identificado por su hash (BLAKE2b),
+con un contador de referencias: cuántos archivos lo están usando. Los nodos no
+guardan el texto sino un Blob, que es un "contenido diferido" igual que los de
+los snapshots (tiene 'longitud_bytes' y 'materializar()'), así que Nodo no
+necesita saber nada del almacén.
+
+Cuando el contador de un blob llega a cero (se eliminó o modificó el último
+archivo que lo usaba), el almacén lo suelta.
+
+Si además hay un GestorNiveles (niveles.py), el texto de cada blob queda a
+cargo del gestor y puede bajar a disco cuando no se usa.
+"""
+from hashlib import blake2b
+
+from niveles import ContenidoEnNivel
+
+
+class Blob:
+    """Un contenido guardado en el almacén. Lo comparten todos los archivos con ese mismo texto."""
+    __slots__ = ("clave", "texto", "longitud_bytes")
+
+    def __init__(self, clave: bytes, texto: str, longitud_bytes: int):
+        self.clave = clave
+        self.texto = texto
+        self.longitud_bytes = longitud_bytes
+
+    def materializar(self) -> str:
+        texto = self.texto
+        return texto if type(texto) is str else texto.materializar()
+
+
+class AlmacenContenidos:
+    """Contenidos direccionados por hash con conteo de referencias."""
+
+    def __init__(self, niveles=None):
+        self._blobs = {}       # hash -> Blob
+        self._referencias = {} # hash -> cuántos archivos lo usan
+        self._niveles = niveles
+
+    def guardar(self, texto: str) -> Blob:
+        """Retorna el blob de ese texto (creándolo si es nuevo) y le suma una referencia."""
+        datos = texto.encode("utf-8")
+        clave = blake2b(datos, digest_size=16).digest()
+        blob = self._blobs.get(clave)
+        if blob is None:
+            if self._niveles is not None:
+                texto = self._niveles.registrar(texto)
+            blob = self._blobs[clave] = Blob(clave, texto, len(datos))
+            self._referencias[clave] = 0
+        self._referencias[clave] += 1
+        return blob
+
+    def guardar_diferido(self, contenido, datos) -> Blob:
+        """
+        Como guardar, para un contenido diferido (el de un snapshot) del que ya
+        tengo los bytes a mano ('datos', sin copiar): si el texto es nuevo, el blob
+        se queda con el contenido diferido y no lo decodifica.
+        """
+        clave = blake2b(datos, digest_size=16).digest()
+        blob = self._blobs.get(clave)
+        if blob is None:
+            blob = self._blobs[clave] = Blob(clave, contenido, contenido.longitud_bytes)
+            self._referencias[clave] = 0
+        self._referencias[clave] += 1
+        return blob
+
+    def compartir(self, blob: Blob) -> Blob:
+        """Otro archivo más usa el mismo blob (para copiar sin duplicar)."""
+        self._referencias[blob.clave] += 1
+        return blob
+
+    def liberar(self, blob: Blob):
+        """Un archivo dejó de usar el blob; si era el último, lo borro."""
+        restantes = self._referencias[blob.clave] - 1
+        if restantes:
+            self._referencias[blob.clave] = restantes
+        else:
+            del self._referencias[blob.clave]
+            del self._blobs[blob.clave]
+            if type(blob.texto) is ContenidoEnNivel: # Los de un snapshot no son del gestor
+                self._niveles.liberar(blob.texto)
+
+    def estadisticas(self) -> dict:
+        """
+        bytes_logicos: lo que ocuparían los contenidos si cada archivo tuviera el suyo.
+        bytes_guardados: lo que ocupan de verdad (un texto por blob).
+        """
+        logicos = sum(blob.longitud_bytes * self._referencias[clave] for clave, blob in self._blobs.items())
+        guardados = sum(blob.longitud_bytes for blob in self._blobs.values())
+        return {
+            "blobs": len(self._blobs),
+            "referencias": sum(self._referencias.values()),
+            "bytes_logicos": logicos,
+            "bytes_guardados": guardados,
+            "bytes_ahorrados": logicos - guardados,
+            "proporcion_dedup": logicos / guardados if guardados else 1.0,
+        }
+
+
+def es_blob(contenido) -> bool:
+    return type(contenido) is Blob
@@ -0,0 +1,201 @@
+"""
+Diario (write-ahead log) de mi ArbolArchivos: cada cambio exitoso se anota
+al final de un archivo que solo crece, para poder reconstruir el árbol
+después de un corte sin tener que guardar un snapshot completo cada vez.
+
+Formato:
+
+    CABECERA  magia b"ARBD" y versión
+    REGISTRO  largo del cuerpo, CRC32, número de secuencia (LSN), operación
+              y los campos (cada uno: largo + UTF-8, o 0xFFFFFFFF si es None)
+
+Si el último registro quedó a medias (se cortó la luz mientras escribía),
+al reproducir el diario lo detecto por el CRC y lo descarto.
+"""
+import os
+import struct
+import threading
+import zlib
+
+MAGIA = b"ARBD"
+VERSION = 1
+
+_CABECERA = struct.Struct("<4sHxx")
+_REGISTRO = struct.Struct("<IIQB") # largo de los campos, crc, lsn, operación
+_LARGO = struct.Struct("<I")
+_NINGUNO = 0xFFFFFFFF
+
+# Operaciones que se pueden anotar
+INSERTAR = 1
+ELIMINAR = 2
+MOVER = 3
+MODIFICAR = 4
+RENOMBRAR = 5
+COPIAR = 6
+ANEXAR = 7
+ESCRIBIR = 8
+TRANSACCION = 9 # Un lote entero en un solo registro: con un solo CRC se reproduce todo o nada
+
+
+class ErrorDiario(Exception):
+    """El archivo no es un diario válido."""
+
+
+def _codificar_campos(campos) -> bytes:
+    partes = []
+    for campo in campos:
+        if campo is None:
+            partes.append(_LARGO.pack(_NINGUNO))
+        else:
+            datos = campo.encode("utf-8")
+            partes.append(_LARGO.pack(len(datos)))
+            partes.append(datos)
+    return b"".join(partes)
+
+
+def _decodificar_campos(datos: bytes, posicion: int, fin: int) -> list:
+    """Lee los campos que están entre 'posicion' y 'fin' directamente del buffer (sin copiarlo)."""
+    campos = []
+    desempaquetar = _LARGO.unpack_from
+    while posicion < fin:
+        largo = desempaquetar(datos, posicion)[0]
+        posicion += 4
+        if largo == _NINGUNO:
+            campos.append(None)
+        else:
+            campos.append(datos[posicion:posicion + largo].decode("utf-8"))
+            posicion += largo
+    return campos
+
+
+class Diario:
+    """
+    Archivo de solo-agregar con confirmación en grupo (group commit):
+    los registros se juntan en memoria y se escriben + fsync todos juntos cuando
+    hay 'lote_fsync' pendientes o pasaron 'intervalo_fsync' segundos.
+    Con lote_fsync=1 cada cambio queda en disco antes de retornar.
+    """
+
+    def __init__(self, ruta: str, lote_fsync: int = 64, intervalo_fsync: float = 0.05):
+        self.ruta = ruta
+        self.lote_fsync = max(1, lote_fsync)
+        self.intervalo_fsync = intervalo_fsync
+
+        self._pendientes = bytearray()
+        self._cantidad_pendiente = 0
+        self._candado = threading.Lock()
+        self.registros_escritos = 0
+        self.sincronizaciones = 0
+
+        if not os.path.exists(ruta) or os.path.getsize(ruta) == 0:
+            with open(ruta, "wb") as archivo:
+                archivo.write(_CABECERA.pack(MAGIA, VERSION))
+                archivo.flush()
+                os.fsync(archivo.fileno())
+        self._archivo = None # Lo abro para agregar después de reproducir (ver abrir_para_escribir)
+
+        # Hilo que sincroniza lo pendiente aunque no lleguen más cambios
+        self._detener = threading.Event()
+        self._hilo = None
+        if intervalo_fsync > 0:
+            self._hilo = threading.Thread(target=self._sincronizar_periodicamente, daemon=True)
+
+    # =======================================================
+    # LECTURA (reproducción al arrancar)
+    # =======================================================
+
+    def leer_registros(self):
+        """
+        Recorre los registros válidos del diario: (lsn, operación, campos).
+        Si encuentro un registro cortado o dañado al final, corto el archivo ahí.
+        """
+        with open(self.ruta, "rb") as archivo:
+            datos = archivo.read()
+
+        if len(datos) < _CABECERA.size:
+            raise ErrorDiario(f"'{self.ruta}' es demasiado corto para ser un diario.")
+        magia, version = _CABECERA.unpack_from(datos, 0)
+        if magia != MAGIA:
+            raise ErrorDiario(f"'{self.ruta}' no es un diario de ArbolArchivos.")
+        if version != VERSION:
+            raise ErrorDiario(f"Versión de diario no soportada: {version} (espero {VERSION}).")
+
+        vista = memoryview(datos)
+        posicion = _CABECERA.size
+        while posicion + _REGISTRO.size <= len(datos):
+            largo, crc, lsn, operacion = _REGISTRO.unpack_from(datos, posicion)
+            inicio_campos = posicion + _REGISTRO.size
+            fin = inicio_campos + largo
+            if fin > len(datos) or zlib.crc32(vista[posicion + 8:fin]) != crc:
+                break # Registro a medias: de acá en adelante no hay nada confiable
+            yield lsn, operacion, _decodificar_campos(datos, inicio_campos, fin)
+            posicion = fin
+
+        if posicion != len(datos):
+            os.truncate(self.ruta, posicion)
+
+    # =======================================================
+    # ESCRITURA
+    # =======================================================
+
+    def abrir_para_escribir(self):
+        """Empiezo a agregar al final (después de haber reproducido lo que había)."""
+        self._archivo = open(self.ruta, "ab")
+        if self._hilo is not None and not self._hilo.is_alive():
+            self._hilo.start()
+
+    def registrar(self, lsn: int, operacion: int, *campos):
+        """Anoto un cambio. Queda pendiente hasta la próxima sincronización del grupo."""
+        cuerpo = _codificar_campos(campos)
+        encabezado = struct.pack("<QB", lsn, operacion)
+        crc = zlib.crc32(cuerpo, zlib.crc32(encabezado))
+        with self._candado:
+            self._pendientes += _LARGO.pack(len(cuerpo)) + _LARGO.pack(crc) + encabezado + cuerpo
+            self._cantidad_pendiente += 1
+            if self._cantidad_pendiente >= self.lote_fsync:
+                self._escribir_pendientes()
+
+    def sincronizar(self):
+        """Escribe y hace fsync de todo lo pendiente (una sola llamada al disco para el grupo)."""
+        with self._candado:
+            self._escribir_pendientes()
+
+    def _escribir_pendientes(self):
+        if not self._cantidad_pendiente or self._archivo is None:
+            return
+        self._archivo.write(self._pendientes)
+        self._archivo.flush()
+        os.fsync(self._archivo.fileno())
+        self.registros_escritos += self._cantidad_pendiente
+        self.sincronizaciones += 1
+        self._pendientes = bytearray()
+        self._cantidad_pendiente = 0
+
+    def _sincronizar_periodicamente(self):
+        while not self._detener.wait(self.intervalo_fsync):
+            self.sincronizar()
+
+    def vaciar(self):
+        """Deja el diario vacío (solo la cabecera). Se usa después de compactar en un snapshot."""
+        with self._candado:
+            self._escribir_pendientes()
+            temporal = self.ruta + ".tmp"
+            with open(temporal, "wb") as archivo:
+                archivo.write(_CABECERA.pack(MAGIA, VERSION))
+                archivo.flush()
+                os.fsync(archivo.fileno())
+            if self._archivo is not None:
+                self._archivo.close()
+            os.replace(temporal, self.ruta)
+            self._archivo = open(self.ruta, "ab")
+
+    def cerrar(self):
+        """Sincroniza lo pendiente y cierra el archivo."""
+        self._detener.set()
+        if self._hilo is not None and self._hilo.is_alive():
+            self._hilo.join()
+        with self._candado:
+            self._escribir_pendientes()
+            if self._archivo is not None:
+                self._archivo.close()
+                self._archivo = None
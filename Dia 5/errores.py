@@ -0,0 +1,55 @@
+"""
+Cómo muestran sus errores mis árboles: se imprimen como siempre ("Error: ..."),
+o se juntan en una lista si alguien los está capturando en ese hilo (por ejemplo
+el servidor, para mandárselos al cliente que hizo el pedido).
+
+Lo usan los tres motores (ArbolArchivos, ArbolColumnar y ArbolPersistente), así
+capturar_errores funciona igual sin importar cuál se eligió. Cada árbol crea su
+propio ErroresCapturados en __init__ (como self._capturados).
+"""
+import threading
+from contextlib import contextmanager
+
+
+class ErroresCapturados(threading.local):
+    lista = None # Mientras alguien captura (ver capturar_errores), los errores de este hilo van acá
+
+
+class ManejoDeErrores:
+    """Se mezcla con cada motor: _error, _error_de_lectura y capturar_errores."""
+    __slots__ = () # Sin estado propio (así Version, que usa __slots__, no gana un __dict__)
+
+    def _error(self, mensaje: str):
+        """
+        Muestro el error, o lo guardo si alguien los está capturando en este hilo.
+        Con las métricas activas se cuenta por operación en vez de imprimirse.
+        """
+        capturados = self._capturados.lista
+        if capturados is not None:
+            capturados.append(mensaje)
+            return
+        print(f"Error: {mensaje}")
+
+    def _error_de_lectura(self, mensaje: str) -> str:
+        """leer_archivo retorna el error en vez de imprimirlo (igual se cuenta con las métricas activas)."""
+        capturados = self._capturados.lista
+        if capturados is not None:
+            capturados.append(mensaje)
+        return f"Error: {mensaje}"
+
+    @contextmanager
+    def capturar_errores(self):
+        """
+        Mientras dure el 'with', los errores de este hilo no se imprimen: se juntan
+        en la lista que entrego (por ejemplo, para mandárselos a un cliente).
+
+            with fs.capturar_errores() as errores:
+                if not fs.mover("/a", "/b"):
+                    print(errores[-1])
+        """
+        anterior = self._capturados.lista
+        self._capturados.lista = errores = []
+        try:
+            yield errores
+        finally:
+            self._capturados.lista = anterior
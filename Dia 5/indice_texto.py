@@ -0,0 +1,211 @@
+"""
+Índice de texto completo sobre el contenido de los archivos de mi ArbolArchivos.
+
+Cada palabra (token) apunta a una lista de documentos donde aparece, guardada
+comprimida: por cada documento anoto la diferencia con el documento anterior y
+cuántas veces aparece la palabra, los dos como enteros de longitud variable (varint).
+Así una lista de millones de apariciones ocupa unos pocos bytes por entrada.
+
+Un "documento" es una versión del contenido de un archivo. Cuando el archivo
+cambia o se elimina, su documento queda muerto y el nuevo contenido recibe otro
+número; las listas solo crecen al final. Cuando hay muchos documentos muertos,
+compacto las listas para sacarlos y recuperar memoria.
+"""
+import re
+
+_PALABRA = re.compile(r"\w+")
+
+
+def tokenizar(texto: str) -> list:
+    """Palabras del texto en minúsculas."""
+    return _PALABRA.findall(texto.lower()) if texto else []
+
+
+def _anexar_varint(destino: bytearray, numero: int):
+    while numero >= 0x80:
+        destino.append((numero & 0x7F) | 0x80)
+        numero >>= 7
+    destino.append(numero)
+
+
+def _leer_lista(datos: bytearray):
+    """Recorre una lista comprimida y entrega (documento, frecuencia)."""
+    documento = 0
+    posicion = 0
+    largo = len(datos)
+    while posicion < largo:
+        # Diferencia con el documento anterior
+        numero = 0
+        desplazamiento = 0
+        while True:
+            byte = datos[posicion]
+            posicion += 1
+            numero |= (byte & 0x7F) << desplazamiento
+            if byte < 0x80:
+                break
+            desplazamiento += 7
+        documento += numero
+        # Frecuencia
+        frecuencia = 0
+        desplazamiento = 0
+        while True:
+            byte = datos[posicion]
+            posicion += 1
+            frecuencia |= (byte & 0x7F) << desplazamiento
+            if byte < 0x80:
+                break
+            desplazamiento += 7
+        yield documento, frecuencia
+
+
+class IndiceTexto:
+    """Índice invertido token -> lista comprimida de (documento, frecuencia)."""
+
+    def __init__(self, proporcion_compactar: float = 0.5):
+        self._listas = {}          # token -> bytearray con la lista comprimida
+        self._ultimo_doc = {}      # token -> último documento anotado (para las diferencias)
+        self._doc_de_nodo = {}     # nodo -> documento vivo de su contenido actual
+        self._nodo_de_doc = {}     # documento vivo -> nodo
+        self._siguiente_doc = 1
+        self._muertos = 0
+        self.proporcion_compactar = proporcion_compactar
+
+    # =======================================================
+    # ACTUALIZACIÓN
+    # =======================================================
+
+    def indexar(self, nodo, contenido: str):
+        """Indexa (o reindexa) el contenido de un archivo."""
+        self.quitar(nodo)
+        if not contenido:
+            return
+
+        documento = self._siguiente_doc
+        self._siguiente_doc += 1
+        self._doc_de_nodo[nodo] = documento
+        self._nodo_de_doc[documento] = nodo
+
+        frecuencias = {}
+        for token in tokenizar(contenido):
+            frecuencias[token] = frecuencias.get(token, 0) + 1
+        for token, frecuencia in frecuencias.items():
+            lista = self._listas.get(token)
+            if lista is None:
+                lista = self._listas[token] = bytearray()
+            _anexar_varint(lista, documento - self._ultimo_doc.get(token, 0))
+            _anexar_varint(lista, frecuencia)
+            self._ultimo_doc[token] = documento
+
+    def quitar(self, nodo):
+        """El contenido del nodo deja de estar indexado (su documento queda muerto)."""
+        documento = self._doc_de_nodo.pop(nodo, None)
+        if documento is None:
+            return
+        del self._nodo_de_doc[documento]
+        self._muertos += 1
+        if self._muertos > self.proporcion_compactar * max(len(self._nodo_de_doc), 1000):
+            self.compactar()
+
+    def quitar_subarbol(self, nodo):
+        pila = [nodo]
+        while pila:
+            actual = pila.pop()
+            self.quitar(actual)
+            pila.extend(actual.children)
+
+    def compactar(self):
+        """Reescribe todas las listas sin los documentos muertos."""
+        vivos = self._nodo_de_doc
+        for token in list(self._listas):
+            nueva = bytearray()
+            anterior = 0
+            for documento, frecuencia in _leer_lista(self._listas[token]):
+                if documento in vivos:
+                    _anexar_varint(nueva, documento - anterior)
+                    _anexar_varint(nueva, frecuencia)
+                    anterior = documento
+            if nueva:
+                self._listas[token] = nueva
+                self._ultimo_doc[token] = anterior
+            else:
+                del self._listas[token]
+                del self._ultimo_doc[token]
+        self._muertos = 0
+
+    # =======================================================
+    # CONSULTAS
+    # =======================================================
+
+    def _documentos(self, token: str) -> dict:
+        """documento vivo -> frecuencia, para un token."""
+        lista = self._listas.get(token)
+        if lista is None:
+            return {}
+        vivos = self._nodo_de_doc
+        return {documento: frecuencia for documento, frecuencia in _leer_lista(lista) if documento in vivos}
+
+    def buscar(self, consulta: str) -> list:
+        """
+        Retorna [(nodo, puntaje)] ordenado por puntaje (suma de frecuencias).
+        Sintaxis: palabras separadas por espacios deben estar todas (AND);
+        'OR' separa alternativas; "entre comillas" es una frase exacta.
+        Ej: 'arbol "nodo padre" OR grafo'.
+        """
+        puntajes = {}
+        for alternativa in re.split(r"\s+OR\s+", consulta.strip()):
+            for documento, puntaje in self._buscar_conjuncion(alternativa).items():
+                puntajes[documento] = max(puntajes.get(documento, 0), puntaje)
+
+        ordenados = sorted(puntajes.items(), key=lambda par: (-par[1], par[0]))
+        return [(self._nodo_de_doc[documento], puntaje) for documento, puntaje in ordenados]
+
+    def _buscar_conjuncion(self, consulta: str) -> dict:
+        """Documentos que tienen todas las palabras y frases de la consulta -> puntaje."""
+        frases = [tokenizar(frase) for frase in re.findall(r'"([^"]*)"', consulta)]
+        sueltas = tokenizar(re.sub(r'"[^"]*"', " ", consulta))
+        terminos = set(sueltas)
+        for frase in frases:
+            terminos.update(frase)
+        if not terminos:
+            return {}
+
+        # Intersecto empezando por la lista más corta
+        por_termino = sorted((self._documentos(t) for t in terminos), key=len)
+        resultado = dict(por_termino[0])
+        for documentos in por_termino[1:]:
+            resultado = {d: p + documentos[d] for d, p in resultado.items() if d in documentos}
+            if not resultado:
+                return {}
+
+        # Las frases las confirmo leyendo el contenido de los candidatos que quedaron
+        frases = [frase for frase in frases if len(frase) > 1]
+        if frases:
+            confirmados = {}
+            for documento, puntaje in resultado.items():
+                tokens = tokenizar(self._nodo_de_doc[documento].contenido)
+                if all(_contiene_frase(tokens, frase) for frase in frases):
+                    confirmados[documento] = puntaje
+            resultado = confirmados
+        return resultado
+
+    # =======================================================
+    # ESTADÍSTICAS
+    # =======================================================
+
+    def estadisticas(self) -> dict:
+        bytes_listas = sum(len(lista) for lista in self._listas.values())
+        return {
+            "tokens": len(self._listas),
+            "documentos": len(self._nodo_de_doc),
+            "documentos_muertos": self._muertos,
+            "bytes_listas": bytes_listas,
+        }
+
+
+def _contiene_frase(tokens: list, frase: list) -> bool:
+    largo = len(frase)
+    primero = frase[0]
+    for i in range(len(tokens) - largo + 1):
+        if tokens[i] == primero and tokens[i:i + largo] == frase:
+            return True
+    return False
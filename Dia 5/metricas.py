@@ -0,0 +1,426 @@
+"""
+Métricas por operación para mi ArbolArchivos (opcionales).
+
+Con fs.activar_metricas() (o ArbolArchivos(metricas=True)) cada método público
+del árbol queda envuelto por uno que mide:
+
+  - llamadas_total{operacion}       cuántas veces se llamó
+  - errores_total{operacion}        cuántas terminaron en error (en vez de imprimirlos)
+  - excepciones_total{operacion}    cuántas terminaron con una excepción
+  - duracion_segundos{operacion}    histograma de latencia
+  - nodos_visitados{operacion}      histograma de nodos recorridos al resolver cada ruta
+                                    (las que salen de la caché de rutas no recorren nada)
+  - ancho_carpeta{operacion}        histograma de cuántos hijos tenía la carpeta más
+                                    ancha por la que pasó cada resolución (lo que
+                                    cuesta insertar/sacar ordenado y listar ahí)
+  - elementos_total{operacion}      para los recorridos (generadores): cuántos entregaron
+
+Los métodos envueltos se guardan en el propio objeto (tapan a los de la clase),
+así que con las métricas apagadas no hay ningún costo: ni un 'if'. Si una
+operación llama a otra por dentro (copiar busca rutas, por ejemplo), solo se
+mide la de afuera; la resolución de rutas se anota a nombre de la de afuera.
+
+El registro junta todo en memoria y de ahí se puede sacar de varias formas:
+instantanea() (un dict), a_prometheus() (formato de texto de Prometheus),
+VolcadoPeriodico (lo escribe al log cada tanto) y ServidorPrometheus (lo sirve
+por HTTP en /metrics). Cualquier objeto con los métodos contar(), observar() y
+medidor() puede usarse en lugar del registro (las llamadas de cada operación
+son la cantidad de su histograma de duración).
+"""
+import inspect
+import json
+import logging
+import threading
+import time
+import weakref
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from rutas import partes_de
+
+# Límites (inclusive) de las cubetas de los histogramas
+CUBETAS_SEGUNDOS = (1e-6, 2.5e-6, 5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 2.5e-3,
+                    5e-3, 1e-2, 2.5e-2, 5e-2, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CUBETAS_CANTIDAD = tuple(2 ** i for i in range(25)) # 1, 2, 4, ... 16 millones
+
+_DESCRIPCIONES = {
+    "llamadas_total": ("counter", "Llamadas a cada operación del árbol."),
+    "errores_total": ("counter", "Operaciones que terminaron en error."),
+    "excepciones_total": ("counter", "Operaciones que terminaron con una excepción."),
+    "elementos_total": ("counter", "Elementos entregados por los recorridos."),
+    "duracion_segundos": ("histogram", "Latencia de cada operación."),
+    "nodos_visitados": ("histogram", "Nodos recorridos al resolver una ruta."),
+    "ancho_carpeta": ("histogram", "Hijos de la carpeta más ancha recorrida al resolver una ruta."),
+}
+_CUBETAS = {"duracion_segundos": CUBETAS_SEGUNDOS}
+
+# Métodos que no mido aunque sean públicos (los de las propias métricas)
+_SIN_MEDIR = {"activar_metricas", "desactivar_metricas", "capturar_errores"}
+# Métodos privados que sí mido, con el nombre que uso en las métricas
+_PRIVADOS_MEDIDOS = {"_aplicar_transaccion": "confirmar_transaccion"}
+
+
+class Histograma:
+    """Histograma de cubetas fijas (como los de Prometheus): cantidad, suma y cuántos cayeron en cada cubeta."""
+    __slots__ = ("limites", "cuentas", "suma", "cantidad")
+
+    def __init__(self, limites: tuple):
+        self.limites = limites
+        self.cuentas = [0] * (len(limites) + 1) # La última es "más que el último límite"
+        self.suma = 0.0
+        self.cantidad = 0
+
+    def observar(self, valor: float):
+        self.cuentas[bisect_left(self.limites, valor)] += 1
+        self.suma += valor
+        self.cantidad += 1
+
+    def percentil(self, p: float) -> float:
+        """El límite de la cubeta donde cae el percentil p (0-100); aproximado por arriba."""
+        if not self.cantidad:
+            return 0.0
+        objetivo = p / 100 * self.cantidad
+        acumulado = 0
+        for i, cuenta in enumerate(self.cuentas):
+            acumulado += cuenta
+            if acumulado >= objetivo:
+                return self.limites[i] if i < len(self.limites) else float("inf")
+        return float("inf")
+
+
+class _DatosHilo(threading.local):
+    contadores = None  # (métrica, operación) -> int, solo de este hilo
+    histogramas = None # (métrica, operación) -> Histograma, solo de este hilo
+
+
+def _acumular(contadores: dict, histogramas: dict, contadores_hilo: dict, histogramas_hilo: dict):
+    """Suma los contadores e histogramas de un hilo en los totales (sin tocar los del hilo)."""
+    for clave, valor in list(contadores_hilo.items()):
+        contadores[clave] = contadores.get(clave, 0) + valor
+    for clave, histograma in list(histogramas_hilo.items()):
+        total = histogramas.get(clave)
+        if total is None:
+            total = histogramas[clave] = Histograma(histograma.limites)
+        total.cuentas = [a + b for a, b in zip(total.cuentas, histograma.cuentas)]
+        total.suma += histograma.suma
+        total.cantidad += histograma.cantidad
+
+
+class RegistroMetricas:
+    """
+    Guarda contadores e histogramas por (métrica, operación) en memoria.
+    Cada hilo anota en sus propios diccionarios (sin candado en el camino de cada
+    operación) y al exportar sumo los de todos los hilos. Cuando un hilo termina,
+    lo suyo pasa a un total compartido (si no, un servidor que crea un hilo por
+    pedido juntaría un par de diccionarios por cada hilo que existió).
+    """
+
+    def __init__(self, prefijo: str = "arbol"):
+        self.prefijo = prefijo
+        self._hilo = _DatosHilo()
+        self._de_todos = []      # (weakref al hilo, contadores, histogramas) de cada hilo vivo que anotó algo
+        self._terminados = ({}, {}) # Lo que anotaron los hilos que ya terminaron, ya sumado
+        self._medidores = {}     # métrica -> función sin argumentos (se evalúa al exportar)
+        self._candado = threading.Lock()
+
+    def _datos_del_hilo(self):
+        contadores, histogramas = {}, {}
+        self._hilo.contadores, self._hilo.histogramas = contadores, histogramas
+        with self._candado:
+            self._juntar_terminados()
+            self._de_todos.append((weakref.ref(threading.current_thread()), contadores, histogramas))
+        return contadores, histogramas
+
+    def _juntar_terminados(self):
+        """
+        Paso a _terminados lo de los hilos que ya no existen (con el candado tomado).
+        Un hilo terminado ya no escribe, así que sus diccionarios se pueden sumar tranquilo.
+        """
+        vivos = []
+        for hilo, contadores, histogramas in self._de_todos:
+            actual = hilo()
+            if actual is None or not actual.is_alive():
+                _acumular(*self._terminados, contadores, histogramas)
+            else:
+                vivos.append((hilo, contadores, histogramas))
+        self._de_todos = vivos
+
+    def contar(self, metrica: str, operacion: str, cantidad: int = 1):
+        contadores = self._hilo.contadores
+        if contadores is None:
+            contadores = self._datos_del_hilo()[0]
+        clave = (metrica, operacion)
+        contadores[clave] = contadores.get(clave, 0) + cantidad
+
+    def observar(self, metrica: str, operacion: str, valor: float):
+        histogramas = self._hilo.histogramas
+        if histogramas is None:
+            histogramas = self._datos_del_hilo()[1]
+        clave = (metrica, operacion)
+        histograma = histogramas.get(clave)
+        if histograma is None:
+            histograma = histogramas[clave] = Histograma(_CUBETAS.get(metrica, CUBETAS_CANTIDAD))
+        # Lo mismo que Histograma.observar, sin otra llamada (esto corre en cada operación)
+        histograma.cuentas[bisect_left(histograma.limites, valor)] += 1
+        histograma.suma += valor
+        histograma.cantidad += 1
+
+    def medidor(self, metrica: str, funcion):
+        """Un valor que se lee recién al exportar (por ejemplo, la cantidad de nodos del árbol)."""
+        self._medidores[metrica] = funcion
+
+    def reiniciar(self):
+        with self._candado:
+            for _, contadores, histogramas in self._de_todos:
+                contadores.clear()
+                histogramas.clear()
+            self._terminados = ({}, {})
+
+    # =======================================================
+    # EXPORTAR
+    # =======================================================
+
+    def _sumar_hilos(self):
+        """
+        Junta los contadores e histogramas de todos los hilos. Las llamadas no se
+        cuentan aparte: son la cantidad del histograma de duración de cada operación.
+        """
+        contadores, histogramas = {}, {}
+        with self._candado:
+            self._juntar_terminados()
+            _acumular(contadores, histogramas, *self._terminados)
+            de_todos = list(self._de_todos)
+        for _, contadores_hilo, histogramas_hilo in de_todos:
+            _acumular(contadores, histogramas, contadores_hilo, histogramas_hilo)
+        for (metrica, operacion), histograma in histogramas.items():
+            if metrica == "duracion_segundos":
+                clave = ("llamadas_total", operacion)
+                contadores[clave] = contadores.get(clave, 0) + histograma.cantidad
+        return contadores, histogramas
+
+    def instantanea(self) -> dict:
+        """Todo lo medido hasta ahora, como dict (listo para json.dumps)."""
+        contadores, histogramas = self._sumar_hilos()
+        resultado = {"contadores": {}, "histogramas": {}, "medidores": {}}
+        for (metrica, operacion), valor in sorted(contadores.items()):
+            resultado["contadores"].setdefault(metrica, {})[operacion] = valor
+        for (metrica, operacion), h in sorted(histogramas.items()):
+            resultado["histogramas"].setdefault(metrica, {})[operacion] = {
+                "cantidad": h.cantidad, "suma": h.suma, "promedio": h.suma / h.cantidad if h.cantidad else 0.0,
+                "p50": h.percentil(50), "p99": h.percentil(99),
+            }
+        for metrica, funcion in sorted(self._medidores.items()):
+            resultado["medidores"][metrica] = funcion()
+        return resultado
+
+    def a_prometheus(self) -> str:
+        """Todo lo medido en el formato de texto que lee Prometheus."""
+        contadores, histogramas = self._sumar_hilos()
+        contadores = sorted(contadores.items())
+        histogramas = sorted((clave, (h.limites, h.cuentas, h.suma, h.cantidad)) for clave, h in histogramas.items())
+        lineas = []
+        anunciadas = set()
+
+        def anunciar(metrica: str, tipo: str, ayuda: str):
+            if metrica not in anunciadas:
+                anunciadas.add(metrica)
+                lineas.append(f"# HELP {self.prefijo}_{metrica} {ayuda}")
+                lineas.append(f"# TYPE {self.prefijo}_{metrica} {tipo}")
+
+        for (metrica, operacion), valor in contadores:
+            anunciar(metrica, *_DESCRIPCIONES.get(metrica, ("counter", metrica)))
+            lineas.append(f'{self.prefijo}_{metrica}{{operacion="{operacion}"}} {valor}')
+        for (metrica, operacion), (limites, cuentas, suma, cantidad) in histogramas:
+            anunciar(metrica, *_DESCRIPCIONES.get(metrica, ("histogram", metrica)))
+            nombre = f"{self.prefijo}_{metrica}"
+            acumulado = 0
+            for limite, cuenta in zip(limites, cuentas):
+                acumulado += cuenta
+                lineas.append(f'{nombre}_bucket{{operacion="{operacion}",le="{limite:g}"}} {acumulado}')
+            lineas.append(f'{nombre}_bucket{{operacion="{operacion}",le="+Inf"}} {cantidad}')
+            lineas.append(f'{nombre}_sum{{operacion="{operacion}"}} {suma!r}')
+            lineas.append(f'{nombre}_count{{operacion="{operacion}"}} {cantidad}')
+        for metrica, funcion in sorted(self._medidores.items()):
+            anunciar(metrica, "gauge", metrica.replace("_", " ").capitalize() + ".")
+            lineas.append(f"{self.prefijo}_{metrica} {funcion()!r}")
+        return "\n".join(lineas) + "\n"
+
+
+# =======================================================
+# SALIDAS (volcado periódico al log y servidor para Prometheus)
+# =======================================================
+
+class VolcadoPeriodico:
+    """Cada 'intervalo' segundos escribe la instantánea del registro (en JSON) con 'escribir'."""
+
+    def __init__(self, registro: RegistroMetricas, intervalo: float = 60.0, escribir=None):
+        self.registro = registro
+        self.intervalo = intervalo
+        self.escribir = escribir or logging.getLogger("arbol.metricas").info
+        self._detener = threading.Event()
+        self._hilo = threading.Thread(target=self._volcar_periodicamente, daemon=True)
+        self._hilo.start()
+
+    def volcar(self):
+        self.escribir(json.dumps(self.registro.instantanea(), ensure_ascii=False))
+
+    def _volcar_periodicamente(self):
+        while not self._detener.wait(self.intervalo):
+            self.volcar()
+
+    def detener(self):
+        """Para el hilo y hace un último volcado (para no perder lo del último intervalo)."""
+        self._detener.set()
+        self._hilo.join()
+        self.volcar()
+
+
+class ServidorPrometheus:
+    """Sirve a_prometheus() por HTTP en /metrics (con puerto=0 elige uno libre, ver 'puerto')."""
+
+    def __init__(self, registro: RegistroMetricas, puerto: int = 9464, direccion: str = "127.0.0.1"):
+        class Manejador(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path != "/metrics":
+                    self.send_error(404)
+                    return
+                cuerpo = registro.a_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(cuerpo)))
+                self.end_headers()
+                self.wfile.write(cuerpo)
+
+            def log_message(self, *argumentos):
+                pass # Sin una línea en la pantalla por cada consulta
+
+        self._servidor = ThreadingHTTPServer((direccion, puerto), Manejador)
+        self.puerto = self._servidor.server_address[1]
+        self._hilo = threading.Thread(target=self._servidor.serve_forever, daemon=True)
+        self._hilo.start()
+
+    def cerrar(self):
+        self._servidor.shutdown()
+        self._servidor.server_close()
+
+
+# =======================================================
+# INSTRUMENTACIÓN DEL ÁRBOL
+# =======================================================
+
+class _EstadoHilo(threading.local):
+    operacion = None # La operación de afuera que está corriendo en este hilo (None = ninguna)
+
+
+def _metodos_a_medir(clase):
+    """(nombre del método, nombre en las métricas, ¿es un generador?) de cada método a envolver."""
+    for nombre in dir(clase):
+        atributo = inspect.getattr_static(clase, nombre)
+        if isinstance(atributo, (classmethod, staticmethod, property)) or not inspect.isfunction(atributo):
+            continue
+        if nombre in _PRIVADOS_MEDIDOS:
+            yield nombre, _PRIVADOS_MEDIDOS[nombre], False
+        elif not nombre.startswith("_") and nombre not in _SIN_MEDIR:
+            yield nombre, nombre, inspect.isgeneratorfunction(atributo)
+
+
+def instrumentar(arbol, registro):
+    """Tapa los métodos del árbol con versiones que miden (guardadas en el propio objeto)."""
+    estado = _EstadoHilo()
+    reloj = time.perf_counter
+    reemplazos = {}
+
+    def medir(operacion: str, metodo):
+        def medido(*argumentos, **opciones):
+            if estado.operacion is not None:
+                return metodo(*argumentos, **opciones) # Llamada interna: la mide la de afuera
+            estado.operacion = operacion
+            inicio = reloj()
+            try:
+                resultado = metodo(*argumentos, **opciones)
+            except BaseException:
+                registro.contar("excepciones_total", operacion)
+                raise
+            finally:
+                estado.operacion = None
+                registro.observar("duracion_segundos", operacion, reloj() - inicio)
+            return resultado
+        return medido
+
+    def medir_recorrido(operacion: str, metodo):
+        # En un generador el tiempo depende de quien lo consume: solo cuento llamadas y elementos
+        def medido(*argumentos, **opciones):
+            registro.contar("llamadas_total", operacion)
+            cantidad = 0
+            try:
+                for elemento in metodo(*argumentos, **opciones):
+                    cantidad += 1
+                    yield elemento
+            finally:
+                registro.contar("elementos_total", operacion, cantidad)
+        return medido
+
+    for nombre, operacion, es_generador in _metodos_a_medir(type(arbol)):
+        metodo = getattr(arbol, nombre)
+        reemplazos[nombre] = (medir_recorrido if es_generador else medir)(operacion, metodo)
+
+    resolver_original = arbol._resolver_ruta
+
+    def resolver_ruta(ruta: str):
+        # Busco con el _resolver_ruta del árbol y después cuento lo que recorrió subiendo
+        # por los padres: las carpetas por las que pasó son los ancestros de lo que encontró
+        nodo = resolver_original(ruta)
+        if nodo is not None:
+            ultimo, mirada = nodo, nodo.padre
+        else:
+            # No existe: busco hasta dónde llegó (casi siempre existe el padre, una búsqueda más)
+            partes = list(partes_de(ruta))
+            for cantidad in range(len(partes) - 1, -1, -1):
+                ultimo = resolver_original("/" + "/".join(partes[:cantidad]))
+                if ultimo is not None:
+                    break
+            mirada = ultimo # En esta miró los hijos sin encontrar el que buscaba
+        visitados = 1
+        while ultimo.padre is not None:
+            visitados += 1
+            ultimo = ultimo.padre
+        ancho = 0
+        while mirada is not None:
+            if len(mirada.children) > ancho:
+                ancho = len(mirada.children)
+            mirada = mirada.padre
+        operacion = estado.operacion or "interna"
+        registro.observar("nodos_visitados", operacion, visitados)
+        registro.observar("ancho_carpeta", operacion, ancho)
+        return nodo
+
+    def error(mensaje: str):
+        registro.contar("errores_total", estado.operacion or "interna")
+        capturados = arbol._capturados.lista
+        if capturados is not None:
+            capturados.append(mensaje)
+
+    def error_de_lectura(mensaje: str) -> str:
+        registro.contar("errores_total", estado.operacion or "interna")
+        capturados = arbol._capturados.lista
+        if capturados is not None:
+            capturados.append(mensaje)
+        return f"Error: {mensaje}"
+
+    reemplazos["_resolver_ruta"] = resolver_ruta
+    reemplazos["_error"] = error
+    reemplazos["_error_de_lectura"] = error_de_lectura
+    arbol.__dict__.update(reemplazos)
+    arbol._metodos_medidos = tuple(reemplazos)
+
+    # Valores del árbol que se leen al exportar
+    registro.medidor("nodos", lambda: arbol.raiz.total_nodos)
+    registro.medidor("bytes_contenido", lambda: arbol.raiz.total_bytes)
+    registro.medidor("cache_aciertos", lambda: arbol.aciertos_cache)
+    registro.medidor("cache_fallos", lambda: arbol.fallos_cache)
+
+
+def desinstrumentar(arbol):
+    """Saca los métodos envueltos: vuelven a valer los de la clase."""
+    for nombre in arbol.__dict__.pop("_metodos_medidos", ()):
+        arbol.__dict__.pop(nombre, None)
@@ -0,0 +1,150 @@
+"""
+Contenidos en dos niveles: memoria y disco.
+
+Con millones de archivos no puedo tener todos los contenidos en RAM. El
+GestorNiveles tiene un presupuesto de bytes: los contenidos usados hace poco
+quedan en memoria y, cuando me paso del presupuesto, bajo a disco los que se
+usaron hace más tiempo (LRU) a un archivo de derrame. Si alguien los vuelve a
+leer, los traigo de vuelta sin que se note (y quizás bajo otros).
+
+Cada contenido es un ContenidoEnNivel, otro "contenido diferido" (tiene
+'longitud_bytes' y 'materializar()'), así que Nodo no sabe nada de esto.
+Como los contenidos no cambian (modificar pone uno nuevo), una vez escrito en
+disco ya no hace falta escribirlo de nuevo: la próxima vez que lo desaloje
+solo suelto el texto. Lo que ya nadie usa queda como espacio muerto en el
+archivo de derrame; cuando es más de la mitad, reescribo el archivo sin él.
+"""
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+
+class ContenidoEnNivel:
+    """Un contenido manejado por el gestor: en memoria (texto) y/o en disco (posición)."""
+    __slots__ = ("_gestor", "texto", "posicion", "longitud_bytes")
+
+    def __init__(self, gestor, texto: str, longitud_bytes: int):
+        self._gestor = gestor
+        self.texto = texto          # None si ahora solo está en disco
+        self.posicion = None        # Dónde está en el archivo de derrame (None si nunca bajó)
+        self.longitud_bytes = longitud_bytes
+
+    def materializar(self) -> str:
+        return self._gestor.leer(self)
+
+
+class GestorNiveles:
+    """Memoria con presupuesto y desalojo LRU a un archivo de derrame."""
+
+    def __init__(self, presupuesto_bytes: int, ruta_derrame: str = None):
+        self.presupuesto_bytes = presupuesto_bytes
+        self.ruta_derrame = ruta_derrame
+        self._archivo = self._abrir_derrame(ruta_derrame)
+        self._fin_archivo = 0
+        self._residentes = OrderedDict() # ContenidoEnNivel en memoria, del menos al más usado
+        self._en_disco = set()           # Contenidos vivos que tienen copia en el archivo de derrame
+        self._candado = threading.Lock() # Los lectores también mueven la LRU
+
+        self.bytes_residentes = 0
+        self.bytes_muertos = 0     # Bytes del archivo de derrame que ya nadie usa
+        self.aciertos = 0
+        self.fallos = 0
+        self.desalojos = 0
+
+    def registrar(self, texto: str) -> ContenidoEnNivel:
+        """Un contenido nuevo: entra a memoria como el más reciente."""
+        longitud = len(texto) if texto.isascii() else len(texto.encode("utf-8"))
+        contenido = ContenidoEnNivel(self, texto, longitud)
+        with self._candado:
+            self._residentes[contenido] = None
+            self.bytes_residentes += longitud
+            self._desalojar()
+        return contenido
+
+    def leer(self, contenido: ContenidoEnNivel) -> str:
+        with self._candado:
+            texto = contenido.texto
+            if texto is not None:
+                self.aciertos += 1
+                self._residentes.move_to_end(contenido)
+                return texto
+
+            # Está solo en disco: lo traigo y vuelve a ser el más reciente
+            self.fallos += 1
+            self._archivo.seek(contenido.posicion)
+            texto = self._archivo.read(contenido.longitud_bytes).decode("utf-8")
+            contenido.texto = texto
+            self._residentes[contenido] = None
+            self.bytes_residentes += contenido.longitud_bytes
+            self._desalojar(conservar=contenido)
+            return texto
+
+    def liberar(self, contenido: ContenidoEnNivel):
+        """Ya nadie usa este contenido (se modificó o eliminó el archivo)."""
+        with self._candado:
+            if self._residentes.pop(contenido, False) is None:
+                self.bytes_residentes -= contenido.longitud_bytes
+            if contenido.posicion is not None:
+                self._en_disco.discard(contenido)
+                self.bytes_muertos += contenido.longitud_bytes
+                if self.bytes_muertos > max(self._fin_archivo // 2, 1 << 20):
+                    self._compactar_derrame()
+            contenido.texto = None
+
+    def _desalojar(self, conservar=None):
+        """Bajo a disco los menos usados hasta entrar en el presupuesto."""
+        while self.bytes_residentes > self.presupuesto_bytes and self._residentes:
+            contenido = next(iter(self._residentes))
+            if contenido is conservar:
+                break # Es el único que queda y me lo acaban de pedir: lo dejo aunque sea grande
+            del self._residentes[contenido]
+            if contenido.posicion is None:
+                self._archivo.seek(self._fin_archivo)
+                datos = contenido.texto.encode("utf-8")
+                self._archivo.write(datos)
+                contenido.posicion = self._fin_archivo
+                self._fin_archivo += len(datos)
+                self._en_disco.add(contenido)
+            contenido.texto = None
+            self.bytes_residentes -= contenido.longitud_bytes
+            self.desalojos += 1
+
+    @staticmethod
+    def _abrir_derrame(ruta: str):
+        # Sin ruta, uso un archivo temporal que se borra solo al cerrar
+        return open(ruta, "w+b") if ruta else tempfile.TemporaryFile()
+
+    def _compactar_derrame(self):
+        """Copio a un archivo nuevo solo los contenidos vivos, en orden, y reemplazo el viejo."""
+        temporal = self.ruta_derrame + ".tmp" if self.ruta_derrame else None
+        nuevo = self._abrir_derrame(temporal)
+        fin = 0
+        for contenido in sorted(self._en_disco, key=lambda c: c.posicion):
+            self._archivo.seek(contenido.posicion)
+            nuevo.write(self._archivo.read(contenido.longitud_bytes))
+            contenido.posicion = fin
+            fin += contenido.longitud_bytes
+        self._archivo.close()
+        if temporal:
+            os.replace(temporal, self.ruta_derrame)
+        self._archivo = nuevo
+        self._fin_archivo = fin
+        self.bytes_muertos = 0
+
+    def estadisticas(self) -> dict:
+        consultas = self.aciertos + self.fallos
+        return {
+            "aciertos": self.aciertos,
+            "fallos": self.fallos,
+            "tasa_aciertos": self.aciertos / consultas if consultas else 0.0,
+            "desalojos": self.desalojos,
+            "bytes_residentes": self.bytes_residentes,
+            "presupuesto_bytes": self.presupuesto_bytes,
+            "contenidos_residentes": len(self._residentes),
+            "bytes_en_disco": self._fin_archivo,
+            "bytes_muertos_en_disco": self.bytes_muertos,
+        }
+
+    def cerrar(self):
+        self._archivo.close()
@@ -0,0 +1,373 @@
+"""
+Snapshots binarios de mi ArbolArchivos: guardo todo el árbol en un solo archivo
+y lo vuelvo a abrir con mmap, sin leer los contenidos hasta que alguien los pida.
+
+Formato (todo en little-endian):
+
+    CABECERA   magia b"ARBL", versión, cantidad de nodos, posición y tamaño de
+               cada sección, CRC32 de los metadatos y CRC32 de los contenidos,
+               y (desde la versión 2) el último LSN del diario incluido en el snapshot
+    TABLA      un registro fijo por nodo, en preorden (el padre antes que sus hijos)
+    NOMBRES    todos los nombres en UTF-8, uno detrás del otro
+    CONTENIDOS el texto de los archivos en UTF-8, uno detrás del otro (los blobs
+               del almacén deduplicado se escriben una sola vez y varios
+               registros apuntan al mismo lugar)
+"""
+import mmap
+import os
+import struct
+import zlib
+from bisect import bisect_right
+from itertools import repeat
+
+from nodo import Nodo, CARPETA, ARCHIVO
+
+MAGIA = b"ARBL"
+VERSION = 2
+
+# magia, versión, (reservado), nodos, tabla (pos), nombres (pos, tamaño),
+# contenidos (pos, tamaño), crc de tabla+nombres, crc de contenidos, lsn
+_CABECERA_V1 = struct.Struct("<4sHHQQQQQQII")
+_CABECERA = struct.Struct("<4sHHQQQQQQIIQ")
+
+# padre (-1 para la raíz), banderas, nombre (pos, tamaño), contenido (pos, tamaño)
+_REGISTRO = struct.Struct("<iBxxxIIQQ")
+
+_ES_CARPETA = 1
+_TIENE_CONTENIDO = 2 # Para distinguir None de "" al cargar
+
+_PASO_MARCAS = 64 * 1024 # Bytes entre marca y marca para leer rangos de un contenido
+
+
+class ErrorSnapshot(Exception):
+    """El archivo no es un snapshot válido (magia, versión o checksum incorrectos)."""
+
+
+class ContenidoEnSnapshot:
+    """
+    Contenido diferido de un archivo cargado desde un snapshot: solo recuerdo
+    dónde está dentro del mmap y lo decodifico cada vez que lo leen.
+    Para leer un rango (leer_por_partes, leer_archivo con inicio/largo) no
+    decodifico todo: la primera vez anoto cada cuántos bytes empieza cada
+    bloque de _PASO_MARCAS (en caracteres), y después decodifico solo los
+    bloques de ese rango.
+    """
+    __slots__ = ("_mapa", "_inicio", "longitud_bytes", "_marcas")
+
+    def __init__(self, mapa, inicio: int, longitud_bytes: int):
+        self._mapa = mapa
+        self._inicio = inicio
+        self.longitud_bytes = longitud_bytes
+        self._marcas = None # Se arman en la primera lectura por rango
+
+    def materializar(self) -> str:
+        return self._mapa[self._inicio:self._inicio + self.longitud_bytes].decode("utf-8")
+
+    def _armar_marcas(self):
+        """
+        ([posición en bytes], [posición en caracteres]) del comienzo de cada bloque,
+        o () si el texto es ASCII (ahí un carácter es un byte y no hacen falta).
+        """
+        posiciones, caracteres = [0], [0]
+        mapa, base, total = self._mapa, self._inicio, self.longitud_bytes
+        solo_ascii = True
+        desde = 0
+        while desde < total:
+            hasta = min(desde + _PASO_MARCAS, total)
+            while hasta < total and mapa[base + hasta] & 0xC0 == 0x80:
+                hasta += 1 # No corto un carácter de varios bytes por la mitad
+            bloque = mapa[base + desde:base + hasta]
+            if bloque.isascii():
+                cantidad = len(bloque)
+            else:
+                solo_ascii = False
+                cantidad = len(bloque.decode("utf-8"))
+            posiciones.append(hasta)
+            caracteres.append(caracteres[-1] + cantidad)
+            desde = hasta
+        return () if solo_ascii else (posiciones, caracteres)
+
+    def leer(self, inicio: int = 0, largo: int = None) -> str:
+        """Los caracteres [inicio, inicio + largo), decodificando solo los bloques de ese rango."""
+        if self._marcas is None:
+            self._marcas = self._armar_marcas()
+        base = self._inicio
+        if not self._marcas:
+            fin = self.longitud_bytes if largo is None else min(inicio + largo, self.longitud_bytes)
+            if inicio >= fin:
+                return ""
+            return self._mapa[base + inicio:base + fin].decode("utf-8")
+
+        posiciones, caracteres = self._marcas
+        primero = bisect_right(caracteres, inicio) - 1
+        if primero >= len(posiciones) - 1:
+            return "" # Empieza después del final
+        fin = self.longitud_bytes
+        if largo is not None:
+            ultimo = bisect_right(caracteres, inicio + largo)
+            if ultimo < len(posiciones):
+                fin = posiciones[ultimo]
+        texto = self._mapa[base + posiciones[primero]:base + fin].decode("utf-8")
+        desplazamiento = inicio - caracteres[primero]
+        return texto[desplazamiento:] if largo is None else texto[desplazamiento:desplazamiento + largo]
+
+
+# =======================================================
+# GUARDAR
+# =======================================================
+
+def _preorden(raiz: Nodo) -> list:
+    """Lista de (nodo, índice del padre) en preorden, usando una pila en vez de recursión."""
+    orden = []
+    pila = [(raiz, -1)]
+    while pila:
+        nodo, indice_padre = pila.pop()
+        indice = len(orden)
+        orden.append((nodo, indice_padre))
+        for hijo in reversed(nodo.children): # Al revés para sacarlos en el orden del 'ls'
+            pila.append((hijo, indice))
+    return orden
+
+
+def guardar_snapshot(arbol, ruta: str):
+    """
+    Escribe el árbol completo en 'ruta'. Primero escribo a un archivo temporal y
+    después lo renombro, así un corte a la mitad nunca deja un snapshot roto.
+    """
+    orden = _preorden(arbol.raiz)
+
+    tabla = bytearray(_REGISTRO.size * len(orden))
+    nombres = bytearray()
+    posicion_contenido = 0
+    a_escribir = []        # Nodos cuyo contenido va a la sección de contenidos
+    blobs_escritos = {}    # Clave del blob -> posición donde ya lo escribí
+    for i, (nodo, indice_padre) in enumerate(orden):
+        nombre = nodo.nombre.encode("utf-8")
+        banderas = _ES_CARPETA if nodo.es_carpeta() else 0
+        longitud = 0
+        posicion = posicion_contenido
+        if nodo._contenido is not None:
+            banderas |= _TIENE_CONTENIDO
+            longitud = nodo.total_bytes if not nodo.es_carpeta() else 0
+            clave = getattr(nodo._contenido, "clave", None)
+            if clave is not None and clave in blobs_escritos:
+                posicion = blobs_escritos[clave] # Mismo blob: apunto al que ya está escrito
+            elif longitud:
+                if clave is not None:
+                    blobs_escritos[clave] = posicion
+                a_escribir.append(nodo)
+                posicion_contenido += longitud
+        _REGISTRO.pack_into(tabla, i * _REGISTRO.size, indice_padre, banderas,
+                            len(nombres), len(nombre), posicion, longitud)
+        nombres += nombre
+
+    inicio_tabla = _CABECERA.size
+    inicio_nombres = inicio_tabla + len(tabla)
+    inicio_contenidos = inicio_nombres + len(nombres)
+    crc_metadatos = zlib.crc32(nombres, zlib.crc32(tabla))
+
+    temporal = ruta + ".tmp"
+    with open(temporal, "wb") as archivo:
+        archivo.write(b"\0" * _CABECERA.size) # La cabecera va al final, cuando tenga el crc de contenidos
+        archivo.write(tabla)
+        archivo.write(nombres)
+
+        crc_contenidos = 0
+        for nodo in a_escribir:
+            # Los contenidos en trozos los escribo de a uno, sin armar el texto entero
+            contenido = nodo._contenido
+            partes = contenido.iterar() if hasattr(contenido, "iterar") else (nodo.contenido,)
+            for parte in partes:
+                datos = parte.encode("utf-8")
+                crc_contenidos = zlib.crc32(datos, crc_contenidos)
+                archivo.write(datos)
+
+        archivo.seek(0)
+        archivo.write(_CABECERA.pack(MAGIA, VERSION, 0, len(orden), inicio_tabla,
+                                     inicio_nombres, len(nombres),
+                                     inicio_contenidos, posicion_contenido,
+                                     crc_metadatos, crc_contenidos, arbol._lsn))
+        archivo.flush()
+        os.fsync(archivo.fileno())
+    os.replace(temporal, ruta)
+
+
+def exportar_metadatos(arbol) -> tuple:
+    """
+    Solo la tabla y los nombres de un snapshot, sin contenidos, para recorrer el
+    árbol sin los Nodos (ver analisis.py). Cada registro tiene cuántos bytes ocupa
+    el contenido, pero la posición queda en 0 porque no hay sección de contenidos.
+    Retorna (cantidad de nodos, tabla, nombres).
+    """
+    # El mismo preorden que _preorden, pero empaquetando en la misma pasada (sin armar la lista)
+    cantidad = arbol.raiz.total_nodos
+    tabla = bytearray(_REGISTRO.size * cantidad)
+    nombres = bytearray()
+    empaquetar, tamano = _REGISTRO.pack_into, _REGISTRO.size
+    pila = [(arbol.raiz, -1)]
+    indice = 0
+    while pila:
+        nodo, indice_padre = pila.pop()
+        nombre = nodo.nombre.encode("utf-8")
+        if nodo.children:
+            pila.extend(zip(reversed(nodo.children), repeat(indice)))
+        if nodo.es_carpeta():
+            banderas, longitud = _ES_CARPETA, 0
+        else:
+            banderas, longitud = 0, nodo.total_bytes
+        if nodo._contenido is not None:
+            banderas |= _TIENE_CONTENIDO
+        empaquetar(tabla, indice * tamano, indice_padre, banderas, len(nombres), len(nombre), 0, longitud)
+        nombres += nombre
+        indice += 1
+    return cantidad, tabla, nombres
+
+
+# =======================================================
+# CARGAR
+# =======================================================
+
+def _abrir(ruta: str):
+    """
+    Mapeo el snapshot en memoria y reviso la cabecera y el checksum de la tabla y
+    los nombres. Retorna (mapa, campos de la cabecera).
+    """
+    with open(ruta, "rb") as archivo:
+        if os.fstat(archivo.fileno()).st_size < _CABECERA_V1.size:
+            raise ErrorSnapshot(f"'{ruta}' es demasiado corto para ser un snapshot.")
+        mapa = mmap.mmap(archivo.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        return mapa, _revisar(ruta, mapa)
+    except BaseException:
+        mapa.close()
+        raise
+
+
+def _revisar(ruta: str, mapa) -> tuple:
+    """Reviso la cabecera y el checksum de la tabla y los nombres; retorna los campos de la cabecera."""
+    magia, version = struct.unpack_from("<4sH", mapa, 0)
+    if magia != MAGIA:
+        raise ErrorSnapshot(f"'{ruta}' no es un snapshot de ArbolArchivos.")
+    if version == 1:
+        campos = _CABECERA_V1.unpack_from(mapa, 0) + (0,) # La versión 1 no tenía LSN
+    elif version == VERSION:
+        campos = _CABECERA.unpack_from(mapa, 0)
+    else:
+        raise ErrorSnapshot(f"Versión de snapshot no soportada: {version} (espero {VERSION}).")
+    (_, _, _, cantidad, inicio_tabla, inicio_nombres, largo_nombres,
+     inicio_contenidos, largo_contenidos, crc_metadatos, crc_contenidos, lsn) = campos
+    if len(mapa) < inicio_contenidos + largo_contenidos or \
+            inicio_nombres - inicio_tabla != cantidad * _REGISTRO.size:
+        raise ErrorSnapshot(f"'{ruta}' está truncado o su cabecera no coincide.")
+
+    tabla = memoryview(mapa)[inicio_tabla:inicio_nombres]
+    nombres = memoryview(mapa)[inicio_nombres:inicio_nombres + largo_nombres]
+    correcto = zlib.crc32(nombres, zlib.crc32(tabla)) == crc_metadatos
+    tabla.release()
+    nombres.release()
+    if not correcto:
+        raise ErrorSnapshot(f"Checksum incorrecto en '{ruta}' (tabla o nombres dañados).")
+    return campos
+
+
+def ubicar_tabla(ruta: str) -> tuple:
+    """
+    Reviso el snapshot y retorno (cantidad de nodos, inicio de la tabla, inicio
+    de los nombres, largo de los nombres), para quien lo quiera leer por su cuenta.
+    """
+    mapa, campos = _abrir(ruta)
+    mapa.close()
+    return campos[3], campos[4], campos[5], campos[6]
+
+
+def _armar_nodos(arbol, mapa, campos) -> bool:
+    """
+    Creo los nodos en preorden y los cuelgo sin sumar totales (eso sería subir hasta
+    la raíz por cada nodo, O(n·profundidad)); al final sumo los totales en una sola
+    pasada al revés, donde cada hijo ya tiene su subárbol completo. Retorna True si
+    algún contenido quedó apuntando al mapa.
+
+    Si el árbol deduplica, los contenidos van a su almacén: los registros que
+    apuntan al mismo lugar del archivo comparten un blob sin volver a calcular el
+    hash, y los textos iguales guardados en lugares distintos también se juntan.
+    """
+    (_, _, _, cantidad, inicio_tabla, inicio_nombres, largo_nombres,
+     inicio_contenidos, largo_contenidos, crc_metadatos, crc_contenidos, lsn) = campos
+    nodos = [arbol.raiz]
+    padres = [-1]
+    usa_el_mapa = False
+    preparar_nombre = arbol._preparar_nombre
+    almacen = arbol._almacen
+    blobs = {}             # (posición, largo) en el archivo -> Blob (solo si deduplico)
+    # Las vistas se crean adentro del try: si algo falla, suelto las que llegué a crear
+    # (una vista viva no deja cerrar el mapa y cargar_snapshot lo cierra al fallar)
+    tabla = nombres = vista = None
+    try:
+        vista = memoryview(mapa)
+        tabla = vista[inicio_tabla:inicio_nombres]
+        nombres = vista[inicio_nombres:inicio_nombres + largo_nombres]
+        for i, (indice_padre, banderas, pos_nombre, largo_nombre, pos_contenido, largo_contenido) \
+                in enumerate(_REGISTRO.iter_unpack(tabla)):
+            if i == 0:
+                continue # La raíz ya existe en el árbol nuevo
+            nombre = str(nombres[pos_nombre:pos_nombre + largo_nombre], "utf-8")
+            contenido = None
+            if banderas & _TIENE_CONTENIDO:
+                inicio = inicio_contenidos + pos_contenido
+                # Un archivo vacío no avanza la posición, así que comparte 'inicio' con el
+                # siguiente archivo con contenido: por eso la clave lleva también el largo
+                lugar = (inicio, largo_contenido)
+                if almacen is None:
+                    contenido = ContenidoEnSnapshot(mapa, inicio, largo_contenido)
+                elif lugar in blobs:
+                    contenido = almacen.compartir(blobs[lugar])
+                else:
+                    contenido = blobs[lugar] = almacen.guardar_diferido(
+                        ContenidoEnSnapshot(mapa, inicio, largo_contenido), vista[inicio:inicio + largo_contenido])
+                usa_el_mapa = True
+            nodo = Nodo(preparar_nombre(nombre), CARPETA if banderas & _ES_CARPETA else ARCHIVO, contenido)
+            # Los hijos vienen guardados en el orden del 'ls', así que no hace falta reordenar
+            nodos[indice_padre].agregar_hijo_sin_totales(nodo)
+            nodos.append(nodo)
+            padres.append(indice_padre)
+    finally:
+        for una_vista in (tabla, nombres, vista):
+            if una_vista is not None:
+                una_vista.release()
+
+    for i in range(len(nodos) - 1, 0, -1):
+        nodo, padre = nodos[i], nodos[padres[i]]
+        padre.total_nodos += nodo.total_nodos
+        padre.total_archivos += nodo.total_archivos
+        padre.total_carpetas += nodo.total_carpetas
+        padre.total_bytes += nodo.total_bytes
+    arbol._lsn = lsn
+    return usa_el_mapa
+
+
+def cargar_snapshot(arbol, ruta: str, verificar_contenido: bool = False):
+    """
+    Llena 'arbol' (recién creado, con la raíz vacía) desde un snapshot.
+    El archivo queda mapeado en memoria: los contenidos se leen recién con leer_archivo.
+    Con verificar_contenido=True también reviso el checksum de los contenidos (lee todo).
+    """
+    mapa, campos = _abrir(ruta)
+    try:
+        (_, _, _, cantidad, inicio_tabla, inicio_nombres, largo_nombres,
+         inicio_contenidos, largo_contenidos, crc_metadatos, crc_contenidos, lsn) = campos
+        if verificar_contenido:
+            contenidos = memoryview(mapa)[inicio_contenidos:inicio_contenidos + largo_contenidos]
+            correcto = zlib.crc32(contenidos) == crc_contenidos
+            contenidos.release()
+            if not correcto:
+                raise ErrorSnapshot(f"Checksum incorrecto en los contenidos de '{ruta}'.")
+        usa_el_mapa = _armar_nodos(arbol, mapa, campos)
+    except BaseException:
+        mapa.close()
+        raise
+
+    if usa_el_mapa:
+        arbol._mapas.append(mapa) # Lo cierra arbol.cerrar() (los contenidos se leen de acá)
+    else:
+        mapa.close() # Ningún archivo tiene contenido: no lo necesito más
+    return arbol
@@ -0,0 +1,69 @@
+"""
+Rutas ya separadas en partes, para no volver a partir el mismo texto en cada llamada.
+
+Cada búsqueda por ruta hacía ruta.split("/") y una lista por comprensión, y
+después comparaba cada parte (un string recién creado) contra los nombres de los
+hijos. Ahora:
+
+  - Ruta("/a/b") parte el texto una sola vez y guarda las partes internadas
+    (sys.intern, la tabla de símbolos de Python). Es un str, así que se puede
+    pasar a cualquier método del árbol (y llega igual al diario y a los mensajes
+    de error, y es la misma clave en la caché de rutas); cuando el árbol tiene
+    que bajar por ella usa sus partes directamente en vez de volver a partirla.
+  - Con ArbolArchivos(internar_nombres=True) los nombres de los nodos también se
+    internan: un nombre que se repite en mil carpetas es un solo string, y buscar
+    una parte internada en hijos_por_nombre termina en la comparación por
+    identidad, sin comparar caracteres. No viene prendido porque con nombres
+    que no se repiten la tabla de símbolos ocupa más de lo que ahorra (~38 bytes
+    por nodo en benchmark_memoria_nodos).
+
+    ruta = Ruta("/proyectos/web/index.html")
+    for _ in range(1000):
+        fs.leer_archivo(ruta)        # Sin partir el texto ni comparar caracteres
+"""
+from sys import intern
+
+
+class Ruta(str):
+    """Una ruta normalizada ('/a/b', sin barras repetidas ni al final) que ya sabe sus partes."""
+
+    def __new__(cls, ruta: str = "/"):
+        if type(ruta) is cls:
+            return ruta # Ya está partida, no hay nada que hacer
+        partes = tuple(intern(parte) for parte in ruta.split("/") if parte)
+        nueva = super().__new__(cls, "/" + "/".join(partes))
+        nueva.partes = partes
+        return nueva
+
+    def __repr__(self):
+        return f"Ruta({str.__repr__(self)})"
+
+    def __reduce__(self):
+        return Ruta, (str(self),)
+
+    @property
+    def nombre(self) -> str:
+        """La última parte ('/' para la raíz)."""
+        return self.partes[-1] if self.partes else "/"
+
+    @property
+    def padre(self) -> "Ruta":
+        """La ruta de la carpeta que la contiene (la raíz es su propio padre)."""
+        padre = str.__new__(Ruta, "/" + "/".join(self.partes[:-1]))
+        padre.partes = self.partes[:-1]
+        return padre
+
+    def hija(self, nombre: str) -> "Ruta":
+        """La ruta de 'nombre' dentro de esta (sin volver a partir lo que ya tengo)."""
+        if "/" in nombre or not nombre:
+            return Ruta(self + "/" + nombre) # Son varias partes (o ninguna): la parto entera
+        hija = str.__new__(Ruta, self.rstrip("/") + "/" + nombre)
+        hija.partes = self.partes + (intern(nombre),)
+        return hija
+
+
+def partes_de(ruta: str):
+    """Las partes de una ruta: las de la Ruta si ya viene partida, o partiendo el texto."""
+    if type(ruta) is Ruta:
+        return ruta.partes
+    return [parte for parte in ruta.split("/") if parte]
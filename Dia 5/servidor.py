@@ -0,0 +1,393 @@
+"""
+Servidor asyncio para mi ArbolArchivos: muchos clientes a la vez por TCP o por
+un socket Unix (el cliente está en cliente.py).
+
+Protocolo en marcos (todo en little-endian):
+
+    MARCO  largo del resto (4 bytes), id del pedido (4), operación o estado (1)
+           y los campos, codificados igual que en el diario (largo + UTF-8, o
+           0xFFFFFFFF si es None). Los números van como texto.
+
+Los cambios usan los mismos códigos y campos que el diario (INSERTAR, MOVER,
+COPIAR...) y las lecturas tienen los suyos (BUSCAR, LISTAR, LEER, ESTADISTICAS).
+Cada respuesta lleva el id de su pedido, así que un cliente puede mandar muchos
+pedidos sin esperar las respuestas (pipelining), que pueden volver en otro orden:
+
+    LISTO  última respuesta del pedido, con el resultado
+    ERROR  última respuesta, con el mensaje (el mismo que imprimiría el árbol)
+    PARTE  un pedazo de una respuesta larga (leer un archivo grande o listar una
+           carpeta enorme); después vienen más PARTE y al final un LISTO
+
+Todo lo que llega en una vuelta del event loop, de todas las conexiones, se
+procesa en una tanda, y cada conexión recibe las respuestas de la tanda en una
+sola escritura. Si el árbol tiene diario (ArbolArchivos.abrir), las respuestas a
+los cambios de la tanda salen recién cuando están en disco, con un solo fsync
+para todos. Las respuestas largas se mandan de a partes en su propia tarea,
+esperando a que el cliente lea (así un archivo enorme no frena a los demás).
+
+Las llamadas al árbol se hacen en el hilo del event loop: son cortas, pero con
+ArbolArchivos(concurrente=True) y otros hilos escribiendo pueden esperar candados.
+"""
+import asyncio
+import struct
+
+from diario import (_codificar_campos, _decodificar_campos,
+                    INSERTAR, ELIMINAR, MOVER, MODIFICAR, RENOMBRAR, COPIAR, ANEXAR, ESCRIBIR)
+
+_MARCO = struct.Struct("<IIB") # largo (desde el id), id del pedido, operación o estado
+_CABEZA = struct.Struct("<IB")
+_LARGO = struct.Struct("<I")
+LARGO_MAXIMO_MARCO = 64 * 1024 * 1024 # Un marco más grande es un error del cliente: corto la conexión
+
+# Lecturas (los cambios usan los códigos del diario)
+BUSCAR = 20
+LISTAR = 21
+LEER = 22
+ESTADISTICAS = 23
+
+# Estados de las respuestas
+LISTO = 0
+ERROR = 1
+PARTE = 2
+
+TAMANO_PARTE = 64 * 1024   # Caracteres por PARTE al leer un archivo
+ENTRADAS_POR_PARTE = 1024  # Entradas (tipo, nombre) por PARTE al listar (una página de listar_contenido)
+
+
+def codificar_marco(identificador: int, codigo: int, campos) -> bytes:
+    cuerpo = _codificar_campos(campos)
+    return _MARCO.pack(len(cuerpo) + _CABEZA.size, identificador, codigo) + cuerpo
+
+
+def leer_marcos(buffer: bytearray) -> list:
+    """
+    Saca del buffer los marcos completos y retorna [(id, código, campos)].
+    Lo que quede a medias se queda en el buffer hasta que llegue el resto.
+    """
+    marcos = []
+    posicion = 0
+    while len(buffer) - posicion >= _LARGO.size:
+        largo = _LARGO.unpack_from(buffer, posicion)[0]
+        if largo < _CABEZA.size or largo > LARGO_MAXIMO_MARCO:
+            raise ValueError(f"Marco de {largo} bytes fuera de rango.")
+        fin = posicion + _LARGO.size + largo
+        if fin > len(buffer):
+            break
+        identificador, codigo = _CABEZA.unpack_from(buffer, posicion + _LARGO.size)
+        campos = _decodificar_campos(buffer, posicion + _MARCO.size, fin)
+        marcos.append((identificador, codigo, campos))
+        posicion = fin
+    del buffer[:posicion]
+    return marcos
+
+
+class _ErrorDelArbol(Exception):
+    """Un error del árbol en medio de una respuesta larga (el mensaje va tal cual al cliente)."""
+
+
+class _Conexion(asyncio.Protocol):
+    """Una conexión de un cliente: junta los bytes que llegan y las respuestas que salen."""
+
+    def __init__(self, servidor):
+        self.servidor = servidor
+        self.transporte = None
+        self.entrada = bytearray()
+        self.salida = bytearray()  # Respuestas de la tanda, se mandan juntas en enviar()
+        self.cerrada = False
+        self.puede_escribir = asyncio.Event()
+        self.puede_escribir.set()
+
+    def connection_made(self, transporte):
+        self.transporte = transporte
+        self.servidor._conexiones.add(self)
+
+    def data_received(self, datos: bytes):
+        self.entrada += datos
+        try:
+            marcos = leer_marcos(self.entrada)
+        except ValueError:
+            self.transporte.close()
+            return
+        if marcos:
+            self.servidor._recibir(self, marcos)
+
+    def connection_lost(self, excepcion):
+        self.cerrada = True
+        self.puede_escribir.set() # Que las tareas que mandan partes se enteren y terminen
+        self.servidor._conexiones.discard(self)
+
+    # Si el cliente no lee, dejo de leerle pedidos (y las partes largas esperan)
+    def pause_writing(self):
+        self.puede_escribir.clear()
+        self.transporte.pause_reading()
+
+    def resume_writing(self):
+        self.puede_escribir.set()
+        self.transporte.resume_reading()
+
+    def responder(self, identificador: int, estado: int, campos=()):
+        self.salida += codificar_marco(identificador, estado, campos)
+
+    def enviar(self):
+        if self.salida and not self.cerrada:
+            self.transporte.write(self.salida)
+        self.salida = bytearray()
+
+
+class ServidorArbol:
+    """
+    Atiende pedidos sobre un ArbolArchivos (motor "nodos", con o sin concurrente/diario).
+
+        servidor = await ServidorArbol(fs).iniciar(puerto=9400)
+        ...
+        await servidor.cerrar()
+    """
+
+    def __init__(self, arbol, tamano_parte: int = TAMANO_PARTE, entradas_por_parte: int = ENTRADAS_POR_PARTE):
+        self.arbol = arbol
+        self.tamano_parte = tamano_parte
+        self.entradas_por_parte = entradas_por_parte
+        self._servidor = None
+        self._conexiones = set()
+        self._envios = set()         # Tareas que están mandando respuestas largas de a partes
+        self._pendientes = []        # (conexión, id, código, campos) de esta vuelta del loop
+        self._programado = False
+        self.tandas = 0
+        self.pedidos = 0
+
+        # Busco el método en cada pedido (no lo guardo ligado): así las métricas, si se activan después, lo ven
+        self._cambios = {
+            INSERTAR: "insertar",
+            ELIMINAR: "eliminar",
+            MOVER: "mover",
+            COPIAR: "copiar",
+            MODIFICAR: "modificar_contenido",
+            RENOMBRAR: "renombrar",
+            ANEXAR: "anexar_contenido",
+            ESCRIBIR: "escribir_contenido",
+        }
+        self._lecturas = {
+            BUSCAR: self._buscar,
+            LISTAR: self._listar,
+            LEER: self._leer,
+            ESTADISTICAS: self._estadisticas,
+        }
+
+    async def iniciar(self, direccion: str = "127.0.0.1", puerto: int = 0, ruta_unix: str = None):
+        """Empiezo a escuchar en TCP (con puerto=0 elige uno libre, ver 'puerto') o en un socket Unix."""
+        loop = asyncio.get_running_loop()
+        if ruta_unix is not None:
+            self._servidor = await loop.create_unix_server(lambda: _Conexion(self), ruta_unix)
+        else:
+            self._servidor = await loop.create_server(lambda: _Conexion(self), direccion, puerto)
+        return self
+
+    @property
+    def puerto(self) -> int:
+        return self._servidor.sockets[0].getsockname()[1]
+
+    async def cerrar(self):
+        self._servidor.close()
+        for conexion in list(self._conexiones):
+            conexion.transporte.close()
+        for tarea in list(self._envios):
+            tarea.cancel()
+        await self._servidor.wait_closed()
+
+    async def servir_para_siempre(self):
+        await self._servidor.serve_forever()
+
+    # =======================================================
+    # TANDAS (todo lo que llegó en una vuelta del event loop)
+    # =======================================================
+
+    def _recibir(self, conexion: _Conexion, marcos: list):
+        for identificador, codigo, campos in marcos:
+            self._pendientes.append((conexion, identificador, codigo, campos))
+        if not self._programado:
+            # Las demás conexiones con datos en esta misma vuelta se suman antes de que corra
+            self._programado = True
+            asyncio.get_running_loop().call_soon(self._procesar_tanda)
+
+    def _procesar_tanda(self):
+        self._programado = False
+        pendientes, self._pendientes = self._pendientes, []
+        self.tandas += 1
+        self.pedidos += len(pendientes)
+        diario = self.arbol._diario
+        a_confirmar = []  # Respuestas a cambios que esperan el fsync de la tanda
+        tocadas = set()
+        with self.arbol.capturar_errores() as errores:
+            for conexion, identificador, codigo, campos in pendientes:
+                antes = len(errores)
+                try:
+                    cambio = self._cambios.get(codigo)
+                    if cambio is not None:
+                        if codigo == ESCRIBIR:
+                            ruta, inicio, texto = campos
+                            campos = (ruta, int(inicio), texto)
+                        if getattr(self.arbol, cambio)(*campos):
+                            if diario is not None:
+                                a_confirmar.append((conexion, identificador))
+                                continue
+                            conexion.responder(identificador, LISTO)
+                        else:
+                            conexion.responder(identificador, ERROR, [self._mensaje(errores, antes)])
+                    else:
+                        lectura = self._lecturas.get(codigo)
+                        if lectura is None:
+                            conexion.responder(identificador, ERROR, [f"Operación desconocida: {codigo}"])
+                        else:
+                            lectura(conexion, identificador, campos, errores, antes)
+                except Exception as error: # Campos que no corresponden, o un error del árbol
+                    conexion.responder(identificador, ERROR, [f"{type(error).__name__}: {error}"])
+                tocadas.add(conexion)
+        for conexion in tocadas:
+            conexion.enviar()
+        if a_confirmar:
+            self._lanzar(self._confirmar(diario, a_confirmar))
+
+    async def _confirmar(self, diario, a_confirmar: list):
+        """Un solo fsync para todos los cambios de la tanda (en otro hilo, sin frenar el loop)."""
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, diario.sincronizar)
+            estado, campos = LISTO, []
+        except OSError as error: # El cambio está en memoria pero no sé si llegó al disco
+            estado, campos = ERROR, [f"No se pudo escribir el diario: {error}"]
+        tocadas = set()
+        for conexion, identificador in a_confirmar:
+            conexion.responder(identificador, estado, campos)
+            tocadas.add(conexion)
+        for conexion in tocadas:
+            conexion.enviar()
+
+    @staticmethod
+    def _mensaje(errores: list, antes: int) -> str:
+        return errores[-1] if len(errores) > antes else "La operación no se pudo hacer."
+
+    def _lanzar(self, corrutina):
+        tarea = asyncio.get_running_loop().create_task(corrutina)
+        self._envios.add(tarea)
+        tarea.add_done_callback(self._envios.discard)
+
+    # =======================================================
+    # LECTURAS
+    # =======================================================
+
+    def _buscar(self, conexion, identificador, campos, errores, antes):
+        """[nombre, tipo, nodos, bytes] del nodo, o LISTO sin campos si no existe (como buscar_nodo_por_ruta)."""
+        nodo = self.arbol.buscar_nodo_por_ruta(*campos)
+        if nodo is None:
+            conexion.responder(identificador, LISTO)
+        else:
+            conexion.responder(identificador, LISTO,
+                               [nodo.nombre, nodo.tipo, str(nodo.total_nodos), str(nodo.total_bytes)])
+
+    def _estadisticas(self, conexion, identificador, campos, errores, antes):
+        totales = self.arbol.estadisticas_tamano(*campos)
+        if len(errores) > antes:
+            conexion.responder(identificador, ERROR, [errores[-1]])
+        else:
+            conexion.responder(identificador, LISTO, [str(valor) for valor in totales.values()])
+
+    def _listar(self, conexion, identificador, campos, errores, antes):
+        """
+        LISTAR ruta [tipo prefijo]. Cada entrada son dos campos (tipo, nombre). Pido
+        al árbol de a una página (con su cursor): si no entra en una, la primera
+        va como PARTE y las demás las pido recién cuando el cliente puede recibirlas.
+        """
+        ruta, tipo, prefijo = (list(campos) + [None, None])[:3]
+        pagina, cursor = self.arbol.listar_contenido(ruta, None, self.entradas_por_parte, tipo, prefijo)
+        if len(errores) > antes:
+            conexion.responder(identificador, ERROR, [errores[-1]])
+        elif cursor is None:
+            conexion.responder(identificador, LISTO, [campo for entrada in pagina for campo in entrada])
+        else:
+            partes = self._paginas(ruta, tipo, prefijo, pagina, cursor)
+            self._lanzar(self._mandar_partes(conexion, identificador, partes))
+
+    def _paginas(self, ruta, tipo, prefijo, pagina, cursor):
+        while True:
+            yield [campo for entrada in pagina for campo in entrada]
+            if cursor is None:
+                return
+            with self.arbol.capturar_errores() as errores: # Puede que hayan borrado la carpeta en el medio
+                pagina, cursor = self.arbol.listar_contenido(ruta, cursor, self.entradas_por_parte, tipo, prefijo)
+            if errores:
+                raise _ErrorDelArbol(errores[-1])
+
+    def _leer(self, conexion, identificador, campos, errores, antes):
+        """
+        LEER ruta [inicio largo]. Un archivo chico (o un rango) va en una sola
+        respuesta, igual que leer_archivo; uno grande va de a partes con leer_por_partes.
+        """
+        ruta, inicio, largo = (list(campos) + [None, None])[:3]
+        arbol = self.arbol
+        if inicio is None and largo is None:
+            nodo = arbol.buscar_nodo_por_ruta(ruta)
+            if nodo is not None and not nodo.es_carpeta() and nodo.total_bytes > self.tamano_parte:
+                partes = ([parte] for parte in arbol.leer_por_partes(ruta, self.tamano_parte))
+                self._lanzar(self._mandar_partes(conexion, identificador, partes))
+                return
+            texto = arbol.leer_archivo(ruta)
+        else:
+            texto = arbol.leer_archivo(ruta, int(inicio or 0), None if largo is None else int(largo))
+        if len(errores) > antes:
+            conexion.responder(identificador, ERROR, [errores[-1]])
+        else:
+            conexion.responder(identificador, LISTO, [texto])
+
+    async def _mandar_partes(self, conexion: _Conexion, identificador: int, partes):
+        """Mando cada parte apenas el cliente puede recibirla, dejando pasar a los demás pedidos entre una y otra."""
+        try:
+            for campos in partes:
+                if conexion.cerrada:
+                    return
+                conexion.responder(identificador, PARTE, campos)
+                conexion.enviar()
+                await conexion.puede_escribir.wait()
+                await asyncio.sleep(0)
+            conexion.responder(identificador, LISTO)
+        except _ErrorDelArbol as error:
+            conexion.responder(identificador, ERROR, [str(error)])
+        except Exception as error:
+            conexion.responder(identificador, ERROR, [f"{type(error).__name__}: {error}"])
+        conexion.enviar()
+
+
+async def servir(arbol, direccion: str = "127.0.0.1", puerto: int = 9400, ruta_unix: str = None):
+    """Atiende pedidos sobre el árbol hasta que cancelen la tarea (o Ctrl+C con asyncio.run)."""
+    servidor = await ServidorArbol(arbol).iniciar(direccion, puerto, ruta_unix)
+    try:
+        await servidor.servir_para_siempre()
+    finally:
+        await servidor.cerrar()
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+    from ARBOL import ArbolArchivos
+
+    parser = argparse.ArgumentParser(description="Sirve un ArbolArchivos por TCP o por un socket Unix.")
+    parser.add_argument("--snapshot", help="Snapshot a servir (con --diario, se abre como árbol durable).")
+    parser.add_argument("--diario", help="Diario de cambios (ver ArbolArchivos.abrir).")
+    parser.add_argument("--direccion", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=9400)
+    parser.add_argument("--unix", help="Ruta de un socket Unix (en vez de TCP).")
+    opciones = parser.parse_args()
+
+    if opciones.diario:
+        if not opciones.snapshot:
+            sys.exit("--diario necesita --snapshot")
+        fs = ArbolArchivos.abrir(opciones.snapshot, opciones.diario)
+    elif opciones.snapshot:
+        fs = ArbolArchivos.cargar(opciones.snapshot)
+    else:
+        fs = ArbolArchivos()
+    try:
+        asyncio.run(servir(fs, opciones.direccion, opciones.puerto, opciones.unix))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        fs.cerrar()
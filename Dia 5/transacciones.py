@@ -0,0 +1,421 @@
+"""
+Transacciones de mi ArbolArchivos: junto varios cambios y los aplico todos o ninguno.
+
+    with fs.transaccion() as t:
+        t.insertar("/Importados", "a.txt", "archivo", "hola")
+        t.mover("/Viejos/b.txt", "/Importados")
+        t.eliminar("/Viejos")
+
+Mientras la transacción está abierta solo se anotan las operaciones. Al
+confirmar():
+
+  1. Reviso todo lo que se puede revisar sin mirar el árbol (nombres, tipos,
+     que no se toque la raíz...). Si algo está mal, no cambio nada.
+  2. Aplico las operaciones en orden. Cada carpeta que busco queda recordada por
+     su ruta durante toda la transacción, así las rutas que comparten prefijo
+     (lo normal al importar) no se vuelven a recorrer desde la raíz. Los hijos
+     nuevos se agregan al final y cada carpeta se ordena una sola vez.
+  3. Cada operación anota cómo deshacerse. Si una falla (la ruta no existe, ya
+     hay algo con ese nombre...), deshago las anteriores en orden inverso y el
+     árbol queda exactamente como estaba.
+  4. Recién al final suelto los contenidos que ya nadie usa (blobs del almacén,
+     contenidos en niveles) y anoto el lote en el diario como un solo registro.
+"""
+
+from nodo import Nodo, CARPETA, ARCHIVO
+from diario import INSERTAR, ELIMINAR, MOVER, MODIFICAR, RENOMBRAR
+from rutas import partes_de as _partes # Si me pasan una Ruta, uso sus partes ya hechas
+
+# Cuántos campos lleva cada operación (para guardar el lote en el diario como una lista plana)
+_CAMPOS = {INSERTAR: 4, ELIMINAR: 1, MOVER: 2, MODIFICAR: 2, RENOMBRAR: 2}
+_NOMBRES = {INSERTAR: "insertar", ELIMINAR: "eliminar", MOVER: "mover",
+            MODIFICAR: "modificar_contenido", RENOMBRAR: "renombrar"}
+
+
+class Transaccion:
+    """
+    Lote de cambios que se aplica con confirmar() (o al salir del 'with' sin errores).
+    Si el 'with' termina con una excepción, el lote se descarta sin tocar el árbol.
+    """
+
+    def __init__(self, arbol):
+        self._arbol = arbol
+        self.operaciones = []   # (operación del diario, campos...)
+        self.terminada = False
+        self.error = None       # (número de operación, mensaje) si no se pudo confirmar
+
+    def __len__(self):
+        return len(self.operaciones)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, valor, traza):
+        if not self.terminada:
+            if tipo is None:
+                self.confirmar()
+            else:
+                self.descartar()
+        return False
+
+    # =======================================================
+    # OPERACIONES (solo se anotan)
+    # =======================================================
+
+    def insertar(self, ruta_padre: str, nombre: str, tipo: str, contenido: str = None):
+        if tipo.lower() == CARPETA:
+            contenido = None # Las carpetas no guardan texto (igual que en insertar del árbol)
+        self._agregar((INSERTAR, ruta_padre, nombre, tipo, contenido))
+
+    def eliminar(self, ruta: str):
+        self._agregar((ELIMINAR, ruta))
+
+    def mover(self, ruta_origen: str, ruta_destino: str):
+        self._agregar((MOVER, ruta_origen, ruta_destino))
+
+    def modificar_contenido(self, ruta: str, nuevo_contenido: str):
+        self._agregar((MODIFICAR, ruta, nuevo_contenido))
+
+    def renombrar(self, ruta: str, nuevo_nombre: str):
+        self._agregar((RENOMBRAR, ruta, nuevo_nombre))
+
+    def _agregar(self, operacion: tuple):
+        if self.terminada:
+            raise RuntimeError("La transacción ya terminó, no se le pueden agregar operaciones.")
+        self.operaciones.append(operacion)
+
+    # =======================================================
+    # CONFIRMAR / DESCARTAR
+    # =======================================================
+
+    def confirmar(self) -> bool:
+        """Aplica todo el lote. Si alguna operación falla, deshace las anteriores y retorna False."""
+        if self.terminada:
+            self._arbol._error("La transacción ya se confirmó o se descartó.")
+            return False
+        self.terminada = True
+        self.error = self._arbol._aplicar_transaccion(self)
+        return self.error is None
+
+    def describir_error(self, error: tuple) -> str:
+        numero, mensaje = error
+        operacion = self.operaciones[numero]
+        return (f"No se aplicó la transacción (operación {numero + 1}, "
+                f"{_NOMBRES[operacion[0]]} '{operacion[1]}'): {mensaje}")
+
+    def descartar(self):
+        """Olvida las operaciones anotadas (el árbol no se tocó)."""
+        self.terminada = True
+        self.operaciones = []
+
+    def _validar(self):
+        """Lo que puedo revisar sin mirar el árbol. Retorna (número, mensaje) del primer error o None."""
+        for numero, operacion in enumerate(self.operaciones):
+            for campo in operacion[1:]:
+                if campo is not None and not isinstance(campo, str):
+                    return numero, "Las rutas, nombres y contenidos tienen que ser texto."
+            if operacion[0] == INSERTAR:
+                tipo = operacion[3]
+                if tipo is None or tipo.lower() not in (CARPETA, ARCHIVO):
+                    return numero, f"Tipo desconocido '{tipo}' (tiene que ser 'carpeta' o 'archivo')."
+                mensaje = _error_de_nombre(operacion[2])
+            elif not operacion[1] or not operacion[1].strip("/"):
+                mensaje = "No se puede cambiar la raíz."
+            elif operacion[0] == RENOMBRAR:
+                mensaje = _error_de_nombre(operacion[2])
+            else:
+                continue
+            if mensaje is not None:
+                return numero, mensaje
+        return None
+
+    # =======================================================
+    # DIARIO (todo el lote en un solo registro)
+    # =======================================================
+
+    def campos(self) -> list:
+        """El lote como lista plana: código de cada operación (como texto) seguido de sus campos."""
+        planos = []
+        for operacion in self.operaciones:
+            planos.append(str(operacion[0]))
+            planos.extend(operacion[1:])
+        return planos
+
+    @classmethod
+    def desde_campos(cls, arbol, campos):
+        """Arma la transacción de nuevo a partir de lo guardado en el diario."""
+        transaccion = cls(arbol)
+        posicion = 0
+        while posicion < len(campos):
+            operacion = int(campos[posicion])
+            cantidad = _CAMPOS[operacion]
+            transaccion._agregar((operacion, *campos[posicion + 1:posicion + 1 + cantidad]))
+            posicion += 1 + cantidad
+        return transaccion
+
+
+def _error_de_nombre(nombre: str):
+    if not nombre:
+        return "El nombre no puede estar vacío."
+    if "/" in nombre:
+        return f"El nombre '{nombre}' no puede tener '/'."
+    return None
+
+
+class _Aplicacion:
+    """Aplica las operaciones de una transacción sobre el árbol, con su registro para deshacer."""
+
+    def __init__(self, arbol):
+        self.arbol = arbol
+        self.rutas = {"": arbol.raiz, "/": arbol.raiz} # Ruta -> carpeta, durante toda la transacción
+        # Cómo deshacer cada operación, en el orden en que se aplicaron: un Nodo solo
+        # (lo más común: una inserción, así no creo una tupla por archivo) o (función, argumentos)
+        self.deshacer = []
+        self.desordenadas = {}         # Carpetas con hijos agregados al final (id -> Nodo)
+        self.eliminados = []           # Subárboles sacados: sus contenidos se sueltan al confirmar
+        self.reemplazados = []         # Contenidos viejos de archivos modificados: ídem
+
+        # Lo que no cambia durante la transacción lo miro una sola vez (insertar es lo más común)
+        self.indexar = (arbol._indice_nombres is not None or arbol._indice_texto is not None
+                        or arbol._ancestros is not None)
+        self.contenido_tal_cual = (arbol._almacen is None and arbol._niveles is None
+                                   and arbol.umbral_trozos is None)
+
+    def ejecutar(self, operaciones):
+        """Retorna None si se aplicó todo, o (número, mensaje) de la que falló (ya deshecho)."""
+        aplicar = {
+            INSERTAR: self.insertar,
+            ELIMINAR: self.eliminar,
+            MOVER: self.mover,
+            MODIFICAR: self.modificar_contenido,
+            RENOMBRAR: self.renombrar,
+        }
+        try:
+            for numero, operacion in enumerate(operaciones):
+                mensaje = aplicar[operacion[0]](*operacion[1:])
+                if mensaje is not None:
+                    self.deshacer_todo()
+                    return numero, mensaje
+        except BaseException:
+            self.deshacer_todo()
+            raise
+
+        for carpeta in self.desordenadas.values():
+            carpeta.ordenar_hijos()
+        arbol = self.arbol
+        if arbol._almacen is not None or arbol._niveles is not None:
+            for contenido in self.reemplazados:
+                arbol._liberar_contenido(contenido)
+            for nodo in self.eliminados:
+                arbol._liberar_subarbol(nodo)
+        return None
+
+    def deshacer_todo(self):
+        for entrada in reversed(self.deshacer):
+            if type(entrada) is Nodo:
+                self._deshacer_insertar(entrada)
+            else:
+                entrada[0](*entrada[1])
+        self.deshacer = []
+        for carpeta in self.desordenadas.values():
+            carpeta.ordenar_hijos()
+        self.desordenadas = {}
+
+    # =======================================================
+    # RUTAS (cada prefijo se resuelve una sola vez)
+    # =======================================================
+
+    def carpeta(self, ruta: str):
+        """
+        El nodo en la ruta de una carpeta, recordando cada prefijo por el que pasé.
+        Solo recuerdo carpetas: así eliminar, mover o renombrar archivos nunca
+        invalida nada (ver olvidar).
+        """
+        nodo = self.rutas.get(ruta)
+        if nodo is not None:
+            return nodo
+        nodo = self.arbol.raiz
+        prefijo = ""
+        for nombre in _partes(ruta):
+            prefijo += "/" + nombre
+            siguiente = self.rutas.get(prefijo)
+            if siguiente is None:
+                siguiente = nodo.buscar_hijo(nombre)
+                if siguiente is None:
+                    return None
+                if siguiente.es_carpeta():
+                    self.rutas[prefijo] = siguiente
+            nodo = siguiente
+        if nodo.es_carpeta():
+            self.rutas[ruta] = nodo # También con la ruta tal como me la pasaron
+        return nodo
+
+    def buscar(self, ruta: str):
+        """Cualquier nodo: busco la carpeta que lo contiene y ahí el nombre."""
+        nodo = self.rutas.get(ruta)
+        if nodo is not None:
+            return nodo
+        carpeta, _, nombre = ruta.rstrip("/").rpartition("/")
+        if not nombre:
+            return self.arbol.raiz
+        padre = self.carpeta(carpeta or "/")
+        return padre.buscar_hijo(nombre) if padre is not None else None
+
+    def olvidar(self, nodo: Nodo):
+        """Si una carpeta cambió de ruta (o ya no está), las rutas recordadas dejan de valer."""
+        if nodo.es_carpeta():
+            self.rutas = {"": self.arbol.raiz, "/": self.arbol.raiz}
+
+    def ordenada(self, carpeta: Nodo) -> Nodo:
+        """Antes de sacar o renombrar un hijo, la carpeta tiene que estar ordenada (usa búsqueda binaria)."""
+        if self.desordenadas.pop(id(carpeta), None) is not None:
+            carpeta.ordenar_hijos()
+        return carpeta
+
+    def colgar(self, carpeta: Nodo, nodo: Nodo):
+        carpeta.agregar_hijo_sin_ordenar(nodo)
+        self.desordenadas[id(carpeta)] = carpeta
+
+    # =======================================================
+    # OPERACIONES (retornan el mensaje de error, o None si salió bien)
+    # =======================================================
+
+    def insertar(self, ruta_padre: str, nombre: str, tipo: str, contenido: str):
+        padre = self.carpeta(ruta_padre)
+        if padre is None:
+            return f"La ruta padre '{ruta_padre}' no existe."
+        if not padre.es_carpeta():
+            return f"'{ruta_padre}' no es una carpeta, no puedo agregar hijos aquí."
+        if padre.buscar_hijo(nombre) is not None:
+            return f"Ya existe '{nombre}' en '{ruta_padre}'."
+
+        arbol = self.arbol
+        nodo = Nodo(arbol._preparar_nombre(nombre), tipo,
+                    contenido if self.contenido_tal_cual else arbol._preparar_contenido(contenido))
+        padre.agregar_hijo_sin_ordenar(nodo)
+        self.desordenadas[id(padre)] = padre
+        if self.indexar:
+            arbol._indexar_nuevo(nodo)
+        self.deshacer.append(nodo)
+        return None
+
+    def _deshacer_insertar(self, nodo: Nodo):
+        # Deshago en orden inverso: si después lo movieron, ya volvió a su padre original
+        arbol = self.arbol
+        arbol._invalidar(nodo)
+        self.ordenada(nodo.padre).eliminar_hijo(nodo)
+        self._quitar_de_indices(nodo)
+        arbol._liberar_contenido(nodo._contenido)
+
+    def eliminar(self, ruta: str):
+        nodo = self.buscar(ruta)
+        if nodo is None:
+            return f"La ruta '{ruta}' no existe."
+
+        padre = nodo.padre
+        self.arbol._invalidar(nodo)
+        self.ordenada(padre).eliminar_hijo(nodo)
+        self._quitar_de_indices(nodo)
+        self.olvidar(nodo)
+        self.eliminados.append(nodo)
+        self.deshacer.append((self._deshacer_eliminar, (padre, nodo)))
+        return None
+
+    def _deshacer_eliminar(self, padre: Nodo, nodo: Nodo):
+        self.eliminados.pop()
+        self.arbol._invalidar(nodo)
+        self.ordenada(padre).agregar_hijo(nodo)
+        pila = [nodo]
+        while pila:
+            actual = pila.pop()
+            self.arbol._indexar_nuevo(actual)
+            pila.extend(actual.children)
+
+    def mover(self, ruta_origen: str, ruta_destino: str):
+        nodo = self.buscar(ruta_origen)
+        nuevo_padre = self.carpeta(ruta_destino)
+        if nodo is None or nuevo_padre is None:
+            return "La ruta de origen o la de destino no son válidas."
+        if not nuevo_padre.es_carpeta():
+            return "El destino debe ser una carpeta para poder mover algo dentro."
+        if self.arbol._contiene(nodo, nuevo_padre):
+            return "No puedes mover una carpeta dentro de sí misma o de un subdirectorio."
+        if nuevo_padre.buscar_hijo(nodo.nombre) is not None:
+            return f"Ya existe un elemento llamado '{nodo.nombre}' en el destino."
+
+        viejo_padre = nodo.padre
+        self.arbol._invalidar(nodo)
+        self.ordenada(viejo_padre).eliminar_hijo(nodo)
+        self.colgar(nuevo_padre, nodo)
+        if self.arbol._ancestros is not None:
+            self.arbol._ancestros.mover(nodo, nuevo_padre)
+        self.olvidar(nodo)
+        self.deshacer.append((self._deshacer_mover, (nodo, viejo_padre, nuevo_padre)))
+        return None
+
+    def _deshacer_mover(self, nodo: Nodo, viejo_padre: Nodo, nuevo_padre: Nodo):
+        self.arbol._invalidar(nodo)
+        self.ordenada(nuevo_padre).eliminar_hijo(nodo)
+        self.ordenada(viejo_padre).agregar_hijo(nodo)
+        if self.arbol._ancestros is not None:
+            self.arbol._ancestros.mover(nodo, viejo_padre)
+
+    def modificar_contenido(self, ruta: str, nuevo_contenido: str):
+        nodo = self.buscar(ruta)
+        if nodo is None:
+            return f"La ruta '{ruta}' no existe."
+        if nodo.es_carpeta():
+            return f"'{ruta}' es una carpeta, no puedo modificar su contenido de texto."
+
+        anterior = nodo._contenido
+        nodo.contenido = self.arbol._preparar_contenido(nuevo_contenido)
+        if self.arbol._indice_texto is not None:
+            self.arbol._indice_texto.indexar(nodo, nuevo_contenido)
+        self.reemplazados.append(anterior)
+        self.deshacer.append((self._deshacer_modificar, (nodo, anterior)))
+        return None
+
+    def _deshacer_modificar(self, nodo: Nodo, anterior):
+        self.reemplazados.pop()
+        nuevo = nodo._contenido
+        nodo.contenido = anterior
+        self.arbol._liberar_contenido(nuevo)
+        if self.arbol._indice_texto is not None:
+            self.arbol._indice_texto.indexar(nodo, nodo.contenido)
+
+    def renombrar(self, ruta: str, nuevo_nombre: str):
+        nodo = self.buscar(ruta)
+        if nodo is None:
+            return f"La ruta '{ruta}' no existe."
+        existente = nodo.padre.buscar_hijo(nuevo_nombre)
+        if existente is not None and existente is not nodo:
+            return f"Ya existe un elemento llamado '{nuevo_nombre}' en esta ubicación."
+
+        nombre_viejo = nodo.nombre
+        self._renombrar(nodo, nuevo_nombre)
+        self.olvidar(nodo)
+        self.deshacer.append((self._renombrar, (nodo, nombre_viejo)))
+        return None
+
+    def _renombrar(self, nodo: Nodo, nuevo_nombre: str):
+        nombre_viejo = nodo.nombre
+        self.arbol._invalidar(nodo)
+        self.ordenada(nodo.padre).renombrar_hijo(nodo, self.arbol._preparar_nombre(nuevo_nombre))
+        if self.arbol._indice_nombres is not None:
+            self.arbol._indice_nombres.renombrar(nodo, nombre_viejo)
+
+    def _quitar_de_indices(self, nodo: Nodo):
+        if self.arbol._indice_nombres is not None:
+            self.arbol._indice_nombres.quitar_subarbol(nodo)
+        if self.arbol._indice_texto is not None:
+            self.arbol._indice_texto.quitar_subarbol(nodo)
+        if self.arbol._ancestros is not None:
+            self.arbol._ancestros.quitar_subarbol(nodo)
+
+
+def aplicar_transaccion(arbol, transaccion: Transaccion):
+    """
+    Reviso el lote y lo aplico. Retorna None si se aplicó todo, o (número, mensaje)
+    de la operación que falló (el árbol queda como estaba).
+    """
+    return transaccion._validar() or _Aplicacion(arbol).ejecutar(transaccion.operaciones)
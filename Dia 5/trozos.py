@@ -0,0 +1,126 @@
+"""
+Contenidos grandes guardados en trozos comprimidos de tamaño fijo.
+
+Un ContenidoEnTrozos parte el texto en trozos de 'tamano_trozo' caracteres y
+guarda cada uno comprimido con zlib. El trozo i tiene los caracteres
+[i * tamano_trozo, (i + 1) * tamano_trozo), así que para leer un rango, escribir
+en el medio o agregar al final solo descomprimo (y vuelvo a comprimir) los trozos
+que toca esa operación, nunca el archivo entero.
+
+Las posiciones son en caracteres (como al cortar un str), no en bytes.
+Es un "contenido diferido" más (tiene 'longitud_bytes' y 'materializar()'),
+así que Nodo lo guarda igual que a los demás.
+"""
+import zlib
+
+TAMANO_TROZO = 64 * 1024
+
+
+class ContenidoEnTrozos:
+    """Texto partido en trozos comprimidos; se lee y se modifica de a rangos."""
+    __slots__ = ("tamano_trozo", "nivel", "_trozos", "_bytes_trozos", "longitud", "longitud_bytes")
+
+    def __init__(self, tamano_trozo: int = TAMANO_TROZO, nivel: int = 6):
+        self.tamano_trozo = tamano_trozo
+        self.nivel = nivel                # Nivel de compresión de zlib (1 rápido ... 9 chico)
+        self._trozos = []                 # Cada trozo comprimido (bytes)
+        self._bytes_trozos = []           # Cuántos bytes UTF-8 tiene cada trozo sin comprimir
+        self.longitud = 0                 # Caracteres en total
+        self.longitud_bytes = 0           # Bytes UTF-8 en total (para los totales del árbol)
+
+    @classmethod
+    def desde_texto(cls, texto: str, tamano_trozo: int = TAMANO_TROZO, nivel: int = 6):
+        contenido = cls(tamano_trozo, nivel)
+        contenido.anexar(texto)
+        return contenido
+
+    def __len__(self):
+        return self.longitud
+
+    def copia(self):
+        """Otro contenido con los mismos trozos (los bytes comprimidos no cambian, se comparten)."""
+        otro = ContenidoEnTrozos(self.tamano_trozo, self.nivel)
+        otro._trozos = list(self._trozos)
+        otro._bytes_trozos = list(self._bytes_trozos)
+        otro.longitud = self.longitud
+        otro.longitud_bytes = self.longitud_bytes
+        return otro
+
+    # =======================================================
+    # TROZOS
+    # =======================================================
+
+    def _trozo(self, indice: int) -> str:
+        return zlib.decompress(self._trozos[indice]).decode("utf-8")
+
+    def _guardar_trozo(self, indice: int, texto: str):
+        """Comprimo el texto del trozo y actualizo los bytes totales."""
+        datos = texto.encode("utf-8")
+        comprimido = zlib.compress(datos, self.nivel)
+        if indice == len(self._trozos):
+            self._trozos.append(comprimido)
+            self._bytes_trozos.append(len(datos))
+            self.longitud_bytes += len(datos)
+        else:
+            self._trozos[indice] = comprimido
+            self.longitud_bytes += len(datos) - self._bytes_trozos[indice]
+            self._bytes_trozos[indice] = len(datos)
+
+    # =======================================================
+    # LECTURA
+    # =======================================================
+
+    def materializar(self) -> str:
+        return "".join(self.iterar())
+
+    def iterar(self):
+        """Entrega el texto trozo por trozo (nunca tengo más de uno descomprimido)."""
+        for indice in range(len(self._trozos)):
+            yield self._trozo(indice)
+
+    def leer(self, inicio: int = 0, largo: int = None) -> str:
+        """Los caracteres [inicio, inicio + largo), descomprimiendo solo los trozos de ese rango."""
+        fin = self.longitud if largo is None else min(inicio + largo, self.longitud)
+        if inicio >= fin:
+            return ""
+        primero, ultimo = inicio // self.tamano_trozo, (fin - 1) // self.tamano_trozo
+        texto = "".join(self._trozo(i) for i in range(primero, ultimo + 1))
+        desplazamiento = primero * self.tamano_trozo
+        return texto[inicio - desplazamiento:fin - desplazamiento]
+
+    # =======================================================
+    # ESCRITURA
+    # =======================================================
+
+    def escribir(self, inicio: int, texto: str):
+        """
+        Reemplaza los caracteres desde 'inicio' con 'texto' (como escribir sobre
+        un archivo abierto en esa posición); si pasa del final, el contenido crece.
+        'inicio' no puede estar después del final.
+        """
+        if not 0 <= inicio <= self.longitud:
+            raise ValueError(f"La posición {inicio} está fuera del contenido (largo {self.longitud}).")
+        tamano = self.tamano_trozo
+        posicion = inicio
+        while posicion < inicio + len(texto):
+            indice = posicion // tamano
+            desde = posicion - indice * tamano
+            actual = self._trozo(indice) if indice < len(self._trozos) else ""
+            cuanto = min(tamano - desde, inicio + len(texto) - posicion)
+            parte = texto[posicion - inicio:posicion - inicio + cuanto]
+            self._guardar_trozo(indice, actual[:desde] + parte + actual[desde + cuanto:])
+            posicion += cuanto
+        self.longitud = max(self.longitud, inicio + len(texto))
+
+    def anexar(self, texto: str):
+        """Agrega al final: solo toca el último trozo (si tiene lugar) y los nuevos."""
+        self.escribir(self.longitud, texto)
+
+    def estadisticas(self) -> dict:
+        comprimidos = sum(len(trozo) for trozo in self._trozos)
+        return {
+            "trozos": len(self._trozos),
+            "caracteres": self.longitud,
+            "bytes": self.longitud_bytes,
+            "bytes_comprimidos": comprimidos,
+        }
@@ -0,0 +1,732 @@
+"""
+Motor persistente (inmutable) de mi sistema de archivos: cada cambio crea una
+versión nueva del árbol sin tocar las anteriores.
+
+Los nodos nunca se modifican. Para cambiar algo copio solo el nodo que cambia y
+sus ancestros hasta la raíz (path copying); todo lo demás se comparte entre
+versiones. Así un cambio cuesta O(profundidad) copias y cada versión vieja sigue
+siendo un árbol completo y consistente que se puede leer sin candados, aunque
+otro hilo siga escribiendo.
+
+Para que copiar una carpeta no cueste O(cantidad de hijos), los hijos de cada
+carpeta van en un treap persistente (árbol binario de búsqueda con prioridades),
+ordenado por (tipo, nombre) igual que el 'ls': insertar o quitar un hijo copia
+solo O(log hijos) nodos del treap.
+
+Las versiones viejas se liberan solas cuando nadie las referencia (el árbol
+retiene solo las últimas 'retener'); version(n) las encuentra mientras existan.
+"""
+import sys
+import threading
+import weakref
+from collections import deque
+
+from nodo import CARPETA, ARCHIVO, _bytes_de, _pagina_de_claves
+from diario import INSERTAR, ELIMINAR, MOVER, MODIFICAR, RENOMBRAR
+from errores import ManejoDeErrores, ErroresCapturados
+from transacciones import Transaccion
+from trozos import TAMANO_TROZO
+
+# =======================================================
+# TREAP PERSISTENTE (hijos de una carpeta)
+# =======================================================
+# Cada nodo del treap es una tupla (clave, valor, prioridad, izquierda, derecha).
+# La prioridad sale del hash de la clave: la forma del treap depende solo de
+# qué claves tiene, no del orden en que llegaron.
+
+_CLAVE, _VALOR, _PRIORIDAD, _IZQ, _DER = range(5)
+
+
+def _treap_buscar(treap, clave):
+    while treap is not None:
+        if clave == treap[_CLAVE]:
+            return treap[_VALOR]
+        treap = treap[_IZQ] if clave < treap[_CLAVE] else treap[_DER]
+    return None
+
+
+def _treap_insertar(treap, clave, valor, prioridad):
+    """Retorna un treap nuevo con clave -> valor (reemplaza si ya estaba)."""
+    if treap is None:
+        return (clave, valor, prioridad, None, None)
+    c, v, p, izquierda, derecha = treap
+    if clave == c:
+        return (c, valor, p, izquierda, derecha)
+    if clave < c:
+        izquierda = _treap_insertar(izquierda, clave, valor, prioridad)
+        if izquierda[_PRIORIDAD] > p: # Rotación a la derecha
+            return (izquierda[_CLAVE], izquierda[_VALOR], izquierda[_PRIORIDAD], izquierda[_IZQ],
+                    (c, v, p, izquierda[_DER], derecha))
+        return (c, v, p, izquierda, derecha)
+    derecha = _treap_insertar(derecha, clave, valor, prioridad)
+    if derecha[_PRIORIDAD] > p: # Rotación a la izquierda
+        return (derecha[_CLAVE], derecha[_VALOR], derecha[_PRIORIDAD],
+                (c, v, p, izquierda, derecha[_IZQ]), derecha[_DER])
+    return (c, v, p, izquierda, derecha)
+
+
+def _treap_unir(izquierda, derecha):
+    """Une dos treaps donde todas las claves de 'izquierda' son menores."""
+    if izquierda is None:
+        return derecha
+    if derecha is None:
+        return izquierda
+    if izquierda[_PRIORIDAD] > derecha[_PRIORIDAD]:
+        return izquierda[:_DER] + (_treap_unir(izquierda[_DER], derecha),)
+    return derecha[:_IZQ] + (_treap_unir(izquierda, derecha[_IZQ]), derecha[_DER])
+
+
+def _treap_quitar(treap, clave):
+    if treap is None:
+        return None
+    c = treap[_CLAVE]
+    if clave == c:
+        return _treap_unir(treap[_IZQ], treap[_DER])
+    if clave < c:
+        return treap[:_IZQ] + (_treap_quitar(treap[_IZQ], clave), treap[_DER])
+    return treap[:_DER] + (_treap_quitar(treap[_DER], clave),)
+
+
+def _treap_desde(treap, minimo):
+    """Entrega los valores con clave >= minimo, en orden (llegar al primero es O(log n))."""
+    pila = []
+    while treap is not None:
+        if treap[_CLAVE] >= minimo:
+            pila.append(treap)
+            treap = treap[_IZQ]
+        else:
+            treap = treap[_DER]
+    while pila:
+        treap = pila.pop()
+        yield treap[_VALOR]
+        treap = treap[_DER]
+        while treap is not None:
+            pila.append(treap)
+            treap = treap[_IZQ]
+
+
+def _treap_en_orden(treap):
+    """Entrega los valores ordenados por clave (con una pila, sin recursión)."""
+    pila = []
+    while pila or treap is not None:
+        while treap is not None:
+            pila.append(treap)
+            treap = treap[_IZQ]
+        treap = pila.pop()
+        yield treap[_VALOR]
+        treap = treap[_DER]
+
+
+# =======================================================
+# NODOS INMUTABLES
+# =======================================================
+
+class NodoInmutable:
+    """
+    Archivo o carpeta de una versión. Una vez creado no cambia nunca, por eso
+    el mismo nodo puede estar en muchas versiones a la vez. No tiene 'padre'
+    (un nodo compartido tiene un padre distinto en cada versión).
+    """
+    __slots__ = ("nombre", "_es_carpeta", "contenido", "hijos",
+                 "total_nodos", "total_archivos", "total_carpetas", "total_bytes")
+
+    def __init__(self, nombre: str, es_carpeta: bool, contenido: str = None, hijos=None,
+                 totales=None):
+        self.nombre = nombre
+        self._es_carpeta = es_carpeta
+        self.contenido = contenido
+        self.hijos = hijos # Treap (tipo, nombre) -> NodoInmutable
+        if totales is None:
+            totales = ((1, 0, 1) if es_carpeta else (1, 1, 0)) + (_bytes_de(contenido),)
+        self.total_nodos, self.total_archivos, self.total_carpetas, self.total_bytes = totales
+
+    def __repr__(self):
+        return f"<{self.tipo.upper()}: {self.nombre}>"
+
+    @property
+    def tipo(self) -> str:
+        return CARPETA if self._es_carpeta else ARCHIVO
+
+    @property
+    def children(self) -> list:
+        """Hijos en el mismo orden que el 'ls', por (tipo, nombre)."""
+        return list(_treap_en_orden(self.hijos))
+
+    def es_carpeta(self) -> bool:
+        return self._es_carpeta
+
+    def buscar_hijo(self, nombre: str):
+        """Busco primero entre los archivos y después entre las carpetas (O(log hijos))."""
+        hijo = _treap_buscar(self.hijos, (ARCHIVO, nombre))
+        return hijo if hijo is not None else _treap_buscar(self.hijos, (CARPETA, nombre))
+
+    def _totales(self) -> tuple:
+        return (self.total_nodos, self.total_archivos, self.total_carpetas, self.total_bytes)
+
+
+_VACIO = (0, 0, 0, 0)
+
+
+def _clave_de(nodo: NodoInmutable) -> tuple:
+    return (nodo.tipo, nodo.nombre)
+
+
+def _cambiar_hijo(padre: NodoInmutable, viejo, nuevo) -> NodoInmutable:
+    """
+    Copia de 'padre' con el hijo 'viejo' reemplazado por 'nuevo' (cualquiera de
+    los dos puede ser None: agregar o quitar). Los totales se ajustan por la diferencia.
+    """
+    hijos = padre.hijos
+    if viejo is not None and (nuevo is None or _clave_de(viejo) != _clave_de(nuevo)):
+        hijos = _treap_quitar(hijos, _clave_de(viejo))
+    if nuevo is not None:
+        clave = _clave_de(nuevo)
+        hijos = _treap_insertar(hijos, clave, nuevo, hash(clave))
+    antes = viejo._totales() if viejo is not None else _VACIO
+    despues = nuevo._totales() if nuevo is not None else _VACIO
+    totales = tuple(t - a + d for t, a, d in zip(padre._totales(), antes, despues))
+    return NodoInmutable(padre.nombre, True, padre.contenido, hijos, totales)
+
+
+def _rearmar(camino: list, nuevo) -> NodoInmutable:
+    """
+    'camino' son los nodos desde la raíz hasta el que cambia. Lo reemplazo por
+    'nuevo' (None = quitarlo) y copio cada ancestro hacia arriba. Retorna la raíz nueva.
+    """
+    viejo = camino[-1]
+    for padre in reversed(camino[:-1]):
+        nuevo = _cambiar_hijo(padre, viejo, nuevo)
+        viejo = padre
+    return nuevo
+
+
+def _partes(ruta: str) -> list:
+    return [p for p in ruta.split("/") if p]
+
+
+def _camino(raiz: NodoInmutable, partes: list) -> list:
+    """Nodos desde la raíz siguiendo las partes de la ruta, o None si no existe."""
+    camino = [raiz]
+    for nombre in partes:
+        hijo = camino[-1].buscar_hijo(nombre)
+        if hijo is None:
+            return None
+        camino.append(hijo)
+    return camino
+
+
+# =======================================================
+# VERSIONES (solo lectura)
+# =======================================================
+
+class Version(ManejoDeErrores):
+    """
+    Una foto del árbol en un momento dado. Es de solo lectura y nadie la puede
+    cambiar, así que se puede leer desde cualquier hilo sin candados. Los errores
+    van por el árbol que la creó (así capturar_errores del árbol también los junta).
+    """
+    __slots__ = ("numero", "raiz", "_capturados", "__weakref__")
+
+    def __init__(self, numero: int, raiz: NodoInmutable, capturados: ErroresCapturados):
+        self.numero = numero
+        self.raiz = raiz
+        self._capturados = capturados
+
+    def __repr__(self):
+        return f"<Version {self.numero}: {self.raiz.total_nodos} nodos>"
+
+    def buscar_nodo_por_ruta(self, ruta: str) -> NodoInmutable:
+        camino = _camino(self.raiz, _partes(ruta))
+        return camino[-1] if camino else None
+
+    def calcular_tamano(self, nodo=None) -> int:
+        return (self.raiz if nodo is None else nodo).total_nodos
+
+    def estadisticas_tamano(self, ruta: str = "/") -> dict:
+        nodo = self.buscar_nodo_por_ruta(ruta)
+
+        if not nodo:
+            self._error(f"La ruta '{ruta}' no existe.")
+            return {}
+
+        return {
+            "nodos": nodo.total_nodos,
+            "archivos": nodo.total_archivos,
+            "carpetas": nodo.total_carpetas,
+            "bytes": nodo.total_bytes,
+        }
+
+    def listar_contenido(self, ruta: str, desde=None, limite: int = None, tipo: str = None,
+                         prefijo: str = None):
+        """
+        Igual que en ArbolArchivos: con 'limite' (y 'desde') retorna (página, cursor).
+        En una carpeta bajo por el treap directo a la primera entrada de la página.
+        """
+        paginado = desde is not None or limite is not None
+        if limite is not None and limite < 1:
+            self._error("El límite de una página tiene que ser al menos 1.")
+            return [], None
+
+        nodo = self.buscar_nodo_por_ruta(ruta)
+
+        if not nodo:
+            self._error(f"La ruta '{ruta}' no existe.")
+            return ([], None) if paginado else []
+
+        if nodo.es_carpeta():
+            if not paginado and tipo is None and not prefijo:
+                return [(hijo.tipo, hijo.nombre) for hijo in _treap_en_orden(nodo.hijos)]
+            pagina = _pagina_del_treap(nodo.hijos, desde, limite, tipo, prefijo)
+        else:
+            pagina = _pagina_de_claves([(nodo.tipo, nodo.nombre)], desde, limite, tipo, prefijo)
+        return pagina if paginado else pagina[0]
+
+    def iterar_contenido(self, ruta: str, tipo: str = None, prefijo: str = None, desde=None,
+                         tamano_pagina: int = 1000):
+        """Como listar_contenido pero de a una página a la vez (igual que en ArbolArchivos)."""
+        while True:
+            pagina, desde = self.listar_contenido(ruta, desde, tamano_pagina, tipo, prefijo)
+            yield from pagina
+            if desde is None:
+                return
+
+    def leer_archivo(self, ruta: str, inicio: int = 0, largo: int = None) -> str:
+        """El contenido completo, o solo esos caracteres si se pasa 'inicio' y/o 'largo'."""
+        nodo = self.buscar_nodo_por_ruta(ruta)
+
+        if not nodo:
+            return self._error_de_lectura(f"Archivo o ruta '{ruta}' no encontrado.")
+
+        if nodo.es_carpeta():
+            return self._error_de_lectura(f"'{ruta}' es una carpeta, no puedo leer su contenido como archivo.")
+
+        if inicio < 0 or (largo is not None and largo < 0):
+            return self._error_de_lectura("El inicio y el largo no pueden ser negativos.")
+
+        if inicio or largo is not None:
+            texto = nodo.contenido or ""
+            return texto[inicio:] if largo is None else texto[inicio:inicio + largo]
+        return nodo.contenido if nodo.contenido is not None else "El archivo está vacío."
+
+    def leer_por_partes(self, ruta: str, tamano: int = TAMANO_TROZO):
+        """
+        Generador que entrega el contenido de a 'tamano' caracteres. Como la versión
+        no cambia, todas las partes son del mismo contenido aunque lleguen cambios.
+        """
+        nodo = self.buscar_nodo_por_ruta(ruta)
+
+        if not nodo or nodo.es_carpeta():
+            self._error(f"'{ruta}' no es un archivo.")
+            return
+        if tamano <= 0:
+            self._error("El tamaño de cada parte tiene que ser positivo.")
+            return
+
+        texto = nodo.contenido or ""
+        for inicio in range(0, len(texto), tamano):
+            yield texto[inicio:inicio + tamano]
+
+    def es_ancestro(self, ruta_a: str, ruta_b: str) -> bool:
+        """
+        True si lo que está en ruta_a contiene a lo que está en ruta_b. Sin punteros
+        al padre (y con nodos compartidos por copiar) lo decido por las rutas.
+        """
+        partes_a, partes_b = _partes(ruta_a), _partes(ruta_b)
+        if _camino(self.raiz, partes_a) is None or _camino(self.raiz, partes_b) is None:
+            self._error("Alguna de las dos rutas no existe.")
+            return False
+        return len(partes_a) < len(partes_b) and partes_b[:len(partes_a)] == partes_a
+
+    def profundidad(self, ruta: str) -> int:
+        """Cuántas carpetas hay entre la ruta y la raíz (la raíz es 0). -1 si no existe."""
+        camino = _camino(self.raiz, _partes(ruta))
+        if camino is None:
+            self._error(f"La ruta '{ruta}' no existe.")
+            return -1
+        return len(camino) - 1
+
+    def recorrer_dfs(self, ruta: str = "/"):
+        """Entrega (ruta, nodo) en preorden, en el orden del 'ls' (igual que ArbolArchivos)."""
+        inicio = self.buscar_nodo_por_ruta(ruta)
+        if not inicio:
+            self._error(f"La ruta '{ruta}' no existe.")
+            return
+
+        ruta = "/" + "/".join(_partes(ruta))
+        yield ruta, inicio
+        pila = [(_treap_en_orden(inicio.hijos), ruta if ruta != "/" else "")]
+        while pila:
+            hijos, ruta_padre = pila[-1]
+            hijo = next(hijos, None)
+            if hijo is None:
+                pila.pop()
+                continue
+            ruta_hijo = ruta_padre + "/" + hijo.nombre
+            yield ruta_hijo, hijo
+            if hijo.hijos is not None:
+                pila.append((_treap_en_orden(hijo.hijos), ruta_hijo))
+
+    def mostrar_arbol(self, flujo=None, lineas_por_bloque: int = 1000):
+        """Dibuja la versión completa (mismo formato y mismos parámetros que ArbolArchivos)."""
+        if flujo is None:
+            flujo = sys.stdout
+        lineas = ["\n--- Estructura del Árbol de Archivos ---"]
+        pila = [(self.raiz, "")]
+        while pila:
+            nodo, prefijo = pila.pop()
+            if nodo.es_carpeta():
+                lineas.append(f"{prefijo}[CARPETA] {nodo.nombre}")
+            else:
+                contenido = nodo.contenido
+                extracto = contenido[:30].replace('\n', ' ') + "..." if contenido and len(contenido) > 30 else contenido
+                lineas.append(f"{prefijo}[ARCHIVO] {nodo.nombre}" + (f" (Contenido: '{extracto}')" if extracto else " (Vacío)"))
+
+            hijos = nodo.children
+            for i in range(len(hijos) - 1, -1, -1): # Al revés, para que la pila los saque en orden
+                pila.append((hijos[i], prefijo + ("    " if i == len(hijos) - 1 else "│   ")))
+
+            if len(lineas) >= lineas_por_bloque:
+                flujo.write("\n".join(lineas) + "\n")
+                lineas = []
+        lineas.append("---------------------------------------")
+        flujo.write("\n".join(lineas) + "\n")
+
+
+def _pagina_del_treap(hijos, despues_de=None, limite: int = None, tipo: str = None,
+                      prefijo: str = None):
+    """
+    Lo mismo que _pagina_de_claves (de nodo.py) pero sobre el treap de hijos: en vez
+    de búsqueda binaria en una lista, bajo por el treap hasta la primera clave del
+    rango y sigo en orden hasta que se sale del tipo o del prefijo.
+    """
+    if despues_de is not None:
+        despues_de = tuple(despues_de)
+    pagina = []
+    for tipo_rango in ((tipo.lower(),) if tipo is not None else (ARCHIVO, CARPETA)):
+        inicio = (tipo_rango, prefijo or "")
+        if despues_de is not None and despues_de > inicio:
+            inicio = despues_de
+        for hijo in _treap_desde(hijos, inicio):
+            clave = _clave_de(hijo)
+            if clave[0] != tipo_rango or (prefijo and not hijo.nombre.startswith(prefijo)):
+                break
+            if clave == despues_de:
+                continue
+            if limite is not None and len(pagina) == limite:
+                return pagina, pagina[-1]
+            pagina.append(clave)
+    return pagina, None
+
+
+_SIN_CAMBIO = object() # Lo retorna el 'nuevo' de _con_contenido cuando no se puede escribir
+
+
+# =======================================================
+# ÁRBOL PERSISTENTE (la versión actual + los cambios)
+# =======================================================
+
+class ArbolPersistente(ManejoDeErrores):
+    """
+    Motor persistente con la misma API que ArbolArchivos (se elige con
+    ArbolArchivos(motor="persistente")). Las lecturas van contra la versión
+    actual; snapshot() la entrega para seguir leyéndola aunque lleguen cambios,
+    y version(n) busca una versión vieja mientras alguien la tenga referenciada.
+
+    Los escritores se turnan con un candado; los lectores nunca lo usan.
+    No tiene caché, índices, diario ni deduplicación (ver ArbolArchivos.__new__).
+    """
+    _diario = None # Sin diario (el servidor lo pregunta para saber si tiene que esperar un fsync)
+
+    def __init__(self, retener: int = 16):
+        self._capturados = ErroresCapturados()
+        actual = Version(0, NodoInmutable("/", True), self._capturados)
+        self._actual = actual
+        self._versiones = weakref.WeakValueDictionary({0: actual})
+        self._recientes = deque([actual], maxlen=retener) # Las últimas versiones no se liberan
+        self._escritores = threading.Lock()
+
+    @property
+    def raiz(self) -> NodoInmutable:
+        return self._actual.raiz
+
+    @property
+    def numero_version(self) -> int:
+        return self._actual.numero
+
+    # =======================================================
+    # VERSIONES
+    # =======================================================
+
+    def snapshot(self) -> Version:
+        """La versión actual: O(1), y no cambia aunque después modifiquen el árbol."""
+        return self._actual
+
+    def version(self, numero: int) -> Version:
+        """Una versión anterior, o None si ya se liberó (nadie la estaba usando)."""
+        version = self._versiones.get(numero)
+        if version is None:
+            self._error(f"La versión {numero} no existe o ya fue liberada.")
+        return version
+
+    def _publicar(self, raiz: NodoInmutable):
+        version = Version(self._actual.numero + 1, raiz, self._capturados)
+        self._versiones[version.numero] = version
+        self._recientes.append(version)
+        self._actual = version # Una sola asignación: los lectores ven la versión vieja o la nueva
+
+    # =======================================================
+    # LECTURAS (sobre la versión actual)
+    # =======================================================
+
+    def buscar_nodo_por_ruta(self, ruta: str) -> NodoInmutable:
+        return self._actual.buscar_nodo_por_ruta(ruta)
+
+    def calcular_tamano(self, nodo=None) -> int:
+        return self._actual.calcular_tamano(nodo)
+
+    def estadisticas_tamano(self, ruta: str = "/") -> dict:
+        return self._actual.estadisticas_tamano(ruta)
+
+    def listar_contenido(self, ruta: str, desde=None, limite: int = None, tipo: str = None,
+                         prefijo: str = None):
+        return self._actual.listar_contenido(ruta, desde, limite, tipo, prefijo)
+
+    def iterar_contenido(self, ruta: str, tipo: str = None, prefijo: str = None, desde=None,
+                         tamano_pagina: int = 1000):
+        """Cada página se pide a la versión actual, como en ArbolArchivos (el cursor no se pierde)."""
+        while True:
+            pagina, desde = self.listar_contenido(ruta, desde, tamano_pagina, tipo, prefijo)
+            yield from pagina
+            if desde is None:
+                return
+
+    def leer_archivo(self, ruta: str, inicio: int = 0, largo: int = None) -> str:
+        return self._actual.leer_archivo(ruta, inicio, largo)
+
+    def leer_por_partes(self, ruta: str, tamano: int = TAMANO_TROZO):
+        return self._actual.leer_por_partes(ruta, tamano)
+
+    def es_ancestro(self, ruta_a: str, ruta_b: str) -> bool:
+        return self._actual.es_ancestro(ruta_a, ruta_b)
+
+    def profundidad(self, ruta: str) -> int:
+        return self._actual.profundidad(ruta)
+
+    def recorrer_dfs(self, ruta: str = "/"):
+        return self._actual.recorrer_dfs(ruta)
+
+    def mostrar_arbol(self, flujo=None, lineas_por_bloque: int = 1000):
+        self._actual.mostrar_arbol(flujo, lineas_por_bloque)
+
+    # =======================================================
+    # CAMBIOS (cada uno publica una versión nueva)
+    # =======================================================
+    # Cada cambio es un método _con_* que recibe una raíz y retorna la raíz nueva
+    # (o None con el error ya avisado), sin publicar nada. Así una transacción
+    # encadena varios sobre la misma raíz y publica una sola versión al final.
+
+    def _cambiar(self, cambio, *argumentos) -> bool:
+        with self._escritores:
+            raiz = cambio(self._actual.raiz, *argumentos)
+            if raiz is None:
+                return False
+            self._publicar(raiz)
+            return True
+
+    def insertar(self, ruta_padre: str, nombre: str, tipo: str, contenido: str = None) -> bool:
+        """Inserta un nuevo archivo o carpeta en la ruta de su padre."""
+        return self._cambiar(self._con_insertado, ruta_padre, nombre, tipo, contenido)
+
+    def _con_insertado(self, raiz, ruta_padre, nombre, tipo, contenido=None):
+        camino = _camino(raiz, _partes(ruta_padre))
+
+        if not camino:
+            self._error(f"La ruta padre '{ruta_padre}' no existe.")
+            return None
+
+        padre = camino[-1]
+        if not padre.es_carpeta():
+            self._error(f"'{ruta_padre}' no es una carpeta, no puedo agregar hijos aquí.")
+            return None
+
+        if padre.buscar_hijo(nombre) is not None:
+            self._error(f"Ya existe '{nombre}' en '{ruta_padre}'.")
+            return None
+
+        es_carpeta = tipo.lower() == CARPETA
+        # Las carpetas no guardan texto (igual que en ArbolArchivos): lo descarto
+        nuevo = NodoInmutable(nombre, es_carpeta, None if es_carpeta else contenido)
+        return _rearmar(camino, _cambiar_hijo(padre, None, nuevo))
+
+    def eliminar(self, ruta: str) -> bool:
+        """Elimina el nodo en la ruta (las versiones anteriores lo siguen teniendo)."""
+        return self._cambiar(self._con_eliminado, ruta)
+
+    def _con_eliminado(self, raiz, ruta):
+        if ruta == "/":
+            self._error("¡No puedo eliminar la raíz!")
+            return None
+
+        camino = _camino(raiz, _partes(ruta))
+
+        if not camino or len(camino) == 1:
+            self._error("Nodo no encontrado.")
+            return None
+
+        return _rearmar(camino, None)
+
+    def mover(self, ruta_origen: str, ruta_destino: str) -> bool:
+        """Mueve un nodo (archivo o carpeta) de un lugar a otro, en una sola versión nueva."""
+        return self._cambiar(self._con_movido, ruta_origen, ruta_destino)
+
+    def _con_movido(self, raiz, ruta_origen, ruta_destino):
+        partes_origen, partes_destino = _partes(ruta_origen), _partes(ruta_destino)
+        origen = _camino(raiz, partes_origen)
+        destino = _camino(raiz, partes_destino)
+
+        if not origen or not destino or len(origen) == 1:
+            self._error("La ruta de origen o la de destino no son válidas.")
+            return None
+
+        if not destino[-1].es_carpeta():
+            self._error("El destino debe ser una carpeta para poder mover algo dentro.")
+            return None
+
+        # Sin punteros al padre, el ciclo se ve en las rutas: el destino empieza con el origen
+        if partes_destino[:len(partes_origen)] == partes_origen:
+            self._error("No puedes mover una carpeta dentro de sí misma o de un subdirectorio.")
+            return None
+
+        nodo = origen[-1]
+        if destino[-1].buscar_hijo(nodo.nombre) is not None:
+            self._error(f"Ya existe un elemento llamado '{nodo.nombre}' en el destino.")
+            return None
+
+        # 1. Lo saco (raíz intermedia) y 2. busco el destino de nuevo en esa raíz
+        raiz = _rearmar(origen, None)
+        destino = _camino(raiz, partes_destino)
+        return _rearmar(destino, _cambiar_hijo(destino[-1], None, nodo))
+
+    def copiar(self, ruta_origen: str, ruta_destino: str) -> bool:
+        """
+        Copia un archivo o una carpeta dentro de la carpeta destino. Como los nodos
+        son inmutables, la copia es el mismo nodo colgado en otro lugar: O(profundidad).
+        """
+        return self._cambiar(self._con_copia, ruta_origen, ruta_destino)
+
+    def _con_copia(self, raiz, ruta_origen, ruta_destino):
+        partes_origen, partes_destino = _partes(ruta_origen), _partes(ruta_destino)
+        origen = _camino(raiz, partes_origen)
+        destino = _camino(raiz, partes_destino)
+
+        if not origen or not destino or len(origen) == 1:
+            self._error("La ruta de origen o la de destino no son válidas.")
+            return None
+
+        if not destino[-1].es_carpeta():
+            self._error("El destino debe ser una carpeta para poder copiar algo dentro.")
+            return None
+
+        if partes_destino[:len(partes_origen)] == partes_origen:
+            self._error("No puedes copiar una carpeta dentro de sí misma o de un subdirectorio.")
+            return None
+
+        nodo = origen[-1]
+        if destino[-1].buscar_hijo(nodo.nombre) is not None:
+            self._error(f"Ya existe un elemento llamado '{nodo.nombre}' en el destino.")
+            return None
+
+        return _rearmar(destino, _cambiar_hijo(destino[-1], None, nodo))
+
+    def modificar_contenido(self, ruta: str, nuevo_contenido: str) -> bool:
+        """Cambia el texto dentro de un archivo (simula un comando 'edit')."""
+        return self._cambiar(self._con_contenido, ruta, lambda actual: nuevo_contenido)
+
+    def escribir_contenido(self, ruta: str, inicio: int, texto: str) -> bool:
+        """Escribe 'texto' sobre el archivo a partir del carácter 'inicio' (si pasa del final, crece)."""
+        def escribir(actual):
+            actual = actual or ""
+            if not 0 <= inicio <= len(actual):
+                self._error(f"La posición {inicio} está fuera del archivo '{ruta}' (tiene {len(actual)} caracteres).")
+                return _SIN_CAMBIO
+            return actual[:inicio] + texto + actual[inicio + len(texto):]
+        return self._cambiar(self._con_contenido, ruta, escribir)
+
+    def anexar_contenido(self, ruta: str, texto: str) -> bool:
+        """Agrega 'texto' al final del archivo (como abrirlo en modo 'a')."""
+        return self._cambiar(self._con_contenido, ruta, lambda actual: (actual or "") + texto)
+
+    def _con_contenido(self, raiz, ruta, nuevo):
+        """'nuevo' recibe el contenido actual y retorna el que va (_SIN_CAMBIO si no se puede)."""
+        camino = _camino(raiz, _partes(ruta))
+
+        if not camino:
+            self._error(f"La ruta '{ruta}' no existe.")
+            return None
+
+        if camino[-1].es_carpeta():
+            self._error(f"'{ruta}' es una carpeta, no puedo modificar su contenido de texto.")
+            return None
+
+        contenido = nuevo(camino[-1].contenido)
+        if contenido is _SIN_CAMBIO:
+            return None
+        return _rearmar(camino, NodoInmutable(camino[-1].nombre, False, contenido))
+
+    def renombrar(self, ruta: str, nuevo_nombre: str) -> bool:
+        """Cambia el nombre de un archivo o carpeta en la ruta especificada."""
+        return self._cambiar(self._con_renombrado, ruta, nuevo_nombre)
+
+    def _con_renombrado(self, raiz, ruta, nuevo_nombre):
+        camino = _camino(raiz, _partes(ruta))
+
+        if not camino or len(camino) == 1:
+            self._error(f"Nodo en '{ruta}' no encontrado o no se puede renombrar la raíz.")
+            return None
+
+        nodo = camino[-1]
+        existente = camino[-2].buscar_hijo(nuevo_nombre)
+        if existente is not None and existente is not nodo:
+            self._error(f"Ya existe un elemento llamado '{nuevo_nombre}' en esta ubicación.")
+            return None
+
+        renombrado = NodoInmutable(nuevo_nombre, nodo.es_carpeta(), nodo.contenido, nodo.hijos,
+                                   nodo._totales())
+        return _rearmar(camino, renombrado)
+
+    # =======================================================
+    # TRANSACCIONES (una sola versión nueva para todo el lote)
+    # =======================================================
+
+    def transaccion(self) -> Transaccion:
+        """Abre un lote de cambios que se aplica entero o no se aplica (ver transacciones.py)."""
+        return Transaccion(self)
+
+    def _aplicar_transaccion(self, transaccion: Transaccion):
+        """
+        Acá no hay nada que deshacer: encadeno los cambios sobre una raíz que nadie
+        ve y, si todos salen bien, la publico como una sola versión. Si alguno
+        falla, esa raíz se descarta y la versión actual queda como estaba.
+        """
+        cambios = {
+            INSERTAR: self._con_insertado,
+            ELIMINAR: self._con_eliminado,
+            MOVER: self._con_movido,
+            MODIFICAR: lambda raiz, ruta, contenido: self._con_contenido(raiz, ruta, lambda actual: contenido),
+            RENOMBRAR: self._con_renombrado,
+        }
+        error = transaccion._validar()
+        if error is None:
+            with self._escritores:
+                raiz = self._actual.raiz
+                with self.capturar_errores() as errores:
+                    for numero, operacion in enumerate(transaccion.operaciones):
+                        raiz = cambios[operacion[0]](raiz, *operacion[1:])
+                        if raiz is None:
+                            error = (numero, errores[-1] if errores else "No se pudo aplicar.")
+                            break
+                if error is None:
+                    self._publicar(raiz)
+        if error is not None:
+            self._error(transaccion.describir_error(error))
+        return error